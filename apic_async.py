@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Asyncio execution engine for independent APIC writes.
+
+A "call" is any zero-argument callable that performs one APIC request,
+typically functools.partial(ensure_epg, session, TENANT, app, epg, bd).
+
+- run_phase(calls)   runs the calls concurrently, at most `concurrency`
+                     at a time, and returns their results in call order
+- run_phases(phases) runs a list of phases one after the other, e.g.
+                     [tenant], [VRF], [BDs + App Profiles], [EPGs]
+
+Each call runs on a worker thread over the shared, pooled ApicClient
+(see apic_client.py), so the existing helpers keep printing their own
+"[EPG] ... -> HTTP nnn" status line as each write completes; helpers
+that run here print through print_line() so the lines stay whole.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------
+# Defaults
+# -----------------------------
+CONCURRENCY = 8     # writes in flight at the same time
+
+
+_print_lock = threading.Lock()
+
+
+def print_line(*args, **kwargs):
+    """
+    print() for status lines of concurrent calls: each call is written
+    and flushed under one lock, so lines from parallel writes never run
+    together (print() writes the text and the newline separately).
+    """
+    with _print_lock:
+        print(*args, **kwargs, flush=True)
+
+
+async def _run_call(loop, executor, semaphore, call):
+    """Run one call under the semaphore; return its result or exception."""
+    async with semaphore:
+        try:
+            return await loop.run_in_executor(executor, call)
+        except Exception as exc:  # one failed write must not cancel the others
+            name = getattr(call, "func", call).__name__
+            print_line(f"[ERROR] {name} -> {exc}")
+            return exc
+
+
+async def run_phases_async(phases, concurrency=CONCURRENCY):
+    """
+    Coroutine behind run_phases(); use it when already inside an event loop.
+    Returns one list of results per phase.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for calls in phases:
+            results.append(await asyncio.gather(
+                *(_run_call(loop, executor, semaphore, call) for call in calls)
+            ))
+    return results
+
+
+def run_phases(phases, concurrency=CONCURRENCY):
+    """
+    Run phases in order; the calls within a phase overlap.
+    Returns one list of results (responses or exceptions) per phase.
+    """
+    return asyncio.run(run_phases_async(phases, concurrency))
+
+
+def run_phase(calls, concurrency=CONCURRENCY):
+    """Run independent calls concurrently. Returns results in call order."""
+    return run_phases([calls], concurrency)[0]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Shared APIC client for the lab scripts.
+
+ApicClient wraps one pooled requests.Session and:
+- logs in through aaaLogin.json
+- refreshes the token through aaaRefresh.json before it expires
+- logs in again (once) and retries when a request returns HTTP 403
+- optionally sends every request through a RequestScheduler
+  (apic_scheduler.py: rate limit, adaptive concurrency, 429/503 retries)
+
+It has the same get() / post() / delete() signature as requests.Session,
+so every create_*, ensure_*, get_* and delete_* helper in this repo can be
+handed an ApicClient instead of a plain session.
+
+Usage:
+    from apic_client import ApicClient
+
+    session = ApicClient(APIC, USER, PASS)
+    session.login()
+    session.get(f"{APIC}/api/node/class/fvTenant.json", verify=False)
+"""
+
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+urllib3.disable_warnings()  # lab use only – ignore self-signed cert warnings
+
+# -----------------------------
+# Defaults
+# -----------------------------
+POOL_SIZE = 32          # keep-alive connections kept open to the APIC
+REFRESH_MARGIN = 60     # refresh the token this many seconds before expiry
+DEFAULT_TIMEOUT = 600   # APIC default token lifetime (refreshTimeoutSeconds)
+
+
+class ApicClient:
+    """Authenticated, token-refreshing APIC session."""
+
+    def __init__(self, apic, user, password, pool_size=POOL_SIZE,
+                 refresh_margin=REFRESH_MARGIN, verify=False, scheduler=None):
+        self.apic = apic.rstrip("/")
+        self.user = user
+        self.password = password
+        self.refresh_margin = refresh_margin
+        self.verify = verify
+        self.scheduler = scheduler
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.token = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Authentication
+    # -----------------------------
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def _store_token(self, resp):
+        """Keep the token from an aaaLogin / aaaRefresh reply."""
+        # aaaRefresh answers with an aaaLogin object as well
+        attrs = resp.json()["imdata"][0]["aaaLogin"]["attributes"]
+        self.token = attrs["token"]
+        self.session.cookies["APIC-cookie"] = self.token
+        lifetime = int(attrs.get("refreshTimeoutSeconds", DEFAULT_TIMEOUT))
+        self.expires_at = time.monotonic() + lifetime
+
+    def login(self):
+        """Log in through aaaLogin.json. Returns the login response."""
+        url = f"{self.apic}/api/aaaLogin.json"
+
+        payload = {
+            "aaaUser": {
+                "attributes": {
+                    "name": self.user,
+                    "pwd": self.password
+                }
+            }
+        }
+
+        resp = self.session.post(url, json=payload, verify=self.verify)
+        resp.raise_for_status()
+        self._store_token(resp)
+        return resp
+
+    def refresh(self):
+        """
+        Extend the current token through aaaRefresh.json.
+        Falls back to a fresh login if the refresh is refused.
+        """
+        url = f"{self.apic}/api/aaaRefresh.json"
+        resp = self.session.get(url, verify=self.verify)
+        if resp.status_code >= 300:
+            return self.login()
+        self._store_token(resp)
+        return resp
+
+    def ensure_token(self):
+        """Log in or refresh if the token is missing or about to expire."""
+        with self._lock:
+            if self.token is None:
+                self.login()
+            elif time.monotonic() >= self.expires_at - self.refresh_margin:
+                self.refresh()
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+    def _send(self, method, url, **kwargs):
+        if self.scheduler is None:
+            return self.session.request(method, url, **kwargs)
+        return self.scheduler.send(self.session.request, method, url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request with a valid token. URLs starting with "/" are
+        taken relative to the APIC. On HTTP 403 the client logs in again
+        once and repeats the request.
+        """
+        if url.startswith("/"):
+            url = f"{self.apic}{url}"
+        kwargs.setdefault("verify", self.verify)
+
+        self.ensure_token()
+        token = self.token
+        resp = self._send(method, url, **kwargs)
+
+        if resp.status_code == 403:
+            resp.close()    # release the pooled connection (stream=True)
+            with self._lock:
+                # another thread may already have logged in again
+                if self.token == token:
+                    self.login()
+            resp = self._send(method, url, **kwargs)
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
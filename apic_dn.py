@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+DN / RN helpers for APIC managed objects.
+
+- RN_FORMATS    naming rule (RN pattern) for every class these scripts use
+- rn_for()      build an RN from a class and its naming properties
+- class_for_rn  guess the class of an RN from its prefix
+- split_dn()    split a DN into RNs, keeping bracketed RNs such as
+                subnet-[10.0.0.1/24] in one piece
+- parent_dn()   DN of the parent object
+- parse_dn()    (class, RN) pairs of a DN
+- dn_names()    naming value per class along a DN, e.g. the tenant and
+                App Profile of an EPG
+- DnIndex       trie of DNs for parent, ancestor-of-class and
+                children-of-class lookups without rescanning lists
+"""
+
+import re
+
+# -----------------------------
+# Naming rules
+# -----------------------------
+RN_FORMATS = {
+    "polUni":          "uni",
+    "fvTenant":        "tn-{name}",
+    "fvCtx":           "ctx-{name}",
+    "fvBD":            "BD-{name}",
+    "fvRsCtx":         "rsctx",
+    "fvSubnet":        "subnet-[{ip}]",
+    "fvAp":            "ap-{name}",
+    "fvAEPg":          "epg-{name}",
+    "fvRsBd":          "rsbd",
+    "fvRsProv":        "rsprov-{tnVzBrCPName}",
+    "fvRsCons":        "rscons-{tnVzBrCPName}",
+    "vzFilter":        "flt-{name}",
+    "vzEntry":         "e-{name}",
+    "vzBrCP":          "brc-{name}",
+    "vzSubj":          "subj-{name}",
+    "vzRsSubjFiltAtt": "rssubjFiltAtt-{tnVzFilterName}",
+    "vzInTerm":        "intmnl",
+    "vzOutTerm":       "outtmnl",
+    "vzRsFiltAtt":     "rsfiltAtt-{tnVzFilterName}",
+}
+
+# Naming properties per class, e.g. {"fvSubnet": ("ip",), "fvRsBd": ()}
+NAMING_PROPS = {
+    cls: tuple(re.findall(r"{(\w+)}", fmt)) for cls, fmt in RN_FORMATS.items()
+}
+
+# Fixed RNs ("uni", "rsbd") -> class, and RN prefix up to its first "-"
+# ("epg-", "subnet-") -> (full prefix before the naming property, class)
+_FIXED_RNS = {fmt: cls for cls, fmt in RN_FORMATS.items() if "{" not in fmt}
+_RN_PREFIXES = {
+    fmt[:fmt.find("-") + 1]: (fmt.split("{")[0], cls)
+    for cls, fmt in RN_FORMATS.items() if "{" in fmt
+}
+
+
+def rn_for(cls, attrs):
+    """
+    Build the RN of an object from its naming properties.
+    Raises KeyError for classes without a known naming rule.
+    """
+    return RN_FORMATS[cls].format(**attrs)
+
+
+def class_for_rn(rn):
+    """Return the class of an RN (e.g. 'epg-Web' -> 'fvAEPg') or None."""
+    cls = _FIXED_RNS.get(rn)
+    if cls is not None:
+        return cls
+    prefix, cls = _RN_PREFIXES.get(rn[:rn.find("-") + 1], ("", None))
+    return cls if prefix and rn.startswith(prefix) else None
+
+
+# -----------------------------
+# DN parsing
+# -----------------------------
+def split_dn(dn):
+    """
+    Split a DN into its RNs. Slashes inside [...] belong to the RN:
+    'uni/tn-A/BD-B/subnet-[10.0.0.1/24]' ->
+        ['uni', 'tn-A', 'BD-B', 'subnet-[10.0.0.1/24]']
+    """
+    if "[" not in dn:
+        return dn.split("/")
+    rns = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(dn):
+        if ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+        elif ch == "/" and depth == 0:
+            rns.append(dn[start:i])
+            start = i + 1
+    rns.append(dn[start:])
+    return rns
+
+
+def parent_dn(dn):
+    """DN of the parent object ('' for 'uni')."""
+    return "/".join(split_dn(dn)[:-1])
+
+
+def rn_name(rn):
+    """
+    Naming value of an RN: 'ap-Web_Tier' -> 'Web_Tier',
+    'subnet-[10.0.0.1/24]' -> '10.0.0.1/24'. RNs of unknown classes
+    and fixed RNs ('rsbd') are returned unchanged.
+    """
+    cls = class_for_rn(rn)
+    if cls is None or "{" not in RN_FORMATS[cls]:
+        return rn
+    fmt = RN_FORMATS[cls]
+    head, tail = fmt.split("{")[0], fmt.rsplit("}", 1)[1]
+    return rn[len(head):len(rn) - len(tail)]
+
+
+def parse_dn(dn):
+    """
+    [(class, rn), ...] for every RN of a DN (class None if unknown):
+    'uni/tn-A/ap-W' -> [('polUni', 'uni'), ('fvTenant', 'tn-A'), ('fvAp', 'ap-W')]
+    """
+    return [(class_for_rn(rn), rn) for rn in split_dn(dn)]
+
+
+def dn_names(dn):
+    """
+    {class: naming value} along a DN:
+    'uni/tn-A/ap-W/epg-E' -> {'polUni': 'uni', 'fvTenant': 'A', 'fvAp': 'W', 'fvAEPg': 'E'}
+    """
+    return {cls: rn_name(rn) for cls, rn in parse_dn(dn) if cls}
+
+
+# -----------------------------
+# DN index
+# -----------------------------
+class _DnNode:
+    __slots__ = ("dn", "cls", "parent", "children", "by_class", "present", "value")
+
+    def __init__(self, dn, cls, parent):
+        self.dn = dn
+        self.cls = cls
+        self.parent = parent
+        self.children = {}      # rn -> node
+        self.by_class = {}      # class -> {rn: node}
+        self.present = False    # added explicitly (not just an ancestor)
+        self.value = None
+
+
+class DnIndex:
+    """
+    Trie of DNs with one node per RN.
+
+    DN lookups are dict hits; parent() and ancestor() walk up at most the
+    DN depth; children() reads one per-class child table. Ancestors of
+    added DNs are created implicitly (class from their RN) but only added
+    DNs count as members.
+
+        index = DnIndex()
+        index.add("uni/tn-A/ap-W/epg-E", "fvAEPg", value=epg)
+        index.ancestor("uni/tn-A/ap-W/epg-E/rsprov-C", "fvAEPg")  # -> EPG dn
+        index.children("uni/tn-A/ap-W", "fvAEPg")                 # -> [EPG dn]
+    """
+
+    def __init__(self, dns=()):
+        self.root = _DnNode("", None, None)
+        self._nodes = {}        # dn -> node
+        self._count = 0
+        for dn in dns:
+            self.add(dn)
+
+    def _node(self, dn, create=False):
+        node = self._nodes.get(dn)
+        if node is not None or not create:
+            return node
+        rns = split_dn(dn)
+        parent = self._node("/".join(rns[:-1]), create=True) if len(rns) > 1 else self.root
+        rn = rns[-1]
+        node = _DnNode(dn, class_for_rn(rn), parent)
+        parent.children[rn] = node
+        parent.by_class.setdefault(node.cls, {})[rn] = node
+        self._nodes[dn] = node
+        return node
+
+    def add(self, dn, cls=None, value=None):
+        """Add a DN; cls defaults to the class of its RN."""
+        node = self._node(dn, create=True)
+        if cls and cls != node.cls:
+            rn = split_dn(dn)[-1]
+            node.parent.by_class[node.cls].pop(rn, None)
+            node.parent.by_class.setdefault(cls, {})[rn] = node
+            node.cls = cls
+        if not node.present:
+            node.present = True
+            self._count += 1
+        node.value = value
+
+    def remove(self, dn):
+        """Remove a DN and everything below it."""
+        node = self._nodes.get(dn)
+        if node is None:
+            return
+        rn = split_dn(dn)[-1]
+        del node.parent.children[rn]
+        del node.parent.by_class[node.cls][rn]
+        stack = [node]
+        while stack:
+            cur = stack.pop()
+            del self._nodes[cur.dn]
+            self._count -= cur.present
+            stack.extend(cur.children.values())
+
+    def __contains__(self, dn):
+        node = self._nodes.get(dn)
+        return node is not None and node.present
+
+    def __len__(self):
+        return self._count
+
+    def get(self, dn, default=None):
+        """The value stored with an added DN."""
+        node = self._nodes.get(dn)
+        return node.value if node is not None and node.present else default
+
+    def cls(self, dn):
+        node = self._nodes.get(dn)
+        return node.cls if node is not None else class_for_rn(split_dn(dn)[-1])
+
+    def parent(self, dn):
+        """Nearest added ancestor of a DN (the DN itself need not be added)."""
+        node = self._nodes.get(dn)
+        if node is not None:
+            cur = node.parent
+        else:
+            # not indexed: climb to the first DN the index knows
+            up = parent_dn(dn)
+            while up and up not in self._nodes:
+                up = parent_dn(up)
+            if not up:
+                return None
+            cur = self._nodes[up]
+        while cur is not self.root and not cur.present:
+            cur = cur.parent
+        return cur.dn if cur is not self.root else None
+
+    def ancestor(self, dn, cls):
+        """DN of the nearest ancestor of a class (added or implicit), or None."""
+        node = self._nodes.get(dn)
+        if node is None:
+            # not indexed: fall back to parsing
+            rns = split_dn(dn)
+            for i in range(len(rns) - 1, 0, -1):
+                if class_for_rn(rns[i - 1]) == cls:
+                    return "/".join(rns[:i])
+            return None
+        cur = node.parent
+        while cur is not self.root:
+            if cur.cls == cls:
+                return cur.dn
+            cur = cur.parent
+        return None
+
+    def children(self, dn, cls=None):
+        """Added DNs directly below dn, optionally only those of a class."""
+        node = self._nodes.get(dn)
+        if node is None:
+            return []
+        table = node.children if cls is None else node.by_class.get(cls, {})
+        return [child.dn for child in table.values() if child.present]
+
+    def descendants(self, dn, cls=None):
+        """Added DNs anywhere below dn (pre-order), optionally of a class."""
+        node = self._nodes.get(dn)
+        if node is None:
+            return []
+        out = []
+        stack = list(reversed(list(node.children.values())))
+        while stack:
+            cur = stack.pop()
+            if cur.present and (cls is None or cur.cls == cls):
+                out.append(cur.dn)
+            stack.extend(reversed(list(cur.children.values())))
+        return out
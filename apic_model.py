@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compact managed-object model for fabric-scale inventories.
+
+APIC answers with one dict per object holding every attribute, while the
+inventory scripts only read a handful (name, dn, a relation target). This
+module keeps exactly those:
+
+- one small class per APIC class, with __slots__ (no per-object __dict__)
+  and only the requested properties
+- the DN is stored as (parent DN, RN), both interned, so the thousands of
+  EPGs under one App Profile share a single parent string
+- repeated property values (scope, relation targets) are interned too
+
+    from apic_model import from_item, load
+
+    epg = from_item(item)              # item = {"fvAEPg": {"attributes": {...}}}
+    epg.name, epg.dn, epg.parent
+
+    epgs = load(iter_epgs(session))    # list of FvAEPg, one page in flight
+"""
+
+import sys
+
+# -----------------------------
+# Properties kept per class
+# -----------------------------
+DEFAULT_PROPS = {
+    "fvTenant": ("name",),
+    "fvCtx":    ("name",),
+    "fvBD":     ("name",),
+    "fvRsCtx":  ("tnFvCtxName",),
+    "fvSubnet": ("ip", "scope"),
+    "fvAp":     ("name",),
+    "fvAEPg":   ("name",),
+    "fvRsBd":   ("tnFvBDName",),
+    "fvRsProv": ("tnVzBrCPName",),
+    "fvRsCons": ("tnVzBrCPName",),
+}
+
+MO_CLASSES = {}     # (APIC class, props) -> generated Mo subclass
+
+
+class Mo:
+    """Base class: an APIC object reduced to its DN and a few properties."""
+
+    __slots__ = ("parent", "rn")
+    cls = ""        # APIC class name, e.g. "fvAEPg"
+    props = ()      # properties kept, in __slots__ order
+
+    def __init__(self, dn, attrs):
+        self.parent, self.rn = split_last(dn)
+        for prop in self.props:
+            value = attrs.get(prop)
+            setattr(self, prop, sys.intern(value) if isinstance(value, str) else value)
+
+    @property
+    def dn(self):
+        return f"{self.parent}/{self.rn}" if self.parent else self.rn
+
+    def attributes(self):
+        """The kept properties (and dn) as an APIC-style attributes dict."""
+        attrs = {"dn": self.dn}
+        for prop in self.props:
+            attrs[prop] = getattr(self, prop)
+        return attrs
+
+    def __repr__(self):
+        shown = ", ".join(f"{p}={getattr(self, p)!r}" for p in self.props)
+        return f"{self.cls}({self.dn!r}{', ' if shown else ''}{shown})"
+
+
+def split_last(dn):
+    """
+    (parent DN, RN), both interned. A trailing bracketed RN such as
+    subnet-[10.0.0.1/24] stays whole.
+    """
+    end = dn.rfind("[") if dn.endswith("]") else len(dn)
+    cut = dn.rfind("/", 0, end)
+    if cut < 0:
+        return "", sys.intern(dn)
+    return sys.intern(dn[:cut]), sys.intern(dn[cut + 1:])
+
+
+def mo_class(cls, props=None):
+    """The Mo subclass for an APIC class and property tuple (created once)."""
+    props = tuple(props) if props is not None else DEFAULT_PROPS.get(cls, ("name",))
+    key = (cls, props)
+    if key not in MO_CLASSES:
+        name = cls[0].upper() + cls[1:]
+        MO_CLASSES[key] = type(name, (Mo,), {"__slots__": props, "cls": cls, "props": props})
+    return MO_CLASSES[key]
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def from_item(item, props=None):
+    """
+    Build the model object for one imdata item ({cls: {"attributes": ...}}).
+    props maps APIC classes to the properties to keep (default DEFAULT_PROPS).
+    """
+    (cls, body), = item.items()
+    attrs = body["attributes"]
+    return mo_class(cls, (props or DEFAULT_PROPS).get(cls))(attrs["dn"], attrs)
+
+
+def load(items, props=None):
+    """
+    Model objects for an iterable of imdata items. Items are converted one
+    at a time, so with a paging or streaming source the raw JSON of only
+    one page is alive at once.
+    """
+    return [from_item(item, props) for item in items]
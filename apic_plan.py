@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Plan / apply for desired-state payload trees.
+
+The build scripts describe what a tenant should contain as one payload
+tree (create_ACME_all.build_tenant_tree, create_contracts.build_contract_tree).
+Instead of re-POSTing that tree on every run:
+
+- plan   reads the live objects under the tree's root once
+         (query-target=subtree, rsp-prop-include=config-only), flattens the
+         desired tree into DN -> attributes, and compares them: only the
+         attributes the desired tree sets are compared
+- print  shows a Terraform-style plan:
+
+             + fvAEPg uni/tn-ACME/ap-Web_Tier/epg-Web-Frontend
+             ~ fvSubnet uni/tn-ACME/BD-ACME-Web-BD/subnet-[10.10.10.1/24]
+                   scope: "private" -> "public"
+             - fvAEPg uni/tn-ACME/ap-Web_Tier/epg-Old
+
+             Plan: 1 to add, 1 to change, 1 to destroy.
+
+- apply  POSTs one tree holding only the objects to create, change or
+         delete (unchanged ancestors are included by name only)
+
+Live objects missing from the desired tree are only destroyed with
+prune=True, and only for the classes the desired tree manages.
+A converged tenant costs one GET and no writes.
+
+Usage:
+    from apic_plan import plan_and_apply
+
+    plan_and_apply(session, APIC, build_tenant_tree(...), prune=False)
+"""
+
+from apic_dn import NAMING_PROPS, parent_dn, rn_for
+from filter_compiler import PORT_NAMES
+
+SKIP_ATTRS = ("dn", "rn", "status", "childAction")
+PORT_ATTRS = ("dFromPort", "dToPort", "sFromPort", "sToPort")
+
+
+# -----------------------------
+# Desired / live state
+# -----------------------------
+def flatten_tree(tree, parent=""):
+    """
+    Flatten a payload tree into {dn: (class, attributes)} in tree order.
+    Objects without a dn get one from their parent and naming properties.
+    """
+    flat = {}
+    for cls, body in tree.items():
+        attrs = body.get("attributes", {})
+        dn = attrs.get("dn") or f"{parent}/{rn_for(cls, attrs)}"
+        flat[dn] = (cls, {k: v for k, v in attrs.items() if k not in SKIP_ATTRS})
+        for child in body.get("children", []):
+            flat.update(flatten_tree(child, dn))
+    return flat
+
+
+def read_live(session, apic, root_dn, classes):
+    """
+    Live objects of the given classes under root_dn (root included),
+    as {dn: (class, config attributes)}, from a single query.
+    """
+    url = (
+        f"{apic}/api/node/mo/{root_dn}.json"
+        f"?query-target=subtree&target-subtree-class={','.join(sorted(classes))}"
+        "&rsp-prop-include=config-only"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+
+    live = {}
+    for item in resp.json().get("imdata", []):
+        for cls, body in item.items():
+            attrs = body["attributes"]
+            live[attrs["dn"]] = (cls, attrs)
+    return live
+
+
+# -----------------------------
+# Plan
+# -----------------------------
+def diff_states(desired, live, prune=False, keep=(), owned=()):
+    """
+    Compare desired and live {dn: (class, attributes)} maps.
+
+    Returns a list of changes in apply order:
+        ("create", cls, dn, attrs)
+        ("update", cls, dn, {prop: (live_value, desired_value)})
+        ("delete", cls, dn, None)     only with prune, never for `keep` classes
+
+    Live objects of the `owned` classes whose parent is in the desired
+    tree are deleted when the tree leaves them out, even without prune:
+    the desired tree defines all of them (e.g. the vzEntry objects of a
+    filter).
+    """
+    changes = []
+    for dn, (cls, attrs) in desired.items():
+        if dn not in live:
+            changes.append(("create", cls, dn, attrs))
+            continue
+        current = live[dn][1]
+        delta = {
+            k: (current.get(k), v) for k, v in attrs.items()
+            if _comparable(k, current.get(k)) != _comparable(k, v)
+        }
+        if delta:
+            changes.append(("update", cls, dn, delta))
+
+    managed = {cls for cls, _ in desired.values()} - set(keep) if prune else set()
+    doomed = {
+        dn for dn, (cls, _) in live.items()
+        if dn not in desired
+        and (cls in managed or (cls in owned and parent_dn(dn) in desired))
+    }
+    for dn in sorted(doomed):
+        # deleting an object deletes its subtree as well
+        if not _has_ancestor_in(dn, doomed):
+            changes.append(("delete", live[dn][0], dn, None))
+    return changes
+
+
+def _comparable(prop, value):
+    """
+    Value as compared by the plan. APIC answers vzEntry ports with its
+    named constants ("http", "unspecified"), so "80" and "http" match.
+    """
+    if prop in PORT_ATTRS and value is not None:
+        value = str(value)
+        return "0" if value == "unspecified" else str(PORT_NAMES.get(value, value))
+    return value
+
+
+def _has_ancestor_in(dn, dns):
+    parent = parent_dn(dn)
+    while parent:
+        if parent in dns:
+            return True
+        parent = parent_dn(parent)
+    return False
+
+
+def print_plan(changes):
+    """Print the changes Terraform-style and return (add, change, destroy)."""
+    if not changes:
+        print("No changes. The live configuration matches the desired state.")
+        return 0, 0, 0
+
+    marks = {"create": "+", "update": "~", "delete": "-"}
+    for action, cls, dn, detail in changes:
+        print(f"  {marks[action]} {cls} {dn}")
+        if action == "update":
+            for prop, (old, new) in detail.items():
+                print(f'        {prop}: "{old}" -> "{new}"')
+
+    counts = tuple(sum(1 for c in changes if c[0] == a) for a in ("create", "update", "delete"))
+    print(f"\nPlan: {counts[0]} to add, {counts[1]} to change, {counts[2]} to destroy.")
+    return counts
+
+
+# -----------------------------
+# Apply
+# -----------------------------
+def _node(tree_index, dn, cls, attrs):
+    """Get or create the payload node for dn (attributes merged in)."""
+    if dn not in tree_index:
+        tree_index[dn] = {cls: {"attributes": dict(attrs), "children": []}}
+    else:
+        tree_index[dn][cls]["attributes"].update(attrs)
+    return tree_index[dn]
+
+
+def changes_payload(changes, root_dn, desired, live):
+    """
+    One payload tree rooted at root_dn holding only the changed objects.
+    Unchanged ancestors appear with their naming properties only, which
+    APIC treats as a no-op for them.
+    """
+    index = {}
+    known = {**live, **desired}
+
+    def naming(dn):
+        cls, attrs = known[dn]
+        return cls, {k: attrs[k] for k in NAMING_PROPS.get(cls, ()) if k in attrs}
+
+    def attach(dn, cls, attrs):
+        node = _node(index, dn, cls, attrs)
+        if dn == root_dn:
+            return
+        parent = parent_dn(dn)
+        parent_cls, parent_attrs = naming(parent)
+        attach(parent, parent_cls, parent_attrs)
+        children = index[parent][parent_cls]["children"]
+        if not any(child is node for child in children):
+            children.append(node)
+
+    for action, cls, dn, detail in changes:
+        _, name_attrs = naming(dn)
+        if action == "create":
+            attrs = dict(detail)
+        elif action == "update":
+            attrs = dict(name_attrs, **{k: new for k, (_, new) in detail.items()})
+        else:
+            attrs = dict(name_attrs, status="deleted")
+        attach(dn, cls, attrs)
+
+    root_cls = known[root_dn][0]
+    root = index.get(root_dn) or {root_cls: {"attributes": {}, "children": []}}
+    root[root_cls]["attributes"]["dn"] = root_dn
+    _strip_empty(root)
+    return root
+
+
+def _strip_empty(tree):
+    for body in tree.values():
+        if not body.get("children"):
+            body.pop("children", None)
+        for child in body.get("children", []):
+            _strip_empty(child)
+
+
+def apply_changes(session, apic, changes, root_dn, desired, live):
+    """POST the changed objects as one tree. Returns the response (None if nothing to do)."""
+    if not changes:
+        return None
+    payload = changes_payload(changes, root_dn, desired, live)
+    url = f"{apic}/api/mo/{root_dn}.json"
+
+    resp = session.post(url, json=payload, verify=False)
+    print(f"[APPLY] {root_dn} ({len(changes)} changes) -> HTTP {resp.status_code}")
+    if resp.status_code >= 300:
+        print(resp.text)
+    return resp
+
+
+def plan_and_apply(session, apic, tree, prune=False, keep=(), apply=True, owned=()):
+    """
+    Plan a desired payload tree against the live fabric, print the plan
+    and (with apply=True) push only the differences (see diff_states for
+    prune, keep and owned).
+    Returns the list of changes.
+    """
+    desired = flatten_tree(tree)
+    root_dn = next(iter(desired))
+    live = read_live(session, apic, root_dn, {cls for cls, _ in desired.values()} | set(owned))
+
+    changes = diff_states(desired, live, prune=prune, keep=keep, owned=owned)
+    print_plan(changes)
+    if apply:
+        apply_changes(session, apic, changes, root_dn, desired, live)
+    return changes
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Adaptive request scheduling for parallel APIC writes.
+
+Under a burst of parallel POSTs the APIC answers HTTP 429 / 503 or slows
+down sharply. RequestScheduler sits between ApicClient and the wire and
+keeps the load at what the controllers will take:
+
+- token bucket   caps the request rate (rate=None: no cap), with bursts
+                 of up to `burst` requests
+- AIMD limit     caps the requests in flight: +1 per round of fast
+                 answers, halved on 429 / 503 or when an answer takes
+                 longer than target_latency (at most once per round)
+- retries        429 / 503 answers to idempotent requests (GET, DELETE,
+                 POSTs to /api/mo and /api/node/mo) are retried with full
+                 jitter backoff; a Retry-After header pauses all requests
+                 for that long
+
+Usage:
+    from apic_client import ApicClient
+    from apic_scheduler import RequestScheduler
+
+    session = ApicClient(APIC, USER, PASS,
+                         scheduler=RequestScheduler(rate=20, max_concurrency=8))
+    run_phase(calls, concurrency=8)     # every call goes through the scheduler
+    print(session.scheduler.stats)
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from apic_async import print_line
+
+# -----------------------------
+# Defaults
+# -----------------------------
+RATE = None             # requests per second (None = no rate cap)
+CONCURRENCY = 4         # requests in flight to start with
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+TARGET_LATENCY = 2.0    # seconds; slower answers count as congestion
+RETRIES = 5             # retries of a throttled idempotent request
+BACKOFF = 0.5           # first retry waits up to this many seconds
+MAX_BACKOFF = 30.0
+
+RETRY_STATUS = (429, 503)
+IDEMPOTENT_POST_PATHS = ("/api/mo/", "/api/node/mo/")
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, up to `burst` saved."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AimdLimit:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+    acquire() blocks while `limit` requests are in flight; release()
+    reports how the request went.
+    """
+
+    def __init__(self, initial=CONCURRENCY, minimum=MIN_CONCURRENCY,
+                 maximum=MAX_CONCURRENCY, target_latency=TARGET_LATENCY, decrease=0.5):
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.in_flight = 0
+        self._next_cut = 0.0    # no second decrease before this time
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency, congested=False):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested or latency > self.target_latency:
+                # the requests already in flight saw the same congestion:
+                # cut once for all of them
+                if now >= self._next_cut:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._next_cut = now + latency
+            else:
+                # +1/limit per answer = +1 per round of `limit` requests
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def is_idempotent(method, url):
+    """GET / DELETE, and MO POSTs (APIC applies the same config tree once)."""
+    if method.upper() in ("GET", "HEAD", "DELETE"):
+        return True
+    path = urlsplit(url).path
+    return method.upper() == "POST" and path.startswith(IDEMPOTENT_POST_PATHS)
+
+
+def retry_after(resp):
+    """Seconds from a Retry-After header (delay or HTTP date), or None."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Rate limit, adaptive concurrency and retries around a send function."""
+
+    def __init__(self, rate=RATE, burst=None, concurrency=CONCURRENCY,
+                 min_concurrency=MIN_CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+                 target_latency=TARGET_LATENCY, retries=RETRIES,
+                 backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limit = AimdLimit(concurrency, min_concurrency, max_concurrency, target_latency)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.hold_until = 0.0   # Retry-After pause shared by all requests
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _hold(self, seconds):
+        with self._lock:
+            self.hold_until = max(self.hold_until, time.monotonic() + seconds)
+
+    def _wait_turn(self):
+        while True:
+            wait = self.hold_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        if self.bucket:
+            self.bucket.acquire()
+        self.limit.acquire()
+
+    def delay(self, attempt):
+        """Full jitter: uniform in [0, backoff * 2**attempt], capped."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def send(self, send, method, url, **kwargs):
+        """
+        Call send(method, url, **kwargs) (e.g. requests.Session.request)
+        under the rate and concurrency limits, retrying throttled
+        idempotent requests. Returns the last response.
+        """
+        retries = self.retries if is_idempotent(method, url) else 0
+        attempt = 0
+        while True:
+            self._wait_turn()
+            self._count("requests")
+            start = time.monotonic()
+            try:
+                resp = send(method, url, **kwargs)
+            except Exception:
+                self.limit.release(time.monotonic() - start)
+                raise
+
+            throttled = resp.status_code in RETRY_STATUS
+            self.limit.release(time.monotonic() - start, congested=throttled)
+            if not throttled:
+                return resp
+
+            self._count("throttled")
+            pause = retry_after(resp)
+            if pause:
+                self._hold(pause)
+            if attempt >= retries:
+                return resp
+
+            wait = max(self.delay(attempt), pause or 0.0)
+            attempt += 1
+            self._count("retries")
+            print_line(f"[RETRY] {method} {urlsplit(url).path} -> HTTP {resp.status_code}, "
+                       f"retry {attempt}/{retries} in {wait:.1f}s")
+            resp.close()
+            time.sleep(wait)
@@ -0,0 +1,798 @@
+#!/usr/bin/env python3
+"""
+Local APIC stand-in for offline runs, CI and performance measurements.
+
+Implements, over plain HTTP, the part of the APIC REST API these scripts use:
+
+- POST /api/aaaLogin.json, GET /api/aaaRefresh.json
+- POST /api/mo/<dn>.json          tree payloads with children and status
+                                  ("created", "modified", "deleted")
+- GET  /api/mo/<dn>.json, /api/node/mo/<dn>.json
+        query-target=self|children|subtree, target-subtree-class,
+        query-target-filter, rsp-subtree=children|full, rsp-subtree-class,
+        rsp-prop-include=all|naming-only|config-only
+- GET  /api/node/class/<class>.json
+        query-target-filter, order-by, page, page-size
+- GET  /socket<token>             websocket for event subscriptions
+- any GET query with subscription=yes returns a subscriptionId; every
+  later create / modify / delete of a matching object is pushed on the
+  token's websocket until the subscription times out
+- GET  /api/subscriptionRefresh.json?id=<subscriptionId>
+
+The MIT is a real in-memory DN tree. Every write stamps modTs, and every
+deleted object leaves an aaaModLR audit record (ind="deletion"). Per-request
+latency and a requests-per-second limit (answered with HTTP 429) can be
+configured, and every request is counted in ApicSimulator.stats (also
+served, uncounted, at GET /sim/stats.json).
+
+Standalone:
+    python apic_sim.py --port 8765 --latency 0.02 --max-rps 200
+    # then set APIC = "http://127.0.0.1:8765" in a script
+
+    python apic_sim.py --port 0 --load fixture.json
+    # seed the MIT from a POST-style payload (or a list of them) first;
+    # port 0 picks a free port, printed on the first line
+
+In-process (tests, benchmarks):
+    sim = ApicSimulator(latency=0.01).start()
+    ...  # sim.url, sim.stats, sim.mit
+    sim.stop()
+"""
+
+import argparse
+import json
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from apic_dn import NAMING_PROPS, parent_dn, rn_for, split_dn
+from apic_websocket import (OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, WebSocketClosed,
+                            accept_key, encode_frame, read_frame)
+
+# -----------------------------
+# Defaults
+# -----------------------------
+TOKEN_TIMEOUT = 600     # refreshTimeoutSeconds handed out at login
+SUBSCRIPTION_TIMEOUT = 60   # seconds a subscription lives without a refresh
+NON_CONFIG_PROPS = ("modTs", "status", "childAction", "lcOwn", "uid")
+
+
+class ApicError(Exception):
+    """Error answered to the client as an APIC error object."""
+
+    def __init__(self, code, text):
+        super().__init__(text)
+        self.code = code
+        self.text = text
+
+
+# -----------------------------
+# In-memory MIT
+# -----------------------------
+class Mit:
+    """DN-keyed object tree with class index and modTs stamping."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.mos = {}           # dn -> {"cls": ..., "attrs": {...}}
+        self.children = {}      # dn -> {child_dn: None} (ordered set)
+        self.by_class = {}      # cls -> {dn: None}
+        self._audit_id = 0
+        self._last_ts = None
+        self.listeners = []     # callables fed the change events of every post
+        self._add("polUni", "uni", {"dn": "uni"})
+
+    # ---- timestamps ----
+    def _stamp(self):
+        """Strictly increasing modTs in APIC format."""
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        if self._last_ts is not None and now <= self._last_ts:
+            now = self._last_ts + timedelta(milliseconds=1)
+        self._last_ts = now
+        return now.isoformat(timespec="milliseconds")
+
+    # ---- raw tree edits ----
+    def _add(self, cls, dn, attrs):
+        self.mos[dn] = {"cls": cls, "attrs": attrs}
+        self.children.setdefault(dn, {})
+        self.by_class.setdefault(cls, {})[dn] = None
+        parent = "/".join(split_dn(dn)[:-1])
+        if parent:
+            self.children[parent][dn] = None
+
+    def _remove(self, dn, stamp, events):
+        for child in list(self.children.get(dn, ())):
+            self._remove(child, stamp, events)
+        mo = self.mos.pop(dn)
+        self.children.pop(dn, None)
+        del self.by_class[mo["cls"]][dn]
+        parent = "/".join(split_dn(dn)[:-1])
+        if parent in self.children:
+            self.children[parent].pop(dn, None)
+        self._audit(stamp, mo["cls"], dn)
+        events.append((mo["cls"], {"dn": dn, "modTs": stamp, "status": "deleted"}))
+
+    def _audit(self, stamp, cls, dn):
+        """Record a deletion as an aaaModLR (outside the uni tree)."""
+        self._audit_id += 1
+        rec_dn = f"subj-[{dn}]/mod-{self._audit_id}"
+        self.mos[rec_dn] = {"cls": "aaaModLR", "attrs": {
+            "dn": rec_dn,
+            "affected": dn,
+            "ind": "deletion",
+            "created": stamp,
+            "descr": f"{cls} {dn} deleted",
+        }}
+        self.by_class.setdefault("aaaModLR", {})[rec_dn] = None
+
+    # ---- writes ----
+    def post(self, url_dn, payload):
+        """
+        Apply a POSTed tree. The whole tree is validated before anything
+        is written, so a rejected payload leaves the MIT untouched.
+        Listeners get the list of (class, attributes) change events, where
+        attributes carry status "created", "modified" or "deleted";
+        rewriting an object with its current values is not a change.
+        Returns the number of objects touched.
+        """
+        events = []
+        with self.lock:
+            ops = []
+            for cls, body in payload.items():
+                attrs = body.get("attributes", {})
+                dn = attrs.get("dn")
+                if not dn:
+                    dn = self._child_dn(url_dn, cls, attrs, top=True)
+                self._collect(cls, dn, body, ops)
+
+            pending = set()
+            for op, cls, dn, attrs in ops:
+                if op == "deleted":
+                    continue
+                if op == "modify" and dn not in self.mos and dn not in pending:
+                    raise ApicError(400, f"MO {dn} does not exist (status modified)")
+                parent = "/".join(split_dn(dn)[:-1])
+                if parent and parent not in self.mos and parent not in pending:
+                    raise ApicError(400, f"Parent MO {parent} of {dn} does not exist")
+                pending.add(dn)
+
+            stamp = self._stamp()
+            for op, cls, dn, attrs in ops:
+                if op == "deleted":
+                    if dn in self.mos:
+                        self._remove(dn, stamp, events)
+                    continue
+                if dn in self.mos:
+                    current = self.mos[dn]["attrs"]
+                    changed = {k: v for k, v in attrs.items() if current.get(k) != v}
+                    if not changed:
+                        continue
+                    current.update(changed)
+                    current["modTs"] = stamp
+                    events.append((cls, dict(changed, dn=dn, modTs=stamp, status="modified")))
+                else:
+                    attrs.update({"dn": dn, "modTs": stamp})
+                    self._add(cls, dn, attrs)
+                    events.append((cls, dict(attrs, status="created")))
+
+            # still under the lock, so listeners see posts in commit order;
+            # they must not block (ApicSimulator only queues the events)
+            if events:
+                for listener in self.listeners:
+                    listener(events)
+            return len(ops)
+
+    def _child_dn(self, parent, cls, attrs, top=False):
+        try:
+            rn = rn_for(cls, attrs)
+        except KeyError:
+            if top:
+                return parent   # e.g. {"fvBD": {"attributes": {"status": "deleted"}}}
+            raise ApicError(400, f"Cannot derive the dn of a {cls} object")
+        if top and split_dn(parent)[-1] == rn:
+            return parent
+        return f"{parent}/{rn}"
+
+    def _collect(self, cls, dn, body, ops):
+        attrs = {
+            k: v for k, v in body.get("attributes", {}).items()
+            if k not in ("status", "rn", "childAction", "dn")
+        }
+        status = body.get("attributes", {}).get("status", "")
+        if "deleted" in status:
+            ops.append(("deleted", cls, dn, attrs))
+            return
+        # "modified" alone only changes an existing object (APIC rejects it otherwise)
+        ops.append(("modify" if status == "modified" else "upsert", cls, dn, attrs))
+        for child in body.get("children", []):
+            for child_cls, child_body in child.items():
+                child_attrs = child_body.get("attributes", {})
+                child_dn = child_attrs.get("dn") or self._child_dn(dn, child_cls, child_attrs)
+                self._collect(child_cls, child_dn, child_body, ops)
+
+    # ---- reads ----
+    def subtree(self, dn):
+        """Pre-order list of dn and all its descendants."""
+        out = []
+        stack = [dn]
+        while stack:
+            cur = stack.pop()
+            out.append(cur)
+            stack.extend(reversed(list(self.children.get(cur, ()))))
+        return out
+
+
+# -----------------------------
+# query-target-filter
+# -----------------------------
+_TOKENS = re.compile(
+    r'\s*(?:(?P<func>[a-z]+)\(|(?P<close>\))|(?P<comma>,)'
+    r'|"(?P<str>(?:[^"\\]|\\.)*)"|(?P<ref>[A-Za-z0-9_]+\.[A-Za-z0-9_]+))'
+)
+
+_COMPARE = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+    "wcard": lambda a, b: re.search(b, a) is not None,
+}
+
+
+def _tokenize(text):
+    pos = 0
+    tokens = []
+    while pos < len(text.rstrip()):
+        m = _TOKENS.match(text, pos)
+        if not m:
+            raise ApicError(400, f"Invalid filter near: {text[pos:]}")
+        tokens.append((m.lastgroup, m.group(m.lastgroup)))
+        pos = m.end()
+    return tokens
+
+
+def parse_filter(text):
+    """
+    Compile a query-target-filter expression into predicate(cls, attrs).
+    A property reference (fvAEPg.dn) only matches objects of its class.
+    """
+    tokens = _tokenize(text)
+    pos = 0
+
+    def expr():
+        nonlocal pos
+        kind, value = tokens[pos]
+        pos += 1
+        if kind == "str":
+            return ("str", value)
+        if kind == "ref":
+            return ("ref", tuple(value.split(".", 1)))
+        if kind != "func":
+            raise ApicError(400, f"Unexpected '{value}' in filter")
+        args = []
+        while tokens[pos][0] != "close":
+            args.append(expr())
+            if tokens[pos][0] == "comma":
+                pos += 1
+        pos += 1
+        return (value, args)
+
+    tree = expr()
+
+    def evaluate(node, cls, attrs):
+        op, args = node
+        if op in ("and", "or", "not"):
+            results = (evaluate(a, cls, attrs) for a in args)
+            if op == "and":
+                return all(results)
+            if op == "or":
+                return any(results)
+            return not next(results)
+        if op not in _COMPARE:
+            raise ApicError(400, f"Unsupported filter function {op}")
+        (_, (ref_cls, prop)), (_, value) = args
+        if ref_cls != cls or prop not in attrs:
+            return False
+        left = attrs[prop]
+        if left.lstrip("-").isdigit() and value.lstrip("-").isdigit() and op != "wcard":
+            return _COMPARE[op](int(left), int(value))
+        return _COMPARE[op](left, value)
+
+    return lambda cls, attrs: evaluate(tree, cls, attrs)
+
+
+# -----------------------------
+# Query engine
+# -----------------------------
+def _props(mo, include):
+    attrs = mo["attrs"]
+    if include == "naming-only":
+        keep = ("dn",) + NAMING_PROPS.get(mo["cls"], ())
+        return {k: attrs[k] for k in keep if k in attrs}
+    out = dict(attrs)
+    if include == "config-only":
+        for k in NON_CONFIG_PROPS:
+            out.pop(k, None)
+    else:
+        out.setdefault("status", "")
+    return out
+
+
+def _render(mit, dn, mode, classes, include, top=True):
+    """Render one MO with its rsp-subtree; None if pruned by class."""
+    mo = mit.mos[dn]
+    attrs = _props(mo, include)
+    if not top:
+        attrs.pop("dn", None)
+        attrs["rn"] = split_dn(dn)[-1]
+    body = {"attributes": attrs}
+
+    kids = []
+    if mode in ("children", "full"):
+        for child in mit.children[dn]:
+            child_cls = mit.mos[child]["cls"]
+            if mode == "children":
+                if classes is None or child_cls in classes:
+                    kids.append(_render(mit, child, None, None, include, top=False))
+            else:
+                rendered = _render(mit, child, "full", classes, include, top=False)
+                if rendered is not None:
+                    kids.append(rendered)
+    if kids:
+        body["children"] = kids
+
+    if not top and classes is not None and mo["cls"] not in classes and not kids:
+        return None
+    return {mo["cls"]: body}
+
+
+def run_query(mit, dns, params, scope_dn=None):
+    """Apply the common query parameters to candidate DNs."""
+    one = lambda name, default=None: params.get(name, [default])[0]
+
+    classes = one("target-subtree-class")
+    if classes and scope_dn is not None:
+        wanted = set(classes.split(","))
+        dns = [dn for dn in dns if mit.mos[dn]["cls"] in wanted]
+
+    flt = one("query-target-filter")
+    if flt:
+        pred = parse_filter(flt)
+        dns = [dn for dn in dns if pred(mit.mos[dn]["cls"], mit.mos[dn]["attrs"])]
+
+    order = one("order-by")
+    if order:
+        field, _, direction = order.partition("|")
+        prop = field.split(".", 1)[-1]
+        dns = sorted(dns, key=lambda dn: mit.mos[dn]["attrs"].get(prop, ""),
+                     reverse=direction == "desc")
+
+    total = len(dns)
+    page_size = one("page-size")
+    if page_size:
+        size = int(page_size)
+        start = int(one("page", "0")) * size
+        dns = dns[start:start + size]
+
+    mode = one("rsp-subtree")
+    rsp_classes = one("rsp-subtree-class")
+    rsp_classes = set(rsp_classes.split(",")) if rsp_classes else None
+    include = one("rsp-prop-include", "all")
+
+    imdata = [_render(mit, dn, mode, rsp_classes, include) for dn in dns]
+    return {"totalCount": str(total), "imdata": imdata}
+
+
+# -----------------------------
+# HTTP front end
+# -----------------------------
+class _Socket:
+    """Server end of one event websocket."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+
+    def send(self, opcode, payload):
+        with self.lock:
+            self.wfile.write(encode_frame(opcode, payload, mask=False))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "apic-sim"
+
+    def log_message(self, fmt, *args):  # keep stdout for the scripts
+        pass
+
+    @property
+    def sim(self):
+        return self.server.sim
+
+    def _reply(self, code, body, count=True):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if code == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+        if count:
+            self.sim._count(bytes_out=len(data))
+
+    def _error(self, code, text):
+        self._reply(code, {
+            "totalCount": "1",
+            "imdata": [{"error": {"attributes": {"code": str(code), "text": text}}}],
+        })
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length) if length else b""
+        self.sim._count(bytes_in=len(data))
+        return json.loads(data) if data else {}
+
+    def _token(self):
+        cookie = self.headers.get("Cookie", "")
+        m = re.search(r"APIC-cookie=([^;\s]+)", cookie)
+        return m.group(1) if m else None
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _websocket(self, token):
+        """Upgrade to a websocket and hold it until the client leaves."""
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key or not self.sim._valid(token):
+            return self._error(403, "Token was invalid (Error: Token timeout)")
+
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept_key(key))
+        self.end_headers()
+
+        sock = self.sim._open_socket(token, self.wfile)
+        try:
+            while True:
+                _, opcode, payload = read_frame(self.rfile)
+                if opcode == OP_PING:
+                    sock.send(OP_PONG, payload)
+                elif opcode == OP_CLOSE:
+                    sock.send(OP_CLOSE, b"")
+                    break
+        except (WebSocketClosed, OSError):
+            pass
+        finally:
+            self.sim._close_socket(token, sock)
+            self.close_connection = True
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        params = parse_qs(url.query, keep_blank_values=True)
+
+        if path == "/sim/stats.json":
+            return self._reply(200, self.sim.stats, count=False)
+        if path.startswith("/socket") and method == "GET":
+            self.sim._count(call=(method, "/socket"))
+            return self._websocket(path[len("/socket"):])
+
+        self.sim._count(call=(method, path))
+        if self.sim.latency:
+            time.sleep(self.sim.latency)
+        if not self.sim._admit():
+            # drain the body, or it is read as the next request on this connection
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            return self._error(429, "Too many requests")
+
+        try:
+            body = self._read_body() if method == "POST" else {}
+            if path == "/api/aaaLogin.json" and method == "POST":
+                return self._reply(200, self.sim._login(body))
+            if not self.sim._valid(self._token()):
+                return self._error(403, "Token was invalid (Error: Token timeout)")
+            if path == "/api/aaaRefresh.json":
+                return self._reply(200, self.sim._refresh(self._token()))
+            if path == "/api/subscriptionRefresh.json":
+                return self._reply(200, self.sim._refresh_subscription(params["id"][0]))
+            subscribe = params.get("subscription", [""])[0] == "yes"
+
+            m = re.fullmatch(r"/api/(?:node/)?mo/(.+)\.json", path)
+            if m and method == "POST":
+                self.sim.mit.post(m.group(1), body)
+                return self._reply(200, {"totalCount": "0", "imdata": []})
+            if m:
+                result = self.sim._query_mo(m.group(1), params)
+                if subscribe:
+                    matcher = self.sim._mo_matcher(m.group(1), params)
+                    self.sim._subscribe(self._token(), result, matcher)
+                return self._reply(200, result)
+
+            m = re.fullmatch(r"/api/(?:node/)?class/(\w+)\.json", path)
+            if m and method == "GET":
+                result = self.sim._query_class(m.group(1), params)
+                if subscribe:
+                    cls = m.group(1)
+                    self.sim._subscribe(self._token(), result, lambda c, dn: c == cls)
+                return self._reply(200, result)
+
+            return self._error(400, f"Unsupported request {method} {path}")
+        except ApicError as exc:
+            return self._error(exc.code, exc.text)
+        except (ValueError, KeyError, IndexError) as exc:
+            return self._error(400, f"Malformed request: {exc}")
+
+
+class ApicSimulator:
+    """In-memory APIC served over HTTP (see module docstring)."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, max_rps=None,
+                 token_timeout=TOKEN_TIMEOUT, users=None,
+                 subscription_timeout=SUBSCRIPTION_TIMEOUT):
+        self.latency = latency
+        self.max_rps = max_rps
+        self.token_timeout = token_timeout
+        self.subscription_timeout = subscription_timeout
+        self.users = users          # {"user": "password"}; None = accept any
+        self.mit = Mit()
+        self.tokens = {}            # token -> expiry (monotonic)
+        self._recent = deque()      # request times for the rps limit
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+        self.sockets = {}           # token -> _Socket
+        self.subscriptions = {}     # id -> {"token", "match", "expires"}
+        self._subs_lock = threading.Lock()
+        self._events = queue.Queue()
+        self.mit.listeners.append(self._events.put)
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.sim = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ---- lifecycle ----
+    def start(self):
+        """Serve on a background thread. Returns self."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._events.put(None)
+        self.drop_sockets()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def load(self, payload, dn="uni"):
+        """Seed the MIT with a POST-style payload without going through HTTP."""
+        return self.mit.post(dn, payload)
+
+    # ---- accounting ----
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {
+                "calls": 0,
+                "by_path": {},
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "throttled": 0,
+                "events_pushed": 0,
+            }
+
+    def _count(self, call=None, bytes_in=0, bytes_out=0):
+        with self._stats_lock:
+            if call:
+                method, path = call
+                kind = re.sub(r"/(?:node/)?(mo|class)/.*", r"/\1", path)
+                key = f"{method} {kind}"
+                self.stats["calls"] += 1
+                self.stats["by_path"][key] = self.stats["by_path"].get(key, 0) + 1
+            self.stats["bytes_in"] += bytes_in
+            self.stats["bytes_out"] += bytes_out
+
+    def _admit(self):
+        """Sliding one-second window; False means answer HTTP 429."""
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        with self._stats_lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_rps:
+                self.stats["throttled"] += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    # ---- authentication ----
+    def _issue(self):
+        token = secrets.token_hex(16)
+        self.tokens[token] = time.monotonic() + self.token_timeout
+        return {
+            "totalCount": "1",
+            "imdata": [{"aaaLogin": {"attributes": {
+                "token": token,
+                "refreshTimeoutSeconds": str(self.token_timeout),
+            }}}],
+        }
+
+    def _login(self, body):
+        attrs = body.get("aaaUser", {}).get("attributes", {})
+        if self.users is not None and self.users.get(attrs.get("name")) != attrs.get("pwd"):
+            raise ApicError(401, "Username or password is incorrect")
+        return self._issue()
+
+    def _valid(self, token):
+        expiry = self.tokens.get(token)
+        return expiry is not None and expiry > time.monotonic()
+
+    def _refresh(self, token):
+        self.tokens.pop(token, None)
+        return self._issue()
+
+    # ---- queries ----
+    def _query_mo(self, dn, params):
+        mit = self.mit
+        with mit.lock:
+            if dn not in mit.mos:
+                return {"totalCount": "0", "imdata": []}
+            target = params.get("query-target", ["self"])[0]
+            if target == "children":
+                dns = list(mit.children[dn])
+            elif target == "subtree":
+                dns = mit.subtree(dn)
+            else:
+                dns = [dn]
+            return run_query(mit, dns, params, scope_dn=None if target == "self" else dn)
+
+    def _query_class(self, cls, params):
+        with self.mit.lock:
+            dns = list(self.mit.by_class.get(cls, ()))
+            return run_query(self.mit, dns, params)
+
+    # ---- subscriptions ----
+    @staticmethod
+    def _mo_matcher(scope, params):
+        """
+        Predicate(cls, dn) for the objects an MO query covers. Scope and
+        target-subtree-class are honoured; query-target-filter is not.
+        """
+        target = params.get("query-target", ["self"])[0]
+        classes = params.get("target-subtree-class", [None])[0]
+        wanted = set(classes.split(",")) if classes and target != "self" else None
+
+        def match(cls, dn):
+            if target == "children":
+                inside = parent_dn(dn) == scope
+            elif target == "subtree":
+                inside = dn == scope or dn.startswith(scope + "/")
+            else:
+                inside = dn == scope
+            return inside and (wanted is None or cls in wanted)
+
+        return match
+
+    def _subscribe(self, token, result, match):
+        """Register a subscription and add its id to the query result."""
+        sub_id = str(secrets.randbits(63))  # APIC ids are 64-bit decimals
+        with self._subs_lock:
+            self.subscriptions[sub_id] = {
+                "token": token,
+                "match": match,
+                "expires": time.monotonic() + self.subscription_timeout,
+            }
+        result["subscriptionId"] = sub_id
+        return result
+
+    def _refresh_subscription(self, sub_id):
+        now = time.monotonic()
+        with self._subs_lock:
+            sub = self.subscriptions.get(sub_id)
+            if sub is None or sub["expires"] < now:
+                self.subscriptions.pop(sub_id, None)
+                raise ApicError(400, f"Subscription {sub_id} does not exist")
+            sub["expires"] = now + self.subscription_timeout
+        return {"totalCount": "0", "imdata": []}
+
+    def _open_socket(self, token, wfile):
+        sock = _Socket(wfile)
+        with self._subs_lock:
+            self.sockets[token] = sock
+        return sock
+
+    def _close_socket(self, token, sock):
+        with self._subs_lock:
+            if self.sockets.get(token) is sock:
+                del self.sockets[token]
+
+    def drop_sockets(self):
+        """Close every event websocket (clients see the server go away)."""
+        with self._subs_lock:
+            socks = list(self.sockets.values())
+        for sock in socks:
+            try:
+                sock.send(OP_CLOSE, b"")
+            except OSError:
+                pass
+
+    def _dispatch(self):
+        """Push queued MIT changes to the websockets of matching subscriptions."""
+        while True:
+            events = self._events.get()
+            if events is None:
+                return
+            now = time.monotonic()
+            outbox = []
+            with self._subs_lock:
+                for sub_id, sub in list(self.subscriptions.items()):
+                    if sub["expires"] < now:
+                        del self.subscriptions[sub_id]
+                        continue
+                    imdata = [{cls: {"attributes": attrs}}
+                              for cls, attrs in events if sub["match"](cls, attrs["dn"])]
+                    sock = self.sockets.get(sub["token"])
+                    if imdata and sock:
+                        outbox.append((sock, {"subscriptionId": [sub_id], "imdata": imdata}))
+
+            for sock, message in outbox:
+                data = json.dumps(message).encode()
+                try:
+                    sock.send(OP_TEXT, data)
+                except OSError:
+                    continue
+                self._count(bytes_out=len(data))
+                with self._stats_lock:
+                    self.stats["events_pushed"] += len(message["imdata"])
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local APIC simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every request")
+    parser.add_argument("--max-rps", type=int, default=None,
+                        help="answer HTTP 429 above this many requests per second")
+    parser.add_argument("--token-timeout", type=int, default=TOKEN_TIMEOUT)
+    parser.add_argument("--subscription-timeout", type=int, default=SUBSCRIPTION_TIMEOUT)
+    parser.add_argument("--load", action="append", default=[],
+                        help="JSON payload (or list of payloads) to seed the MIT with")
+    args = parser.parse_args()
+
+    sim = ApicSimulator(args.host, args.port, latency=args.latency,
+                        max_rps=args.max_rps, token_timeout=args.token_timeout,
+                        subscription_timeout=args.subscription_timeout)
+    for path in args.load:
+        with open(path) as f:
+            payloads = json.load(f)
+        for payload in payloads if isinstance(payloads, list) else [payloads]:
+            sim.load(payload)
+    print(f"[SIM] APIC simulator listening on {sim.url}", flush=True)
+    try:
+        sim.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SIM] stopped")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Incremental imdata parsing for large APIC responses.
+
+resp.json() holds the whole body, and every object in it, before the
+first object can be used. ImdataStream reads a response opened with
+stream=True chunk by chunk and yields each element of "imdata" as soon
+as its closing brace arrives, so at most one raw object (plus one chunk)
+is in memory at a time:
+
+    resp = session.get(url, stream=True, verify=False)
+    stream = ImdataStream(resp)
+    for item in stream:                 # {"fvAEPg": {"attributes": {...}}}
+        ...
+    stream.total_count                  # "totalCount", once it was read
+
+Outside the imdata array a small scanner tracks braces and brackets
+(skipping JSON strings and escapes) to find the "imdata" and "totalCount"
+keys at the top level. Inside it, each element is decoded with
+json.JSONDecoder.raw_decode as soon as it is complete.
+"""
+
+import codecs
+import json
+import re
+from itertools import chain
+
+# -----------------------------
+# Defaults
+# -----------------------------
+CHUNK_SIZE = 64 * 1024      # bytes read from the socket at a time
+
+_STRUCTURE = re.compile(r'["{}\[\]]')   # outside strings
+_IN_STRING = re.compile(r'["\\]')        # inside strings
+_SEPARATORS = re.compile(r'[\s,]*')       # between imdata items
+
+
+class ImdataStream:
+    """Iterator over the imdata items of a streamed APIC response."""
+
+    def __init__(self, resp, chunk_size=CHUNK_SIZE):
+        self.resp = resp
+        self.chunk_size = chunk_size
+        self.total_count = None
+        self.decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        try:
+            yield from self._scan(self._chunks())
+        finally:
+            self.resp.close()   # hand the connection back even if abandoned
+
+    def _chunks(self):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for chunk in self.resp.iter_content(chunk_size=self.chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def _scan(self, chunks):
+        buf = ""
+        pos = 0
+        depth = 0           # nesting level; 1 = inside the top-level object
+        in_string = False
+        str_start = 0       # where the current string started (its quote)
+        key = None          # last key read at depth 1
+        in_imdata = False   # between the [ and ] of the top-level "imdata"
+        retry_len = 0       # buffer length needed before re-trying a partial item
+
+        for chunk in chain(chunks, [None]):
+            if chunk is not None:
+                buf += chunk
+                if len(buf) < retry_len:
+                    continue
+            retry_len = 0
+
+            while True:
+                if in_imdata:
+                    # items: decoded in C, one at a time
+                    m = _SEPARATORS.match(buf, pos)
+                    pos = m.end()
+                    if pos == len(buf):
+                        break
+                    if buf[pos] == "]":
+                        in_imdata = False
+                        depth -= 1
+                        pos += 1
+                        continue
+                    try:
+                        item, pos = self.decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if chunk is None:
+                            raise       # the body ended inside an item
+                        # incomplete item: wait until the buffer has doubled,
+                        # so a large item is re-parsed only O(log n) times
+                        retry_len = pos + 2 * (len(buf) - pos)
+                        break
+                    yield item
+                    continue
+
+                if in_string:
+                    m = _IN_STRING.search(buf, pos)
+                    if m is None:
+                        pos = len(buf)
+                        break
+                    if m.group() == "\\":
+                        if m.end() >= len(buf):
+                            pos = m.start()     # escape split across chunks
+                            break
+                        pos = m.end() + 1
+                        continue
+                    in_string = False
+                    pos = m.end()
+                    if depth == 1:
+                        text = json.loads(buf[str_start:pos])
+                        if buf[:str_start].rstrip().endswith(("{", ",")):
+                            key = text
+                        elif key == "totalCount":
+                            self.total_count = text
+                    continue
+
+                m = _STRUCTURE.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                ch = m.group()
+                pos = m.end()
+                if ch == '"':
+                    in_string = True
+                    str_start = m.start()
+                elif ch in "{[":
+                    depth += 1
+                    if ch == "[" and depth == 2 and key == "imdata":
+                        in_imdata = True
+                else:
+                    depth -= 1
+
+            # drop what has been consumed (a partial item or string stays)
+            keep = str_start if in_string else pos
+            keep = max(0, keep - 64)
+            if keep:
+                buf = buf[keep:]
+                pos -= keep
+                str_start -= keep
+                if retry_len:
+                    retry_len -= keep
+
+        if in_imdata:
+            raise json.JSONDecodeError("imdata array not closed", buf, pos)
+
+
+def iter_imdata(resp, chunk_size=CHUNK_SIZE):
+    """Yield the imdata items of a response opened with stream=True."""
+    return iter(ImdataStream(resp, chunk_size))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Minimal websocket (RFC 6455) client for APIC event subscriptions.
+
+The APIC pushes subscription events over wss://<apic>/socket<token>.
+Only the standard library is used: text frames, fragmentation,
+ping/pong and close are handled; extensions are not negotiated.
+
+    ws = WebSocket(f"wss://{host}/socket{token}")
+    ws.connect()
+    while True:
+        event = json.loads(ws.recv())
+
+encode_frame() / read_frame() are shared with the simulator (apic_sim.py).
+"""
+
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+from urllib.parse import urlsplit
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketClosed(Exception):
+    """The peer closed the connection."""
+
+
+# -----------------------------
+# Framing
+# -----------------------------
+def accept_key(key):
+    """Sec-WebSocket-Accept value for a Sec-WebSocket-Key."""
+    digest = hashlib.sha1((key + GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def encode_frame(opcode, payload, mask):
+    """Build one final frame. Clients must mask, servers must not."""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", length)
+
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload, key):
+    # XOR with the repeated 4-byte key, done on big integers for speed
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    masked = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return masked.to_bytes(len(payload), "big")
+
+
+def _read_exact(rfile, n):
+    data = rfile.read(n)
+    if len(data) < n:
+        raise WebSocketClosed("connection closed mid-frame")
+    return data
+
+
+def read_frame(rfile):
+    """Read one frame from a file-like object. Returns (fin, opcode, payload)."""
+    b1, b2 = _read_exact(rfile, 2)
+    fin = bool(b1 & 0x80)
+    opcode = b1 & 0x0F
+    length = b2 & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", _read_exact(rfile, 2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", _read_exact(rfile, 8))
+    key = _read_exact(rfile, 4) if b2 & 0x80 else None
+    payload = _read_exact(rfile, length) if length else b""
+    if key:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+# -----------------------------
+# Client
+# -----------------------------
+class WebSocket:
+    """Blocking websocket client (ws:// and wss://)."""
+
+    def __init__(self, url, verify=False, timeout=None):
+        self.url = url
+        self.verify = verify
+        self.timeout = timeout
+        self.sock = None
+        self.rfile = None
+        self._send_lock = threading.Lock()
+
+    def connect(self):
+        parts = urlsplit(self.url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout=self.timeout)
+        if secure:
+            ctx = ssl.create_default_context()
+            if not self.verify:
+                ctx.check_hostname = False
+                ctx.verify_mode = ssl.CERT_NONE
+            sock = ctx.wrap_socket(sock, server_hostname=parts.hostname)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        status = self.rfile.readline().decode(errors="replace")
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode(errors="replace").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(key):
+            self.close()
+            raise ConnectionError(f"websocket handshake failed: {status.strip()}")
+        return self
+
+    def send(self, text):
+        with self._send_lock:
+            self.sock.sendall(encode_frame(OP_TEXT, text.encode(), mask=True))
+
+    def recv(self):
+        """
+        Next text message. Answers pings on the way; raises
+        WebSocketClosed when the server closes the connection.
+        """
+        message = b""
+        while True:
+            fin, opcode, payload = read_frame(self.rfile)
+            if opcode == OP_PING:
+                with self._send_lock:
+                    self.sock.sendall(encode_frame(OP_PONG, payload, mask=True))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.close()
+                raise WebSocketClosed("closed by server")
+            message += payload
+            if fin:
+                return message.decode()
+
+    def close(self):
+        if self.sock is None:
+            return
+        try:
+            with self._send_lock:
+                self.sock.sendall(encode_frame(OP_CLOSE, b"", mask=True))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        finally:
+            self.sock = None
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Benchmark the inventory builders against synthetic tenants.
+
+For each fabric size (EPGs per tenant) this script:
+
+- generates a canned fixture once (bench_fixtures/tenant-<n>.json):
+  one VRF, a BD per 20 EPGs (with a subnet), an App Profile per 100 EPGs,
+  a contract per 50 EPGs, every EPG bound to a BD and providing /
+  consuming one contract
+- serves it from the local APIC simulator (apic_sim.py) in a separate
+  process, so only the client side is measured
+- runs every benchmark case and records:
+    wall time (best of --repeat), HTTP calls, bytes transferred,
+    peak Python memory (tracemalloc, separate traced run)
+- writes a JSON report that can be compared with an earlier one
+
+Cases:
+    tenent_inventory.build_tenant_inventory
+    contracts_inventory.build_contract_inventory
+    list_epgs.get_epgs
+    list_epgs.iter_epgs
+    list_epgs.load_epgs             (compact __slots__ objects, apic_model)
+    list_epgs.iter_epgs[one page]   (one streamed response, apic_stream)
+    inventory_export.export_inventory   (streamed NDJSON rows to os.devnull)
+
+The scripts are imported as modules (they read their connection from
+APIC_URL / APIC_USER / APIC_PASS) and their APIC constant is pointed at
+the simulator.
+
+Usage:
+    python bench_inventory.py                          # 10, 1k, 50k EPGs
+    python bench_inventory.py --sizes 10 1000 --latency 0.005
+    python bench_inventory.py --compare bench_report.old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import requests
+
+from apic_client import ApicClient
+
+import contracts_inventory
+import inventory_export
+import list_epgs
+import tenent_inventory
+
+# -----------------------------
+# Defaults
+# -----------------------------
+TENANT = "BENCH"
+SIZES = [10, 1000, 50000]
+FIXTURE_DIR = "bench_fixtures"
+REPORT = "bench_report.json"
+
+CASES = {
+    "tenent_inventory.build_tenant_inventory":
+        lambda s: tenent_inventory.build_tenant_inventory(s, TENANT),
+    "contracts_inventory.build_contract_inventory":
+        lambda s: contracts_inventory.build_contract_inventory(s, TENANT),
+    "list_epgs.get_epgs":
+        lambda s: list_epgs.get_epgs(s),
+    "list_epgs.iter_epgs":
+        lambda s: sum(1 for _ in list_epgs.iter_epgs(s)),
+    "list_epgs.load_epgs":
+        lambda s: list_epgs.load_epgs(s),
+    "list_epgs.iter_epgs[one page]":
+        lambda s: sum(1 for _ in list_epgs.iter_epgs(s, page_size=10**7)),
+    "inventory_export.export_inventory":
+        lambda s: inventory_export.export_inventory(s, s.apic, os.devnull, "ndjson", TENANT),
+}
+
+
+# -----------------------------
+# Synthetic fixtures
+# -----------------------------
+def synthetic_tenant(n_epgs, tenant=TENANT):
+    """Return a POST-style fvTenant payload with n_epgs EPGs."""
+    n_bds = max(1, n_epgs // 20)
+    n_aps = max(1, n_epgs // 100)
+    n_contracts = max(1, n_epgs // 50)
+
+    children = [{"fvCtx": {"attributes": {"name": "BENCH-VRF"}}}]
+
+    for b in range(n_bds):
+        children.append({"fvBD": {
+            "attributes": {"name": f"BD-{b:05d}"},
+            "children": [
+                {"fvRsCtx": {"attributes": {"tnFvCtxName": "BENCH-VRF"}}},
+                {"fvSubnet": {"attributes": {
+                    "ip": f"10.{b // 256 % 256}.{b % 256}.1/24",
+                    "scope": "private",
+                }}},
+            ],
+        }})
+
+    for c in range(n_contracts):
+        children.append({"vzBrCP": {"attributes": {"name": f"Contract-{c:05d}"}}})
+
+    aps = [[] for _ in range(n_aps)]
+    for i in range(n_epgs):
+        aps[i % n_aps].append({"fvAEPg": {
+            "attributes": {"name": f"EPG-{i:06d}"},
+            "children": [
+                {"fvRsBd": {"attributes": {"tnFvBDName": f"BD-{i % n_bds:05d}"}}},
+                {"fvRsProv": {"attributes": {"tnVzBrCPName": f"Contract-{i % n_contracts:05d}"}}},
+                {"fvRsCons": {"attributes": {"tnVzBrCPName": f"Contract-{(i + 1) % n_contracts:05d}"}}},
+            ],
+        }})
+
+    for a, epgs in enumerate(aps):
+        children.append({"fvAp": {
+            "attributes": {"name": f"AP-{a:04d}"},
+            "children": epgs,
+        }})
+
+    return {"fvTenant": {
+        "attributes": {"dn": f"uni/tn-{tenant}", "name": tenant},
+        "children": children,
+    }}
+
+
+def fixture_path(n_epgs):
+    """Path of the canned fixture for a size, generated on first use."""
+    path = os.path.join(FIXTURE_DIR, f"tenant-{n_epgs}.json")
+    if not os.path.exists(path):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(synthetic_tenant(n_epgs), f)
+    return path
+
+
+# -----------------------------
+# Simulator process
+# -----------------------------
+def start_simulator(fixture, latency):
+    """Start apic_sim.py seeded with a fixture. Returns (process, url)."""
+    sim = os.path.join(os.path.dirname(os.path.abspath(__file__)), "apic_sim.py")
+    proc = subprocess.Popen(
+        [sys.executable, sim, "--port", "0", "--latency", str(latency), "--load", fixture],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = proc.stdout.readline()
+    if not line:
+        proc.kill()
+        raise RuntimeError("APIC simulator did not start")
+    return proc, line.strip().rsplit(" ", 1)[-1]
+
+
+def sim_stats(url):
+    return requests.get(f"{url}/sim/stats.json").json()
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def measure(session, url, case, repeat):
+    """Run one case; returns wall time, calls, bytes and peak memory."""
+    run = CASES[case]
+
+    best = None
+    for _ in range(repeat):
+        before = sim_stats(url)
+        start = time.perf_counter()
+        run(session)
+        wall = time.perf_counter() - start
+        after = sim_stats(url)
+        if best is None or wall < best[0]:
+            best = (
+                wall,
+                after["calls"] - before["calls"],
+                (after["bytes_out"] + after["bytes_in"])
+                - (before["bytes_out"] + before["bytes_in"]),
+            )
+
+    tracemalloc.start()
+    run(session)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    wall, calls, nbytes = best
+    return {
+        "wall_s": round(wall, 4),
+        "calls": calls,
+        "bytes": nbytes,
+        "peak_mem_bytes": peak,
+    }
+
+
+def run_benchmarks(sizes, latency, repeat, cases):
+    results = []
+    for n in sizes:
+        fixture = fixture_path(n)
+        proc, url = start_simulator(fixture, latency)
+        try:
+            for module in (tenent_inventory, contracts_inventory, list_epgs, inventory_export):
+                module.APIC = url
+            session = ApicClient(url, "bench", "bench")
+            session.login()
+
+            for case in cases:
+                row = {"case": case, "epgs": n}
+                row.update(measure(session, url, case, repeat))
+                results.append(row)
+                print(f"[BENCH] {case:46} {n:>6} EPGs  {row['wall_s']:>8.3f}s  "
+                      f"{row['calls']:>5} calls  {row['bytes']:>11} B  "
+                      f"peak {row['peak_mem_bytes'] / 1e6:8.1f} MB")
+        finally:
+            proc.terminate()
+            proc.wait()
+    return results
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def write_report(results, path, latency, repeat):
+    report = {
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "latency_s": latency,
+        "repeat": repeat,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[+] Report written to {path}")
+
+
+def print_comparison(results, old_path):
+    """Print per-case deltas against an earlier report."""
+    with open(old_path) as f:
+        old = {(r["case"], r["epgs"]): r for r in json.load(f)["results"]}
+
+    print(f"\n=== Compared with {old_path} ===")
+    for r in results:
+        prev = old.get((r["case"], r["epgs"]))
+        if not prev:
+            continue
+        ratio = r["wall_s"] / prev["wall_s"] if prev["wall_s"] else float("nan")
+        print(f"  {r['case']:46} {r['epgs']:>6} EPGs  "
+              f"time x{ratio:5.2f}  calls {prev['calls']} -> {r['calls']}  "
+              f"peak {prev['peak_mem_bytes'] / 1e6:.1f} -> {r['peak_mem_bytes'] / 1e6:.1f} MB")
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory builder benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated APIC latency per request (seconds)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="run only these cases (default: all)")
+    parser.add_argument("--report", default=REPORT)
+    parser.add_argument("--compare", help="earlier report to compare with")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.latency, args.repeat, args.case or list(CASES))
+    write_report(results, args.report, args.latency, args.repeat)
+    if args.compare:
+        print_comparison(results, args.compare)
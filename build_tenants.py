@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Build many tenants from a declarative spec (YAML or JSON).
+
+The spec describes each tenant's VRFs, BDs and subnets, App Profiles and
+EPGs, filters and contracts (see tenants.example.yaml):
+
+    defaults:                   # merged into every tenant
+      filters:
+        WEB-TO-APP-FILTER:
+          - {name: HTTP, port: 80}
+          - {name: HTTPS, port: 443}
+      contracts:
+        Web-To-App-Contract: WEB-TO-APP-FILTER
+    tenants:
+      - name: ACME
+        vrfs: [ACME-VRF]
+        bds:
+          - {name: ACME-Web-BD, vrf: ACME-VRF, subnets: [10.10.10.1/24]}
+        apps:
+          - name: Web_Tier
+            bd: ACME-Web-BD                 # default for the EPGs below
+            consumes: [Web-To-App-Contract]
+            epgs: [Web-Frontend, Public-Web]
+      - name: "CUST-{n:03}"     # 500 tenants; {n} and {tenant} are
+        count: 500              # filled in everywhere in the entry
+        ...
+
+Every tenant becomes one fvTenant tree that is planned against the live
+tenant and applied with a single POST (see apic_plan.py). The tenants
+are independent, so they are built concurrently, one call per tenant
+(see apic_async.py), over one pooled ApicClient whose scheduler keeps
+the write rate at what the APIC accepts (see apic_scheduler.py).
+
+Usage:
+    python build_tenants.py tenants.example.yaml --plan-only
+    python build_tenants.py tenants.json --workers 32 --prune
+
+YAML specs need PyYAML (pip install pyyaml); JSON specs need nothing.
+"""
+
+import argparse
+import json
+import os
+import re
+from functools import partial
+
+import urllib3
+
+from apic_async import run_phase
+from apic_client import ApicClient
+from apic_plan import apply_changes, diff_states, flatten_tree, print_plan, read_live
+from apic_scheduler import RequestScheduler
+from filter_compiler import compile_entries, dedupe_contract_filters, entry_attrs
+
+try:
+    import yaml
+except ImportError:  # JSON specs still work
+    yaml = None
+
+urllib3.disable_warnings()  # ignore self-signed cert warnings (lab use only)
+
+# -----------------------------
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
+# -----------------------------
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
+
+WORKERS = 16        # tenants built at the same time
+RATE_LIMIT = 20     # requests per second (None = no cap), see apic_scheduler.py
+
+# Classes --prune never deletes, e.g. ("fvAp", "fvAEPg")
+PRUNE_KEEP = ()
+
+
+def apic_login(workers=WORKERS):
+    """Log into APIC and return an authenticated session."""
+    scheduler = RequestScheduler(rate=RATE_LIMIT, max_concurrency=workers)
+    session = ApicClient(APIC, USER, PASS, pool_size=max(workers, 10),
+                         scheduler=scheduler)  # pooled, refreshes its token
+    resp = session.login()
+    print("[LOGIN] Status:", resp.status_code)
+    print("[+] Logged into APIC")
+    return session
+
+
+# -----------------------------
+# Spec loading
+# -----------------------------
+def load_spec(path):
+    """Read a YAML (.yaml / .yml) or JSON spec file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise SystemExit("PyYAML is needed for YAML specs: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+TEMPLATE_FIELD = re.compile(r"\{(n|tenant)(?::([^{}]*))?\}")   # {n}, {n:03}, {tenant}
+
+
+def _fill(value, **names):
+    """
+    Fill in the {n} / {tenant} templates (format specs such as {n:03}
+    allowed) in every string of a spec entry. Any other braces, e.g. in
+    a description, are left as they are.
+    """
+    if isinstance(value, str):
+        return TEMPLATE_FIELD.sub(
+            lambda m: format(names[m[1]], m[2] or "") if m[1] in names else m[0], value
+        )
+    if isinstance(value, list):
+        return [_fill(v, **names) for v in value]
+    if isinstance(value, dict):
+        return {_fill(k, **names): _fill(v, **names) for k, v in value.items()}
+    return value
+
+
+def expand_tenants(spec):
+    """
+    The spec's tenants as a list of tenant dicts: defaults merged in
+    (tenant keys win) and `count` entries expanded into numbered copies.
+    """
+    defaults = spec.get("defaults", {})
+    tenants = []
+    for entry in spec.get("tenants", []):
+        entry = {**defaults, **entry}
+        count = entry.pop("count", None)
+        if count is None:
+            tenants.append(entry)
+            continue
+        start = entry.pop("start", 1)
+        for n in range(start, start + count):
+            name = _fill(entry["name"], n=n)
+            tenants.append(_fill(entry, n=n, tenant=name))
+
+    names = [t["name"] for t in tenants]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Tenants defined more than once: {', '.join(duplicates)}")
+    return tenants
+
+
+def normalize_tenant(tenant):
+    """
+    Expand the short forms of one tenant entry and check its references:
+
+    subnets   "10.0.0.1/24" or {ip, scope}            (scope: public)
+    epgs      "name" or {name, bd, provides, consumes} (App Profile defaults)
+    filters   {name: [{name, port} or {name, from, to, prot}, ...]}, port
+              ranges merged and repeats within a contract dropped
+              (see filter_compiler.py)
+    contracts {name: filter, [filter, ...] or {filters, scope}}
+    """
+    name = tenant["name"]
+    vrfs = list(tenant.get("vrfs", []))
+
+    bds = []
+    for bd in tenant.get("bds", []):
+        subnets = [
+            {"ip": s, "scope": "public"} if isinstance(s, str) else {"scope": "public", **s}
+            for s in bd.get("subnets", [])
+        ]
+        if bd.get("vrf") not in vrfs:
+            raise ValueError(f"{name}: BD {bd['name']} uses unknown VRF {bd.get('vrf')}")
+        bds.append({"name": bd["name"], "vrf": bd["vrf"], "subnets": subnets})
+
+    filters = {
+        filter_name: compile_entries(entries)
+        for filter_name, entries in tenant.get("filters", {}).items()
+    }
+
+    contracts = {}
+    for contract_name, value in tenant.get("contracts", {}).items():
+        if isinstance(value, str):
+            value = {"filters": [value]}
+        elif isinstance(value, list):
+            value = {"filters": value}
+        for filter_name in value["filters"]:
+            if filter_name not in filters:
+                raise ValueError(f"{name}: contract {contract_name} uses unknown filter {filter_name}")
+        contracts[contract_name] = {"filters": list(value["filters"]), "scope": value.get("scope")}
+    filters = dedupe_contract_filters(filters, {c: v["filters"] for c, v in contracts.items()})
+
+    bd_names = {bd["name"] for bd in bds}
+    apps = []
+    for app in tenant.get("apps", []):
+        epgs = []
+        for epg in app.get("epgs", []):
+            if isinstance(epg, str):
+                epg = {"name": epg}
+            epg = {
+                "name": epg["name"],
+                "bd": epg.get("bd", app.get("bd")),
+                "provides": list(epg.get("provides", app.get("provides", []))),
+                "consumes": list(epg.get("consumes", app.get("consumes", []))),
+            }
+            if epg["bd"] not in bd_names:
+                raise ValueError(f"{name}: EPG {epg['name']} uses unknown BD {epg['bd']}")
+            for contract_name in epg["provides"] + epg["consumes"]:
+                if contract_name not in contracts:
+                    raise ValueError(f"{name}: EPG {epg['name']} uses unknown contract {contract_name}")
+            epgs.append(epg)
+        apps.append({"name": app["name"], "epgs": epgs})
+
+    return {"name": name, "vrfs": vrfs, "bds": bds, "filters": filters,
+            "contracts": contracts, "apps": apps}
+
+
+# -----------------------------
+# Tenant tree
+# -----------------------------
+def build_spec_tree(tenant):
+    """One fvTenant payload tree for a normalized tenant."""
+    children = [{"fvCtx": {"attributes": {"name": vrf}}} for vrf in tenant["vrfs"]]
+
+    for bd in tenant["bds"]:
+        children.append({
+            "fvBD": {
+                "attributes": {"name": bd["name"]},
+                "children": [
+                    {"fvRsCtx": {"attributes": {"tnFvCtxName": bd["vrf"]}}}
+                ] + [
+                    {"fvSubnet": {"attributes": {"ip": s["ip"], "scope": s["scope"]}}}
+                    for s in bd["subnets"]
+                ]
+            }
+        })
+
+    for filter_name, entries in tenant["filters"].items():
+        children.append({
+            "vzFilter": {
+                "attributes": {"name": filter_name},
+                "children": [
+                    {"vzEntry": {"attributes": entry_attrs(e)}}
+                    for e in entries
+                ]
+            }
+        })
+
+    for contract_name, contract in tenant["contracts"].items():
+        attrs = {"name": contract_name}
+        if contract["scope"]:
+            attrs["scope"] = contract["scope"]
+        children.append({
+            "vzBrCP": {
+                "attributes": attrs,
+                "children": [{
+                    "vzSubj": {
+                        "attributes": {"name": f"{contract_name}-Subj"},
+                        "children": [
+                            {"vzRsSubjFiltAtt": {"attributes": {"tnVzFilterName": f}}}
+                            for f in contract["filters"]
+                        ]
+                    }
+                }]
+            }
+        })
+
+    for app in tenant["apps"]:
+        epgs = []
+        for epg in app["epgs"]:
+            rels = [{"fvRsBd": {"attributes": {"tnFvBDName": epg["bd"]}}}]
+            rels += [{"fvRsProv": {"attributes": {"tnVzBrCPName": c}}} for c in epg["provides"]]
+            rels += [{"fvRsCons": {"attributes": {"tnVzBrCPName": c}}} for c in epg["consumes"]]
+            epgs.append({"fvAEPg": {"attributes": {"name": epg["name"]}, "children": rels}})
+        children.append({"fvAp": {"attributes": {"name": app["name"]}, "children": epgs}})
+
+    return {
+        "fvTenant": {
+            "attributes": {"dn": f"uni/tn-{tenant['name']}", "name": tenant["name"]},
+            "children": children
+        }
+    }
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def build_tenant(session, tree, prune=False, apply=True):
+    """
+    Plan one tenant tree against the live tenant and (with apply=True)
+    POST the differences. Returns {"tenant", "changes", "status", "error"}.
+    """
+    desired = flatten_tree(tree)
+    root_dn = next(iter(desired))
+    result = {"tenant": tree["fvTenant"]["attributes"]["name"],
+              "changes": [], "status": None, "error": None}
+
+    live = read_live(session, APIC, root_dn, {cls for cls, _ in desired.values()} | {"vzEntry"})
+    # a filter's entries are all in the spec: stale ones go even without --prune
+    result["changes"] = diff_states(desired, live, prune=prune, keep=PRUNE_KEEP,
+                                    owned=("vzEntry",))
+    if apply and result["changes"]:
+        resp = apply_changes(session, APIC, result["changes"], root_dn, desired, live)
+        result["status"] = resp.status_code
+        if resp.status_code >= 300:
+            result["error"] = resp.text
+    return result
+
+
+def build_tenants(session, tenants, workers=WORKERS, prune=False, apply=True):
+    """
+    Build normalized tenants concurrently, one call per tenant.
+    Returns one result per tenant, in spec order.
+    """
+    calls = [
+        partial(build_tenant, session, build_spec_tree(t), prune=prune, apply=apply)
+        for t in tenants
+    ]
+    results = run_phase(calls, concurrency=workers)
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):  # run_phase already printed it
+            results[i] = {"tenant": tenants[i]["name"], "changes": [],
+                          "status": None, "error": str(result)}
+    return results
+
+
+def print_build_summary(results):
+    """Print one row per tenant, then every failure together."""
+    print(f"  {'Tenant':24}  {'Add':>5}  {'Change':>6}  {'Destroy':>7}  HTTP")
+    print(f"  {'-' * 24}  {'-' * 5}  {'-' * 6}  {'-' * 7}  ----")
+    for r in results:
+        counts = [sum(1 for c in r["changes"] if c[0] == a) for a in ("create", "update", "delete")]
+        status = r["status"] if r["status"] is not None else ("ERR" if r["error"] else "-")
+        print(f"  {r['tenant']:24}  {counts[0]:>5}  {counts[1]:>6}  {counts[2]:>7}  {status}")
+
+    failures = [r for r in results if r["error"]]
+    converged = sum(1 for r in results if not r["changes"] and not r["error"])
+    print(f"\n  {len(results)} tenants: {len(results) - len(failures)} ok "
+          f"({converged} already converged), {len(failures)} failed")
+    if failures:
+        print("\n[!] Failed tenants:")
+        for r in failures:
+            print(f"  - {r['tenant']}: {r['error']}")
+    return failures
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build tenants from a YAML/JSON spec")
+    parser.add_argument("spec", help="spec file (.yaml, .yml or .json)")
+    parser.add_argument("--tenant", action="append", default=[],
+                        help="only build these tenants (repeatable)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="tenants built at the same time")
+    parser.add_argument("--plan-only", action="store_true",
+                        help="print each tenant's plan without applying it")
+    parser.add_argument("--prune", action="store_true",
+                        help="also delete objects of the managed classes missing from the spec")
+    args = parser.parse_args()
+
+    tenants = [normalize_tenant(t) for t in expand_tenants(load_spec(args.spec))]
+    if args.tenant:
+        tenants = [t for t in tenants if t["name"] in args.tenant]
+    print(f"[SPEC] {args.spec}: {len(tenants)} tenants")
+
+    session = apic_login(args.workers)
+
+    print(f"\n=== Build {len(tenants)} tenants ({args.workers} workers) ===")
+    results = build_tenants(session, tenants, workers=args.workers,
+                            prune=args.prune, apply=not args.plan_only)
+
+    if args.plan_only:
+        for r in results:
+            print(f"\n=== Plan: {r['tenant']} ===")
+            print_plan(r["changes"])
+
+    print("\n=== Summary ===")
+    print_build_summary(results)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Contract policy graph: consumer EPG -> contract -> provider EPG.
+
+Built from the contract inventory (contracts_inventory.py) plus the
+filters of every contract, it answers security-review questions without
+spreadsheets:
+
+    graph = ContractGraph.from_inventory(inv, contract_filters)
+    graph.can_reach("Web_Tier/Web-Frontend", "Application_Tier/App-Logic")
+        -> {"Web-To-App-Contract": ["WEB-TO-APP-FILTER"]}
+    graph.reachers_of("DB-Main")
+        -> ["Application_Tier/API-Server-App", ...]
+
+EPGs and contracts are numbered once and the relations are kept as int
+bitsets (one per contract for its providers and consumers, one per EPG
+for the contracts it provides and consumes), so a query is a few
+big-integer ANDs / ORs.
+
+"A reaches B" means A consumes a contract that B provides, i.e. A may
+open connections to B (the return traffic is allowed by the contract).
+Contract scope, vzAny and preferred groups are not modelled.
+
+Usage:
+    python contract_graph.py --can-reach Web-Frontend DB-Main
+    python contract_graph.py --reachers DB-Main
+"""
+
+import argparse
+import os
+
+import urllib3
+
+from apic_client import ApicClient
+from apic_dn import dn_names
+from contracts_inventory import build_contract_inventory
+
+urllib3.disable_warnings()
+
+# -----------------------------
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
+# -----------------------------
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
+TENANT = "ACME"               # <-- tenant to inspect
+
+
+def apic_login():
+    """Log into APIC and return an authenticated session."""
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
+    print(f"[+] Logged into APIC as {USER}")
+    return session
+
+
+FILTER_RELATIONS = ("vzRsSubjFiltAtt", "vzRsFiltAtt")  # subject / vzInTerm + vzOutTerm
+
+
+def get_contract_filters(session, apic, tenant):
+    """
+    {contract_name: [filter_name, ...]} for every contract of the tenant,
+    from one subtree query for the filter relations: those of the subject
+    itself and those of its consumer -> provider (vzInTerm) and provider
+    -> consumer (vzOutTerm) terms.
+    """
+    url = (
+        f"{apic}/api/node/mo/uni/tn-{tenant}.json"
+        f"?query-target=subtree&target-subtree-class=vzBrCP,{','.join(FILTER_RELATIONS)}"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+
+    filters = {}
+    for item in resp.json().get("imdata", []):
+        for cls, body in item.items():
+            attrs = body["attributes"]
+            contract = dn_names(attrs["dn"]).get("vzBrCP")
+            names = filters.setdefault(contract, [])
+            if cls in FILTER_RELATIONS and attrs.get("tnVzFilterName") not in names:
+                names.append(attrs["tnVzFilterName"])
+    return filters
+
+
+def _bits(mask):
+    """Indexes of the set bits of an int, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# -----------------------------
+# Graph
+# -----------------------------
+class ContractGraph:
+    """EPG reachability through contracts, on int bitsets."""
+
+    def __init__(self, epgs, contract_filters=None):
+        """
+        epgs: iterable of (app, epg, provides, consumes)
+        contract_filters: {contract: [filter, ...]}
+        """
+        self.contract_filters = contract_filters or {}
+        self.epgs = []          # index -> "app/epg"
+        self.epg_index = {}     # "app/epg" -> index
+        self.by_name = {}       # "epg" -> [index, ...]
+        self.contracts = []     # index -> contract name
+        self.contract_index = {}
+
+        self.providers = []     # contract index -> EPG bitset
+        self.consumers = []
+        self.provides = []      # EPG index -> contract bitset
+        self.consumes = []
+
+        for app, epg, provides, consumes in epgs:
+            e = self._add_epg(app, epg)
+            for name in provides:
+                c = self._add_contract(name)
+                self.providers[c] |= 1 << e
+                self.provides[e] |= 1 << c
+            for name in consumes:
+                c = self._add_contract(name)
+                self.consumers[c] |= 1 << e
+                self.consumes[e] |= 1 << c
+
+    @classmethod
+    def from_inventory(cls, inv, contract_filters=None):
+        """Graph of a build_contract_inventory() result."""
+        return cls(
+            ((app, e["epg"], e["provides"], e["consumes"])
+             for app, epgs in inv["apps"].items() for e in epgs),
+            contract_filters,
+        )
+
+    def _add_epg(self, app, epg):
+        key = f"{app}/{epg}"
+        if key not in self.epg_index:
+            self.epg_index[key] = len(self.epgs)
+            self.epgs.append(key)
+            self.by_name.setdefault(epg, []).append(self.epg_index[key])
+            self.provides.append(0)
+            self.consumes.append(0)
+        return self.epg_index[key]
+
+    def _add_contract(self, name):
+        if name not in self.contract_index:
+            self.contract_index[name] = len(self.contracts)
+            self.contracts.append(name)
+            self.providers.append(0)
+            self.consumers.append(0)
+        return self.contract_index[name]
+
+    def index_of(self, epg):
+        """Index of "app/epg", or of a bare EPG name if it is unique."""
+        if epg in self.epg_index:
+            return self.epg_index[epg]
+        matches = self.by_name.get(epg, [])
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise KeyError(f"EPG {epg} is ambiguous: {', '.join(self.epgs[i] for i in matches)}")
+        raise KeyError(f"Unknown EPG {epg}")
+
+    # ---- queries ----
+    def can_reach(self, source, target):
+        """
+        Contracts (with their filters) that let source open connections to
+        target: {contract: [filter, ...]}, empty if it cannot reach it.
+        """
+        shared = self.consumes[self.index_of(source)] & self.provides[self.index_of(target)]
+        return {
+            self.contracts[c]: self.contract_filters.get(self.contracts[c], [])
+            for c in _bits(shared)
+        }
+
+    def reachers_of(self, target):
+        """EPGs ("app/epg") that can open connections to target."""
+        mask = 0
+        for c in _bits(self.provides[self.index_of(target)]):
+            mask |= self.consumers[c]
+        return [self.epgs[e] for e in _bits(mask)]
+
+    def reachable_from(self, source):
+        """EPGs ("app/epg") that source can open connections to."""
+        mask = 0
+        for c in _bits(self.consumes[self.index_of(source)]):
+            mask |= self.providers[c]
+        return [self.epgs[e] for e in _bits(mask)]
+
+    def edges(self):
+        """Every (consumer, contract, provider) triple."""
+        for c, name in enumerate(self.contracts):
+            for cons in _bits(self.consumers[c]):
+                for prov in _bits(self.providers[c]):
+                    yield self.epgs[cons], name, self.epgs[prov]
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query EPG reachability through contracts")
+    parser.add_argument("--tenant", default=TENANT)
+    parser.add_argument("--can-reach", nargs=2, metavar=("SOURCE", "TARGET"),
+                        help="can SOURCE open connections to TARGET, and on which filters")
+    parser.add_argument("--reachers", metavar="EPG", help="everything that can reach EPG")
+    parser.add_argument("--reachable", metavar="EPG", help="everything EPG can reach")
+    args = parser.parse_args()
+
+    sess = apic_login()
+    graph = ContractGraph.from_inventory(build_contract_inventory(sess, args.tenant, apic=APIC),
+                                         get_contract_filters(sess, APIC, args.tenant))
+    print(f"[+] {len(graph.epgs)} EPGs, {len(graph.contracts)} contracts")
+
+    if args.can_reach:
+        source, target = args.can_reach
+        allowed = graph.can_reach(source, target)
+        if not allowed:
+            print(f"\n{source} cannot reach {target}")
+        for contract, filters in allowed.items():
+            print(f"\n{source} -> {target} via {contract}: {', '.join(filters) or '(no filters)'}")
+    if args.reachers:
+        print(f"\nCan reach {args.reachers}:")
+        for epg in graph.reachers_of(args.reachers) or ["(nothing)"]:
+            print(f"  - {epg}")
+    if args.reachable:
+        print(f"\nReachable from {args.reachable}:")
+        for epg in graph.reachable_from(args.reachable) or ["(nothing)"]:
+            print(f"  - {epg}")
+    if not (args.can_reach or args.reachers or args.reachable):
+        print()
+        for consumer, contract, provider in graph.edges():
+            print(f"  {consumer} -> {provider}  [{contract}]")
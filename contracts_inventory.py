@@ -9,20 +9,34 @@ For a given tenant (default: ACME), this script:
     - Provided contracts (fvRsProv)
     - Consumed contracts (fvRsCons)
 - Prints a summary: App Profile -> EPG -> Provides / Consumes
+
+EPGs and their contract relations are fetched with a single tenant-scoped
+subtree query and joined by DN, so the call count does not grow with the
+number of EPGs.
 """
 
-import requests
+import os
+
 import urllib3
 
+from apic_client import ApicClient
+from apic_dn import DnIndex, dn_names
+from apic_model import Mo, from_item
+from apic_stream import iter_imdata
+from mo_cache import MoCache
+
 urllib3.disable_warnings()
 
 # -----------------------------
-# APIC connection parameters
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
 # -----------------------------
-APIC = api url
-USER = 'username'
-PASS = 'password'
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
 TENANT = "Heroes"               # <-- tenant to inspect
+MO_CACHE = None                 # e.g. ".apic_cache.sqlite" to reuse objects across runs
+
+RELATION_CLASSES = ("fvAEPg", "fvRsProv", "fvRsCons")
 
 
 # -----------------------------
@@ -30,24 +44,9 @@ TENANT = "Heroes"               # <-- tenant to inspect
 # -----------------------------
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print(f"[+] Logged into APIC as {USER}")
     return session
 
@@ -79,23 +78,23 @@ def get_epgs(session, tenant):
         dn = attrs["dn"]
         name = attrs["name"]
 
-        # DN format: uni/tn-ACME/ap-<App>/epg-<EPG>
-        parts = dn.split("/")
-        app_name = None
-        for p in parts:
-            if p.startswith("ap-"):
-                app_name = p[3:]  # strip 'ap-'
-                break
-
         epgs.append({
             "name": name,
             "dn": dn,
-            "app": app_name or "(unknown-app)"
+            "app": app_from_dn(dn)
         })
 
     return epgs
 
 
+def app_from_dn(dn):
+    """
+    Return the App Profile name from an EPG DN.
+    DN format: uni/tn-ACME/ap-<App>/epg-<EPG>
+    """
+    return dn_names(dn).get("fvAp", "(unknown-app)")
+
+
 def get_epg_contracts(session, epg_dn):
     """
     For a given EPG DN, retrieve lists of:
@@ -128,10 +127,78 @@ def get_epg_contracts(session, epg_dn):
     return sorted(provided), sorted(consumed)
 
 
+def get_tenant_contract_relations(session, tenant, cache=None, apic=None):
+    """
+    One tenant-scoped query for every EPG and every fvRsProv / fvRsCons
+    relation below it (or, with an MoCache, one revalidation per class).
+    apic overrides the module's APIC URL.
+
+    Returns list of dicts (in EPG order):
+        {
+          "name":     <EPG name>,
+          "dn":       <EPG DN>,
+          "app":      <App profile name>,
+          "provides": [...],
+          "consumes": [...]
+        }
+    """
+    apic = apic or APIC
+    if cache is not None:
+        items = []
+        for cls in RELATION_CLASSES:
+            items.extend(cache.refresh(session, apic, cls, scope_dn=f"uni/tn-{tenant}"))
+        return join_contract_relations(items)
+
+    url = (
+        f"{apic}/api/node/mo/uni/tn-{tenant}.json"
+        f"?query-target=subtree&target-subtree-class={','.join(RELATION_CLASSES)}"
+    )
+    resp = session.get(url, stream=True, verify=False)
+    resp.raise_for_status()
+    # parsed one object at a time and kept as compact model objects
+    return join_contract_relations(from_item(item) for item in iter_imdata(resp))
+
+
+def join_contract_relations(items):
+    """
+    Join fvRsProv / fvRsCons objects to their fvAEPg through a DN index.
+    items are imdata items or apic_model objects. Returns the list
+    described in get_tenant_contract_relations.
+    """
+    epgs = {}        # EPG dn -> EPG dict
+    index = DnIndex()
+    provided = {}    # EPG dn -> set of contract names
+    consumed = {}
+
+    for item in items:
+        mo = item if isinstance(item, Mo) else from_item(item)
+        if mo.cls == "fvAEPg":
+            epgs[mo.dn] = {
+                "name": mo.name,
+                "dn": mo.dn,
+                "app": app_from_dn(mo.dn)
+            }
+            index.add(mo.dn, "fvAEPg")
+            continue
+
+        for cls, target in (("fvRsProv", provided), ("fvRsCons", consumed)):
+            if mo.cls == cls and mo.tnVzBrCPName:
+                index.add(mo.dn, cls)
+                epg_dn = index.ancestor(mo.dn, "fvAEPg")
+                target.setdefault(epg_dn, set()).add(mo.tnVzBrCPName)
+
+    result = []
+    for dn, epg in epgs.items():
+        epg["provides"] = sorted(provided.get(dn, ()))
+        epg["consumes"] = sorted(consumed.get(dn, ()))
+        result.append(epg)
+    return result
+
+
 # -----------------------------
 # Build inventory
 # -----------------------------
-def build_contract_inventory(session, tenant):
+def build_contract_inventory(session, tenant, cache=None, apic=None):
     """
     Build structure:
     {
@@ -149,20 +216,21 @@ def build_contract_inventory(session, tenant):
         "Database_Tier": [...]
       }
     }
+
+    apic overrides the module's APIC URL.
     """
     inv = {
         "tenant": tenant,
         "apps": {}
     }
 
-    epgs = get_epgs(session, tenant)
+    epgs = get_tenant_contract_relations(session, tenant, cache, apic)
 
     for epg in epgs:
         app = epg["app"]
         epg_name = epg["name"]
-        epg_dn = epg["dn"]
-
-        provides, consumes = get_epg_contracts(session, epg_dn)
+        provides = epg["provides"]
+        consumes = epg["consumes"]
 
         if app not in inv["apps"]:
             inv["apps"][app] = []
@@ -208,5 +276,9 @@ def print_contract_inventory(inv):
 # -----------------------------
 if __name__ == "__main__":
     sess = apic_login()
-    inventory = build_contract_inventory(sess, TENANT)
+    if MO_CACHE:
+        with MoCache(MO_CACHE) as cache:
+            inventory = build_contract_inventory(sess, TENANT, cache)
+    else:
+        inventory = build_contract_inventory(sess, TENANT)
     print_contract_inventory(inventory)
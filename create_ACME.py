@@ -10,9 +10,13 @@ Creates:
 - EPGs in each App Profile, all attached to ACME-BD
 """
 
-import requests
+from functools import partial
+
 import urllib3
 
+from apic_async import print_line, run_phase
+from apic_client import ApicClient
+
 urllib3.disable_warnings()  # ignore self-signed cert warnings (lab use only)
 
 # -----------------------------
@@ -30,6 +34,8 @@ WEB_APP = "Web_Tier"
 APP_APP = "Application_Tier"
 DB_APP  = "Database_Tier"
 
+CONCURRENCY = 8     # independent writes in flight at once (see apic_async.py)
+
 
 # EPG sets
 WEB_EPGS = [
@@ -63,26 +69,9 @@ DB_EPGS = [
 
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    if resp.status_code != 200:
-        print("[LOGIN] Body:", resp.text)
-        resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print("[+] Logged into APIC")
     return session
 
@@ -102,9 +91,9 @@ def create_tenant(session, tenant_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[TENANT] '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[TENANT] '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -124,9 +113,9 @@ def create_vrf(session, tenant_name, vrf_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[VRF] '{vrf_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[VRF] '{vrf_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -161,9 +150,9 @@ def create_bd(session, tenant_name, bd_name, vrf_name=None):
         )
 
     resp = session.post(url, json=bd, verify=False)
-    print(f"[BD] '{bd_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[BD] '{bd_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -183,9 +172,9 @@ def create_app_profile(session, tenant_name, app_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[APP] '{app_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[APP] '{app_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -216,9 +205,9 @@ def create_epg(session, tenant_name, app_name, epg_name, bd_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[EPG] '{epg_name}' in '{app_name}' -> HTTP {resp.status_code}")
+    print_line(f"[EPG] '{epg_name}' in '{app_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -234,20 +223,16 @@ if __name__ == "__main__":
     create_bd(session, TENANT, BD_NAME, vrf_name=VRF_NAME)
 
     print("\n=== Creating App Profiles ===")
-    create_app_profile(session, TENANT, WEB_APP)
-    create_app_profile(session, TENANT, APP_APP)
-    create_app_profile(session, TENANT, DB_APP)
-
-    print("\n=== Creating Web Tier EPGs ===")
-    for epg in WEB_EPGS:
-        create_epg(session, TENANT, WEB_APP, epg, BD_NAME)
-
-    print("\n=== Creating Application Tier EPGs ===")
-    for epg in APP_EPGS:
-        create_epg(session, TENANT, APP_APP, epg, BD_NAME)
-
-    print("\n=== Creating Database Tier EPGs ===")
-    for epg in DB_EPGS:
-        create_epg(session, TENANT, DB_APP, epg, BD_NAME)
+    run_phase([
+        partial(create_app_profile, session, TENANT, app)
+        for app in (WEB_APP, APP_APP, DB_APP)
+    ], CONCURRENCY)
+
+    print("\n=== Creating EPGs (all tiers in parallel) ===")
+    run_phase([
+        partial(create_epg, session, TENANT, app, epg, BD_NAME)
+        for app, epgs in ((WEB_APP, WEB_EPGS), (APP_APP, APP_EPGS), (DB_APP, DB_EPGS))
+        for epg in epgs
+    ], CONCURRENCY)
 
     print("\n[✓] ACME build complete: Tenant, VRF, BD, App Profiles, and EPGs created and bound to ACME-BD.")
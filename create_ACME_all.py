@@ -17,11 +17,23 @@ Creates:
     - Web EPGs bound to ACME-Web-BD
     - App EPGs bound to ACME-App-BD
     - DB EPGs bound to ACME-DB-BD
+
+With SINGLE_TRANSACTION = True the whole tenant is assembled in memory
+and pushed to /api/mo/uni.json in one POST instead of one POST per object.
+With PLAN = True that tree is first diffed against the live tenant (see
+apic_plan.py) and only the differences are POSTed; a converged tenant
+costs one GET and no writes.
 """
 
-import requests
+from functools import partial
+
 import urllib3
 
+from apic_async import print_line, run_phase
+from apic_client import ApicClient
+from apic_plan import plan_and_apply
+from apic_scheduler import RequestScheduler
+
 urllib3.disable_warnings()  # ignore self-signed cert warnings (lab use only)
 
 # -----------------------------
@@ -46,6 +58,21 @@ WEB_APP = "Web_Tier"
 APP_APP = "Application_Tier"
 DB_APP  = "Database_Tier"
 
+# One POST for the whole tenant tree (False = one POST per object)
+SINGLE_TRANSACTION = True
+
+# Diff the tenant tree against the live tenant and POST only what changed
+PLAN = True
+PLAN_ONLY = False   # print the plan without applying it
+PRUNE = False       # also delete VRFs, BDs, subnets, APs and EPGs not listed here
+
+# Per-object mode: independent writes in flight at once (see apic_async.py)
+CONCURRENCY = 8
+
+# Request scheduling (see apic_scheduler.py): rate cap, in-flight requests
+# adapted to 429/503 answers and latency, retries with jittered backoff
+RATE_LIMIT = 20     # requests per second (None = no cap)
+
 # EPG sets
 WEB_EPGS = [
     "Web-Frontend",
@@ -77,24 +104,10 @@ DB_EPGS = [
 # -----------------------------
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    scheduler = RequestScheduler(rate=RATE_LIMIT, max_concurrency=CONCURRENCY)
+    session = ApicClient(APIC, USER, PASS, scheduler=scheduler)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print("[+] Logged into APIC")
     return session
 
@@ -114,9 +127,9 @@ def ensure_tenant(session, tenant_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[TENANT] '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[TENANT] '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -135,9 +148,9 @@ def ensure_vrf(session, tenant_name, vrf_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[VRF] '{vrf_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[VRF] '{vrf_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -177,9 +190,9 @@ def ensure_bd_with_subnet(session, tenant_name, bd_name, vrf_name, subnet_ip):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[BD] '{bd_name}' ({subnet_ip}) -> HTTP {resp.status_code}")
+    print_line(f"[BD] '{bd_name}' ({subnet_ip}) -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -198,9 +211,9 @@ def ensure_app_profile(session, tenant_name, app_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[APP] '{app_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
+    print_line(f"[APP] '{app_name}' in '{tenant_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
@@ -230,42 +243,182 @@ def ensure_epg(session, tenant_name, app_name, epg_name, bd_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[EPG] '{epg_name}' -> BD '{bd_name}' -> HTTP {resp.status_code}")
+    print_line(f"[EPG] '{epg_name}' -> BD '{bd_name}' -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
-        print(resp.text)
+        print_line(resp.text)
     return resp
 
 
 # -----------------------------
-# Main build sequence
+# Single-transaction build
 # -----------------------------
-if __name__ == "__main__":
-    session = apic_login()
+def build_tenant_tree(tenant_name, vrf_name, bds, apps):
+    """
+    Assemble the whole tenant as one fvTenant tree:
+
+    bds:  list of (bd_name, subnet_ip) tuples, every BD linked to vrf_name
+    apps: list of (app_name, bd_name, [epg_name, ...]) tuples
+
+    Only the tenant carries a dn; APIC derives the children's DNs
+    from their naming properties.
+    """
+    children = [
+        {
+            "fvCtx": {
+                "attributes": {
+                    "name": vrf_name
+                }
+            }
+        }
+    ]
+
+    for bd_name, subnet_ip in bds:
+        children.append(
+            {
+                "fvBD": {
+                    "attributes": {
+                        "name": bd_name
+                    },
+                    "children": [
+                        {
+                            "fvRsCtx": {
+                                "attributes": {
+                                    "tnFvCtxName": vrf_name
+                                }
+                            }
+                        },
+                        {
+                            "fvSubnet": {
+                                "attributes": {
+                                    "ip": subnet_ip,
+                                    "scope": "public"
+                                }
+                            }
+                        }
+                    ]
+                }
+            }
+        )
+
+    for app_name, bd_name, epg_names in apps:
+        epgs = []
+        for epg_name in epg_names:
+            epgs.append(
+                {
+                    "fvAEPg": {
+                        "attributes": {
+                            "name": epg_name
+                        },
+                        "children": [
+                            {
+                                "fvRsBd": {
+                                    "attributes": {
+                                        "tnFvBDName": bd_name
+                                    }
+                                }
+                            }
+                        ]
+                    }
+                }
+            )
+        children.append(
+            {
+                "fvAp": {
+                    "attributes": {
+                        "name": app_name
+                    },
+                    "children": epgs
+                }
+            }
+        )
+
+    return {
+        "fvTenant": {
+            "attributes": {
+                "dn": f"uni/tn-{tenant_name}",
+                "name": tenant_name
+            },
+            "children": children
+        }
+    }
 
-    print("\n=== Tenant and VRF ===")
-    ensure_tenant(session, TENANT)
-    ensure_vrf(session, TENANT, VRF_NAME)
 
-    print("\n=== Bridge Domains (one per tier) ===")
-    ensure_bd_with_subnet(session, TENANT, WEB_BD, VRF_NAME, WEB_SUBNET)
-    ensure_bd_with_subnet(session, TENANT, APP_BD, VRF_NAME, APP_SUBNET)
-    ensure_bd_with_subnet(session, TENANT, DB_BD,  VRF_NAME, DB_SUBNET)
+def count_objects(tree):
+    """Count the MOs in a payload tree (the root included)."""
+    total = 0
+    for body in tree.values():
+        total += 1
+        for child in body.get("children", []):
+            total += count_objects(child)
+    return total
 
-    print("\n=== App Profiles ===")
-    ensure_app_profile(session, TENANT, WEB_APP)
-    ensure_app_profile(session, TENANT, APP_APP)
-    ensure_app_profile(session, TENANT, DB_APP)
 
-    print("\n=== Web Tier EPGs (→ ACME-Web-BD) ===")
-    for epg in WEB_EPGS:
-        ensure_epg(session, TENANT, WEB_APP, epg, WEB_BD)
+def push_tenant_tree(session, tree):
+    """
+    POST a complete fvTenant tree to /api/mo/uni.json in one request.
+    APIC applies the tree as a single transaction.
+    """
+    url = f"{APIC}/api/mo/uni.json"
+    tenant_name = tree["fvTenant"]["attributes"]["name"]
 
-    print("\n=== Application Tier EPGs (→ ACME-App-BD) ===")
-    for epg in APP_EPGS:
-        ensure_epg(session, TENANT, APP_APP, epg, APP_BD)
+    resp = session.post(url, json=tree, verify=False)
+    print(f"[TREE] '{tenant_name}' ({count_objects(tree)} objects) -> HTTP {resp.status_code}")
+    if resp.status_code >= 300:
+        print(resp.text)
+    return resp
+
+
+# -----------------------------
+# Main build sequence
+# -----------------------------
+if __name__ == "__main__":
+    session = apic_login()
 
-    print("\n=== Database Tier EPGs (→ ACME-DB-BD) ===")
-    for epg in DB_EPGS:
-        ensure_epg(session, TENANT, DB_APP, epg, DB_BD)
+    if PLAN or SINGLE_TRANSACTION:
+        tree = build_tenant_tree(
+            TENANT,
+            VRF_NAME,
+            bds=[
+                (WEB_BD, WEB_SUBNET),
+                (APP_BD, APP_SUBNET),
+                (DB_BD,  DB_SUBNET),
+            ],
+            apps=[
+                (WEB_APP, WEB_BD, WEB_EPGS),
+                (APP_APP, APP_BD, APP_EPGS),
+                (DB_APP,  DB_BD,  DB_EPGS),
+            ],
+        )
+        if PLAN:
+            print("\n=== Plan: Tenant tree ===")
+            plan_and_apply(session, APIC, tree, prune=PRUNE, apply=not PLAN_ONLY)
+        else:
+            print("\n=== Tenant tree (single POST) ===")
+            push_tenant_tree(session, tree)
+    else:
+        print("\n=== Tenant and VRF ===")
+        ensure_tenant(session, TENANT)
+        ensure_vrf(session, TENANT, VRF_NAME)
+
+        print("\n=== Bridge Domains and App Profiles (in parallel) ===")
+        run_phase([
+            partial(ensure_bd_with_subnet, session, TENANT, WEB_BD, VRF_NAME, WEB_SUBNET),
+            partial(ensure_bd_with_subnet, session, TENANT, APP_BD, VRF_NAME, APP_SUBNET),
+            partial(ensure_bd_with_subnet, session, TENANT, DB_BD,  VRF_NAME, DB_SUBNET),
+            partial(ensure_app_profile, session, TENANT, WEB_APP),
+            partial(ensure_app_profile, session, TENANT, APP_APP),
+            partial(ensure_app_profile, session, TENANT, DB_APP),
+        ], CONCURRENCY)
+
+        print("\n=== EPGs (Web → ACME-Web-BD, App → ACME-App-BD, DB → ACME-DB-BD) ===")
+        run_phase([
+            partial(ensure_epg, session, TENANT, app, epg, bd)
+            for app, bd, epgs in (
+                (WEB_APP, WEB_BD, WEB_EPGS),
+                (APP_APP, APP_BD, APP_EPGS),
+                (DB_APP,  DB_BD,  DB_EPGS),
+            )
+            for epg in epgs
+        ], CONCURRENCY)
 
     print("\n[✓] ACME 3-BD build complete: Tenant, VRF, 3 BDs, App Profiles, and EPGs created and bound to the right BDs.")
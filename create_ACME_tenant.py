@@ -1,7 +1,10 @@
-import requests
+from functools import partial
 import urllib3
 from urllib.parse import quote
 
+from apic_async import print_line, run_phase
+from apic_client import ApicClient
+
 urllib3.disable_warnings()  # Ignore self-signed cert warnings (lab use only)
 
 # -----------------------------
@@ -11,29 +14,14 @@ APIC = api url
 USER = 'username'
 PASS = 'password'
 
+CONCURRENCY = 8     # independent writes in flight at once (see apic_async.py)
 
 
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    print("[LOGIN] Body:", resp.text)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print("[+] Logged into APIC")
     return session
 
@@ -52,8 +40,8 @@ def create_tenant(session, tenant_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[TENANT] '{tenant_name}' -> Status {resp.status_code}")
-    print("[TENANT] Body:", resp.text)
+    print_line(f"[TENANT] '{tenant_name}' -> Status {resp.status_code}")
+    print_line("[TENANT] Body:", resp.text)
     return resp
 
 
@@ -71,8 +59,8 @@ def create_app_profile(session, tenant_name, app_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[APP] '{app_name}' -> Status {resp.status_code}")
-    print("[APP] Body:", resp.text)
+    print_line(f"[APP] '{app_name}' -> Status {resp.status_code}")
+    print_line("[APP] Body:", resp.text)
     return resp
 
 
@@ -90,8 +78,8 @@ def create_epg(session, tenant_name, app_name, epg_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[EPG] '{epg_name}' in '{app_name}' -> Status {resp.status_code}")
-    print("[EPG] Body:", resp.text)
+    print_line(f"[EPG] '{epg_name}' in '{app_name}' -> Status {resp.status_code}")
+    print_line("[EPG] Body:", resp.text)
     return resp
 
 
@@ -132,20 +120,24 @@ if __name__ == "__main__":
     # 1) Tenant
     create_tenant(session, tenant)
 
-    # 2) Web Tier
-    create_app_profile(session, tenant, web_app)
-    for epg in web_epgs:
-        create_epg(session, tenant, web_app, epg)
-
-    # 3) Application Tier
-    create_app_profile(session, tenant, app_tier)
-    for epg in app_epgs:
-        create_epg(session, tenant, app_tier, epg)
+    tiers = [
+        (web_app, web_epgs),
+        (app_tier, app_epgs),
+        (db_tier, db_epgs),
+    ]
 
-    # 4) Database Tier
-    create_app_profile(session, tenant, db_tier)
-    for epg in db_epgs:
-        create_epg(session, tenant, db_tier, epg)
+    # 2) App profiles (independent of each other)
+    run_phase([
+        partial(create_app_profile, session, tenant, app)
+        for app, _ in tiers
+    ], CONCURRENCY)
+
+    # 3) EPGs of all tiers
+    run_phase([
+        partial(create_epg, session, tenant, app, epg)
+        for app, epgs in tiers
+        for epg in epgs
+    ], CONCURRENCY)
 
     print("\n[✓] Finished creating ACME tenant, app profiles, and EPGs.")
 
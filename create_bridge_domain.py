@@ -1,6 +1,7 @@
-import requests
 import urllib3
 
+from apic_client import ApicClient
+
 urllib3.disable_warnings()  # ignore self-signed cert warnings (lab only)
 
 APIC = api url
@@ -10,25 +11,9 @@ PASS = 'password'
 
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    print("[LOGIN] Body:", resp.text)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print("[+] Logged into APIC")
     return session
 
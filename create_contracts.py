@@ -21,21 +21,34 @@ Creates:
     - Web EPGs consume Web-To-App-Contract
     - App EPGs provide Web-To-App-Contract and consume App-To-DB-Contract
     - DB EPGs provide App-To-DB-Contract
+
+With PLAN = True the filters, contracts and bindings are built as one
+desired tree, diffed against the live tenant (see apic_plan.py) and only
+the differences are POSTed.
 """
 
-import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import urllib3
 
+from apic_client import ApicClient
+from apic_plan import plan_and_apply
+from apic_scheduler import RequestScheduler
+from filter_compiler import compile_entries, dedupe_contract_filters, entry_attrs
+from tcam_estimator import PLANNED, TCAM_CAPACITY, WARN_RATIO, planned_inputs, store_estimate
+
 urllib3.disable_warnings()  # lab only
 
 # -----------------------------
-# APIC connection parameters
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
 # -----------------------------
-APIC = api url
-USER = 'username'
-PASS = 'password'
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
 
 TENANT = "ACME"
+VRF_NAME = "ACME-VRF"   # VRF of the EPGs' BDs (create_ACME_all.py)
 
 WEB_APP = "Web_Tier"
 APP_APP = "Application_Tier"
@@ -71,30 +84,39 @@ APP_TO_DB_FILTER  = "APP-TO-DB-FILTER"
 WEB_TO_APP_CONTRACT = "Web-To-App-Contract"
 APP_TO_DB_CONTRACT  = "App-To-DB-Contract"
 
+# Filter entries as (name, TCP port or "from-to" range) and the filter(s)
+# each contract uses; entries are merged into the fewest vzEntry objects
+FILTER_ENTRIES = {
+    WEB_TO_APP_FILTER: [("HTTP", "80"), ("HTTPS", "443")],
+    APP_TO_DB_FILTER:  [("MSSQL", "1433"), ("MySQL", "3306")],
+}
+
+CONTRACT_FILTERS = {
+    WEB_TO_APP_CONTRACT: WEB_TO_APP_FILTER,
+    APP_TO_DB_CONTRACT:  APP_TO_DB_FILTER,
+}
+
+BIND_WORKERS = 8    # parallel EPG binding requests
+
+# Request scheduling (see apic_scheduler.py): rate cap, in-flight requests
+# adapted to 429/503 answers and latency, retries with jittered backoff
+RATE_LIMIT = 20     # requests per second (None = no cap)
+
+# Diff against the live tenant and POST only what changed (see apic_plan.py)
+PLAN = True
+PLAN_ONLY = False   # print the plan without applying it
+PRUNE = False       # also delete filters, contracts and bindings not listed here
+
 
 # -----------------------------
 # Login
 # -----------------------------
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
+    scheduler = RequestScheduler(rate=RATE_LIMIT, max_concurrency=BIND_WORKERS)
+    session = ApicClient(APIC, USER, PASS, scheduler=scheduler)  # pooled, refreshes its token
+    resp = session.login()
     print("[LOGIN] Status:", resp.status_code)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
     print("[+] Logged into APIC")
     return session
 
@@ -102,107 +124,86 @@ def apic_login():
 # -----------------------------
 # Filters
 # -----------------------------
-def ensure_filter_web_to_app(session):
+def compile_filters(filters=FILTER_ENTRIES, contracts=CONTRACT_FILTERS):
     """
-    Create/update WEB-TO-APP-FILTER with HTTP/HTTPS entries.
+    {filter_name: [compiled entry, ...]}: port ranges merged per filter
+    and entries repeated across a contract's filters dropped
+    (see filter_compiler.py).
     """
-    dn = f"uni/tn-{TENANT}/flt-{WEB_TO_APP_FILTER}"
-    url = f"{APIC}/api/mo/{dn}.json"
+    compiled = {name: compile_entries(entries) for name, entries in filters.items()}
+    subjects = {c: [f] if isinstance(f, str) else list(f) for c, f in contracts.items()}
+    return dedupe_contract_filters(compiled, subjects)
 
-    payload = {
-        "vzFilter": {
-            "attributes": {
-                "dn": dn,
-                "name": WEB_TO_APP_FILTER,
-            },
-            "children": [
-                {
-                    "vzEntry": {
-                        "attributes": {
-                            "name": "HTTP",
-                            "etherT": "ip",
-                            "prot": "tcp",
-                            "dFromPort": "80",
-                            "dToPort": "80"
-                        }
-                    }
-                },
-                {
-                    "vzEntry": {
-                        "attributes": {
-                            "name": "HTTPS",
-                            "etherT": "ip",
-                            "prot": "tcp",
-                            "dFromPort": "443",
-                            "dToPort": "443"
-                        }
-                    }
-                }
-            ]
-        }
-    }
 
-    resp = session.post(url, json=payload, verify=False)
-    print(f"[FILTER] {WEB_TO_APP_FILTER} -> HTTP {resp.status_code}")
+def get_filter_entry_names(session, dn):
+    """Names of the vzEntry objects of a filter ([] if it does not exist yet)."""
+    url = f"{APIC}/api/mo/{dn}.json?query-target=children&target-subtree-class=vzEntry"
+    resp = session.get(url, verify=False)
     if resp.status_code >= 300:
-        print(resp.text)
-    return resp
+        return []
+    return [item["vzEntry"]["attributes"]["name"] for item in resp.json().get("imdata", [])]
 
 
-def ensure_filter_app_to_db(session):
+def ensure_filter(session, filter_name, entries):
     """
-    Create/update APP-TO-DB-FILTER with SQL-related ports.
+    Create/update a filter (vzFilter) from compiled entries
+    (filter_compiler.compile_entries). Entries the filter has but no
+    longer needs (e.g. ranges merged into another entry) are deleted in
+    the same POST.
     """
-    dn = f"uni/tn-{TENANT}/flt-{APP_TO_DB_FILTER}"
+    dn = f"uni/tn-{TENANT}/flt-{filter_name}"
     url = f"{APIC}/api/mo/{dn}.json"
 
+    names = {entry["name"] for entry in entries}
+    stale = [name for name in get_filter_entry_names(session, dn) if name not in names]
+
     payload = {
         "vzFilter": {
             "attributes": {
                 "dn": dn,
-                "name": APP_TO_DB_FILTER,
+                "name": filter_name,
             },
             "children": [
-                {
-                    "vzEntry": {
-                        "attributes": {
-                            "name": "MSSQL",
-                            "etherT": "ip",
-                            "prot": "tcp",
-                            "dFromPort": "1433",
-                            "dToPort": "1433"
-                        }
-                    }
-                },
-                {
-                    "vzEntry": {
-                        "attributes": {
-                            "name": "MySQL",
-                            "etherT": "ip",
-                            "prot": "tcp",
-                            "dFromPort": "3306",
-                            "dToPort": "3306"
-                        }
-                    }
-                }
+                {"vzEntry": {"attributes": entry_attrs(entry)}}
+                for entry in entries
+            ] + [
+                {"vzEntry": {"attributes": {"name": name, "status": "deleted"}}}
+                for name in stale
             ]
         }
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[FILTER] {APP_TO_DB_FILTER} -> HTTP {resp.status_code}")
+    removed = f", {len(stale)} removed" if stale else ""
+    print(f"[FILTER] {filter_name} ({len(entries)} entries{removed}) -> HTTP {resp.status_code}")
     if resp.status_code >= 300:
         print(resp.text)
     return resp
 
 
+def ensure_filter_web_to_app(session):
+    """
+    Create/update WEB-TO-APP-FILTER with HTTP/HTTPS entries.
+    """
+    return ensure_filter(session, WEB_TO_APP_FILTER, compile_filters()[WEB_TO_APP_FILTER])
+
+
+def ensure_filter_app_to_db(session):
+    """
+    Create/update APP-TO-DB-FILTER with SQL-related ports.
+    """
+    return ensure_filter(session, APP_TO_DB_FILTER, compile_filters()[APP_TO_DB_FILTER])
+
+
 # -----------------------------
 # Contracts
 # -----------------------------
 def ensure_contract(session, contract_name, filter_name):
     """
-    Create/update a contract (vzBrCP) with one subject referencing a filter.
+    Create/update a contract (vzBrCP) with one subject referencing a filter
+    (or a list of filters).
     """
+    filter_names = [filter_name] if isinstance(filter_name, str) else filter_name
     dn = f"uni/tn-{TENANT}/brc-{contract_name}"
     url = f"{APIC}/api/mo/{dn}.json"
 
@@ -222,10 +223,11 @@ def ensure_contract(session, contract_name, filter_name):
                             {
                                 "vzRsSubjFiltAtt": {
                                     "attributes": {
-                                        "tnVzFilterName": filter_name
+                                        "tnVzFilterName": name
                                     }
                                 }
                             }
+                            for name in filter_names
                         ]
                     }
                 }
@@ -247,7 +249,7 @@ def epg_dn(tenant, app, epg):
     return f"uni/tn-{tenant}/ap-{app}/epg-{epg}"
 
 
-def epg_provide_contract(session, tenant, app, epg, contract_name):
+def epg_provide_contract(session, tenant, app, epg, contract_name, verbose=True):
     """
     Make an EPG PROVIDE a contract (fvRsProv).
     """
@@ -272,13 +274,14 @@ def epg_provide_contract(session, tenant, app, epg, contract_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[EPG PROVIDE] {epg} provides {contract_name} -> HTTP {resp.status_code}")
-    if resp.status_code >= 300:
-        print(resp.text)
+    if verbose:
+        print(f"[EPG PROVIDE] {epg} provides {contract_name} -> HTTP {resp.status_code}")
+        if resp.status_code >= 300:
+            print(resp.text)
     return resp
 
 
-def epg_consume_contract(session, tenant, app, epg, contract_name):
+def epg_consume_contract(session, tenant, app, epg, contract_name, verbose=True):
     """
     Make an EPG CONSUME a contract (fvRsCons).
     """
@@ -303,42 +306,197 @@ def epg_consume_contract(session, tenant, app, epg, contract_name):
     }
 
     resp = session.post(url, json=payload, verify=False)
-    print(f"[EPG CONSUME] {epg} consumes {contract_name} -> HTTP {resp.status_code}")
-    if resp.status_code >= 300:
-        print(resp.text)
+    if verbose:
+        print(f"[EPG CONSUME] {epg} consumes {contract_name} -> HTTP {resp.status_code}")
+        if resp.status_code >= 300:
+            print(resp.text)
     return resp
 
 
 # -----------------------------
-# Main
+# Parallel binding phase
 # -----------------------------
-if __name__ == "__main__":
-    sess = apic_login()
+def plan_bindings():
+    """
+    The tier bindings as (action, app, epg, contract) tuples,
+    action being "provide" or "consume":
 
-    print("\n=== Create Filters ===")
-    ensure_filter_web_to_app(sess)
-    ensure_filter_app_to_db(sess)
+    - Web EPGs consume Web-To-App-Contract
+    - App EPGs provide Web-To-App-Contract and consume App-To-DB-Contract
+    - DB EPGs provide App-To-DB-Contract
+    """
+    bindings = []
+    for epg in WEB_EPGS:
+        bindings.append(("consume", WEB_APP, epg, WEB_TO_APP_CONTRACT))
+    for epg in APP_EPGS:
+        bindings.append(("provide", APP_APP, epg, WEB_TO_APP_CONTRACT))
+        bindings.append(("consume", APP_APP, epg, APP_TO_DB_CONTRACT))
+    for epg in DB_EPGS:
+        bindings.append(("provide", DB_APP, epg, APP_TO_DB_CONTRACT))
+    return bindings
 
-    print("\n=== Create Contracts ===")
-    ensure_contract(sess, WEB_TO_APP_CONTRACT, WEB_TO_APP_FILTER)
-    ensure_contract(sess, APP_TO_DB_CONTRACT,  APP_TO_DB_FILTER)
 
-    print("\n=== Bind Contracts to EPGs ===")
+def bind_one(session, tenant, binding):
+    """
+    Apply one binding quietly and return its result:
+    {"action", "app", "epg", "contract", "status", "error"}
+    """
+    action, app, epg, contract = binding
+    bind = epg_provide_contract if action == "provide" else epg_consume_contract
+    result = {
+        "action": action,
+        "app": app,
+        "epg": epg,
+        "contract": contract,
+        "status": None,
+        "error": None,
+    }
 
-    # Web tier: consume Web->App
-    print("\n[Web Tier EPGs consume Web-To-App-Contract]")
-    for epg in WEB_EPGS:
-        epg_consume_contract(sess, TENANT, WEB_APP, epg, WEB_TO_APP_CONTRACT)
+    try:
+        resp = bind(session, tenant, app, epg, contract, verbose=False)
+    except Exception as exc:  # connection errors etc. are reported at the end
+        result["error"] = str(exc)
+        return result
 
-    # App tier: provide Web->App, consume App->DB
-    print("\n[Application Tier EPGs provide Web-To-App-Contract and consume App-To-DB-Contract]")
-    for epg in APP_EPGS:
-        epg_provide_contract(sess, TENANT, APP_APP, epg, WEB_TO_APP_CONTRACT)
-        epg_consume_contract(sess, TENANT, APP_APP, epg, APP_TO_DB_CONTRACT)
+    result["status"] = resp.status_code
+    if resp.status_code >= 300:
+        result["error"] = resp.text
+    return result
 
-    # DB tier: provide App->DB
-    print("\n[Database Tier EPGs provide App-To-DB-Contract]")
-    for epg in DB_EPGS:
-        epg_provide_contract(sess, TENANT, DB_APP, epg, APP_TO_DB_CONTRACT)
+
+def bind_contracts(session, tenant, bindings, workers=BIND_WORKERS):
+    """
+    Apply all bindings with a thread pool. The bindings are independent
+    once the contracts exist. Returns the results in binding order.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda b: bind_one(session, tenant, b), bindings))
+
+
+def print_binding_summary(results):
+    """Print one row per binding, then every failure together."""
+    print(f"  {'App Profile':18}  {'EPG':16}  {'Action':8}  {'Contract':22}  HTTP")
+    print(f"  {'-' * 18}  {'-' * 16}  {'-' * 8}  {'-' * 22}  ----")
+    for r in results:
+        status = r["status"] if r["status"] is not None else "ERR"
+        print(f"  {r['app']:18}  {r['epg']:16}  {r['action']:8}  {r['contract']:22}  {status}")
+
+    failures = [r for r in results if r["error"]]
+    print(f"\n  {len(results) - len(failures)} bound, {len(failures)} failed")
+    if failures:
+        print("\n[!] Failed bindings:")
+        for r in failures:
+            print(f"  - {r['epg']} {r['action']} {r['contract']}: {r['error']}")
+    return failures
+
+
+# -----------------------------
+# Desired-state tree
+# -----------------------------
+def build_contract_tree(tenant, bindings, filters=FILTER_ENTRIES, contracts=CONTRACT_FILTERS):
+    """
+    The filters, contracts and EPG bindings as one fvTenant tree:
+
+    bindings:  (action, app, epg, contract) tuples, see plan_bindings()
+    filters:   {filter_name: [(entry_name, tcp_port), ...]}
+    contracts: {contract_name: filter_name or [filter_name, ...]}
+
+    Filter entries are compiled first (compile_filters). App Profiles and
+    EPGs appear by name only, as parents of the fvRsProv / fvRsCons
+    relations.
+    """
+    children = []
+
+    for filter_name, entries in compile_filters(filters, contracts).items():
+        children.append({
+            "vzFilter": {
+                "attributes": {"name": filter_name},
+                "children": [
+                    {"vzEntry": {"attributes": entry_attrs(entry)}}
+                    for entry in entries
+                ]
+            }
+        })
+
+    for contract_name, filter_names in contracts.items():
+        if isinstance(filter_names, str):
+            filter_names = [filter_names]
+        children.append({
+            "vzBrCP": {
+                "attributes": {"name": contract_name},
+                "children": [{
+                    "vzSubj": {
+                        "attributes": {"name": f"{contract_name}-Subj"},
+                        "children": [
+                            {
+                                "vzRsSubjFiltAtt": {
+                                    "attributes": {"tnVzFilterName": filter_name}
+                                }
+                            }
+                            for filter_name in filter_names
+                        ]
+                    }
+                }]
+            }
+        })
+
+    apps = {}
+    for action, app, epg, contract in bindings:
+        rel = "fvRsProv" if action == "provide" else "fvRsCons"
+        apps.setdefault(app, {}).setdefault(epg, []).append(
+            {rel: {"attributes": {"tnVzBrCPName": contract}}}
+        )
+    for app, epgs in apps.items():
+        children.append({
+            "fvAp": {
+                "attributes": {"name": app},
+                "children": [
+                    {"fvAEPg": {"attributes": {"name": epg}, "children": rels}}
+                    for epg, rels in epgs.items()
+                ]
+            }
+        })
+
+    return {
+        "fvTenant": {
+            "attributes": {"dn": f"uni/tn-{tenant}", "name": tenant},
+            "children": children
+        }
+    }
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    sess = apic_login()
+
+    # zoning rules the bindings will cost, see tcam_estimator.py
+    rows, entries = planned_inputs(plan_bindings(), compile_filters(), CONTRACT_FILTERS, VRF_NAME)
+    estimate, _ = store_estimate(PLANNED, rows, entries)
+    print(f"[TCAM] ~{estimate['per_leaf']} zoning rules per leaf "
+          f"({100 * estimate['per_leaf'] / TCAM_CAPACITY:.1f}% of {TCAM_CAPACITY})")
+    if estimate["per_leaf"] > WARN_RATIO * TCAM_CAPACITY:
+        print("[!] Bindings would fill most of the leaf policy TCAM: python tcam_estimator.py")
+
+    if PLAN:
+        print("\n=== Plan: Filters, Contracts and Bindings ===")
+        tree = build_contract_tree(TENANT, plan_bindings())
+        # App Profiles and EPGs belong to the build script: never prune them.
+        # A filter's entries are all defined here: stale ones always go.
+        plan_and_apply(sess, APIC, tree, prune=PRUNE, keep=("fvAp", "fvAEPg"),
+                       apply=not PLAN_ONLY, owned=("vzEntry",))
+    else:
+        print("\n=== Create Filters ===")
+        ensure_filter_web_to_app(sess)
+        ensure_filter_app_to_db(sess)
+
+        print("\n=== Create Contracts ===")
+        ensure_contract(sess, WEB_TO_APP_CONTRACT, WEB_TO_APP_FILTER)
+        ensure_contract(sess, APP_TO_DB_CONTRACT,  APP_TO_DB_FILTER)
+
+        print(f"\n=== Bind Contracts to EPGs ({BIND_WORKERS} workers) ===")
+        results = bind_contracts(sess, TENANT, plan_bindings(), workers=BIND_WORKERS)
+        print_binding_summary(results)
 
     print("\n[✓] Contracts and bindings configured for ACME 3-tier app.")
@@ -6,11 +6,24 @@ Default:
 - Tenant: ACME
 - Bridge Domain: ACME-BD
 - Subnets: example gateway subnets for Web/App/DB tiers
+
+Bulk import: given a CSV of tenant,bd,ip[,scope] rows, the subnets are
+grouped per BD, split into POSTs below MAX_PAYLOAD_BYTES and pushed to
+many BDs at once:
+
+    python create_subnets.py gateways.csv --workers 16
 """
 
-import requests
+import argparse
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 import urllib3
 
+from apic_client import ApicClient
+from apic_scheduler import RequestScheduler
+
 urllib3.disable_warnings()  # lab use only – ignore self-signed cert warnings
 
 # -----------------------------
@@ -31,32 +44,52 @@ SUBNETS = [
     {"ip": "10.30.30.1/24", "scope": "public"},   # DB tier gateway
 ]
 
+# Bulk import
+MAX_PAYLOAD_BYTES = 256 * 1024  # per POST, well below what APIC accepts
+IMPORT_WORKERS = 16             # chunk POSTs in flight
+RATE_LIMIT = 20                 # requests per second (None = no cap), see apic_scheduler.py
+
 
 # -----------------------------
 # Helper functions
 # -----------------------------
-def apic_login():
+def apic_login(workers=IMPORT_WORKERS):
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
+    scheduler = RequestScheduler(rate=RATE_LIMIT, max_concurrency=workers)
+    session = ApicClient(APIC, USER, PASS, pool_size=max(workers, 10),
+                         scheduler=scheduler)  # pooled, refreshes its token
+    resp = session.login()
+    print("[LOGIN] Status:", resp.status_code)
+    print("[+] Logged into APIC")
+    return session
 
-    payload = {
-        "aaaUser": {
+
+def subnet_child(subnet):
+    """The fvSubnet child for {"ip": ..., "scope": ...}."""
+    return {
+        "fvSubnet": {
             "attributes": {
-                "name": USER,
-                "pwd": PASS
+                "ip": subnet["ip"],
+                "scope": subnet.get("scope", "public")  # default scope = public
+                # You could add "descr" or "virtual": "yes" if needed
             }
         }
     }
 
-    resp = session.post(url, json=payload, verify=False)
-    print("[LOGIN] Status:", resp.status_code)
-    resp.raise_for_status()
 
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
-    print("[+] Logged into APIC")
-    return session
+def subnets_payload(tenant, bd_name, children):
+    """The fvBD payload carrying the given fvSubnet children."""
+    return {
+        "fvBD": {
+            "attributes": {
+                "dn": f"uni/tn-{tenant}/BD-{bd_name}",
+                # modify only: a mistyped BD name is rejected instead of
+                # creating a new, VRF-less BD (subnets are still upserted)
+                "status": "modified"
+            },
+            "children": children
+        }
+    }
 
 
 def add_subnets_to_bd(session, tenant, bd_name, subnets):
@@ -68,32 +101,7 @@ def add_subnets_to_bd(session, tenant, bd_name, subnets):
     bd_dn = f"uni/tn-{tenant}/BD-{bd_name}"
     url = f"{APIC}/api/mo/{bd_dn}.json"
 
-    # Build children list for all subnets
-    children = []
-    for s in subnets:
-        ip = s["ip"]
-        scope = s.get("scope", "public")  # default scope = public
-        children.append(
-            {
-                "fvSubnet": {
-                    "attributes": {
-                        "ip": ip,
-                        "scope": scope
-                        # You could add "descr" or "virtual": "yes" if needed
-                    }
-                }
-            }
-        )
-
-    payload = {
-        "fvBD": {
-            "attributes": {
-                "dn": bd_dn
-                # no explicit status -> safe to re-run (idempotent-ish)
-            },
-            "children": children
-        }
-    }
+    payload = subnets_payload(tenant, bd_name, [subnet_child(s) for s in subnets])
 
     resp = session.post(url, json=payload, verify=False)
     print(f"[BD SUBNETS] BD '{bd_name}' in tenant '{tenant}' -> HTTP {resp.status_code}")
@@ -101,10 +109,135 @@ def add_subnets_to_bd(session, tenant, bd_name, subnets):
     return resp
 
 
+# -----------------------------
+# Bulk import from CSV
+# -----------------------------
+def read_subnet_csv(path):
+    """
+    Read tenant,bd,ip[,scope] rows (header line required).
+    Returns a list of {"tenant", "bd", "ip", "scope"} dicts.
+    """
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            if not any((v or "").strip() for v in row.values()):
+                continue    # blank line
+            missing = [k for k in ("tenant", "bd", "ip") if not (row.get(k) or "").strip()]
+            if missing:
+                raise ValueError(f"{path}:{line}: missing {', '.join(missing)}")
+            rows.append({
+                "tenant": row["tenant"].strip(),
+                "bd": row["bd"].strip(),
+                "ip": row["ip"].strip(),
+                "scope": (row.get("scope") or "").strip() or "public",
+            })
+    return rows
+
+
+def group_by_bd(rows):
+    """{(tenant, bd): [subnet, ...]} in first-seen order; a repeated ip keeps its last scope."""
+    groups = {}
+    for row in rows:
+        subnets = groups.setdefault((row["tenant"], row["bd"]), {})
+        subnets[row["ip"]] = {"ip": row["ip"], "scope": row["scope"]}
+    return {key: list(subnets.values()) for key, subnets in groups.items()}
+
+
+def chunk_subnets(tenant, bd_name, subnets, max_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Split one BD's subnets into lists whose payloads (as serialized by
+    requests) stay below max_bytes. Returns [[child, ...], ...].
+    """
+    size = base = len(json.dumps(subnets_payload(tenant, bd_name, [])))
+    chunks = [[]]
+    for subnet in subnets:
+        child = subnet_child(subnet)
+        child_size = len(json.dumps(child)) + 2     # ", " between children
+        if chunks[-1] and size + child_size > max_bytes:
+            chunks.append([])
+            size = base
+        chunks[-1].append(child)
+        size += child_size
+    return [chunk for chunk in chunks if chunk]
+
+
+def push_subnet_chunk(session, tenant, bd_name, children):
+    """
+    POST one chunk quietly and return its result:
+    {"tenant", "bd", "subnets", "status", "error"}
+    """
+    url = f"{APIC}/api/mo/uni/tn-{tenant}/BD-{bd_name}.json"
+    result = {"tenant": tenant, "bd": bd_name, "subnets": len(children),
+              "status": None, "error": None}
+    try:
+        resp = session.post(url, json=subnets_payload(tenant, bd_name, children), verify=False)
+    except Exception as exc:  # connection errors etc. are reported at the end
+        result["error"] = str(exc)
+        return result
+
+    result["status"] = resp.status_code
+    if resp.status_code >= 300:
+        result["error"] = resp.text
+    return result
+
+
+def import_subnets(session, rows, workers=IMPORT_WORKERS, max_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Push CSV rows grouped per BD, in chunks below max_bytes, with a
+    thread pool. Returns one result per chunk.
+    """
+    jobs = [
+        (tenant, bd_name, children)
+        for (tenant, bd_name), subnets in group_by_bd(rows).items()
+        for children in chunk_subnets(tenant, bd_name, subnets, max_bytes)
+    ]
+    print(f"[IMPORT] {len(rows)} rows -> {len(jobs)} POSTs ({workers} workers)")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda job: push_subnet_chunk(session, *job), jobs))
+
+
+def print_import_summary(results):
+    """Print per-BD totals, then every failed chunk."""
+    per_bd = {}
+    for r in results:
+        done, total = per_bd.get((r["tenant"], r["bd"]), (0, 0))
+        per_bd[(r["tenant"], r["bd"])] = (done + (0 if r["error"] else r["subnets"]),
+                                          total + r["subnets"])
+
+    print(f"  {'Tenant':16}  {'Bridge Domain':24}  Subnets")
+    print(f"  {'-' * 16}  {'-' * 24}  -------")
+    for (tenant, bd_name), (done, total) in per_bd.items():
+        print(f"  {tenant:16}  {bd_name:24}  {done}/{total}")
+
+    failures = [r for r in results if r["error"]]
+    added = sum(r["subnets"] for r in results if not r["error"])
+    print(f"\n  {added} subnets added, {sum(r['subnets'] for r in failures)} failed")
+    if failures:
+        print("\n[!] Failed chunks:")
+        for r in failures:
+            print(f"  - {r['tenant']}/{r['bd']} ({r['subnets']} subnets): {r['error']}")
+    return failures
+
+
 # -----------------------------
 # Main
 # -----------------------------
 if __name__ == "__main__":
-    sess = apic_login()
-    add_subnets_to_bd(sess, TENANT, BD_NAME, SUBNETS)
+    parser = argparse.ArgumentParser(description="Add subnets to Bridge Domains")
+    parser.add_argument("csv", nargs="?", help="CSV with tenant,bd,ip[,scope] columns")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS,
+                        help="chunk POSTs in flight")
+    parser.add_argument("--max-bytes", type=int, default=MAX_PAYLOAD_BYTES,
+                        help="largest POST body")
+    args = parser.parse_args()
+
+    sess = apic_login(args.workers)
+
+    if args.csv:
+        rows = read_subnet_csv(args.csv)
+        results = import_subnets(sess, rows, workers=args.workers, max_bytes=args.max_bytes)
+        if print_import_summary(results):
+            raise SystemExit(1)
+    elif add_subnets_to_bd(sess, TENANT, BD_NAME, SUBNETS).status_code >= 300:
+        raise SystemExit(1)
     print("\n[✓] Subnets added to Bridge Domain.")
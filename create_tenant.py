@@ -1,7 +1,8 @@
-import requests
 import urllib3
 import json
 
+from apic_client import ApicClient
+
 urllib3.disable_warnings()
 
 APIC = api url
@@ -11,20 +12,8 @@ PASS = 'password'
 
 def apic_login():
     """Authenticate to APIC and return a session with APIC-cookie."""
-    url = f"{APIC}/api/aaaLogin.json"
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    session = requests.Session()
-    r = session.post(url, json=payload, verify=False)
-    token = r.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     return session
 
 
@@ -1,24 +1,27 @@
-import requests
+import argparse
+import re
+from fnmatch import fnmatchcase
+from urllib.parse import quote
+
 import urllib3
 import json
 
+from apic_client import ApicClient
+from apic_dn import class_for_rn, split_dn
+
 urllib3.disable_warnings()
 
 APIC = api url
 USER = 'username'
 PASS = 'password'
 
+DELETE_BATCH = 1000     # deleted objects per bulk POST
+
 
 def apic_login():
     """Authenticate and return APIC session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-    payload = {
-        "aaaUser": {"attributes": {"name": USER, "pwd": PASS}}
-    }
-    r = session.post(url, json=payload, verify=False)
-    token = r.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     return session
 
 
@@ -43,23 +46,171 @@ def delete_tenant(session, tenant):
     return session.post(url, json=payload, verify=False)
 
 
+# -----------------------------
+# Bulk delete (DN lists and globs)
+# -----------------------------
+def _rn_matches(pattern_rn, rn):
+    # only * and ? are wildcards: [...] is part of RNs like subnet-[10.0.0.1/24]
+    return fnmatchcase(rn, pattern_rn.replace("[", "[[]"))
+
+
+def _is_glob(rn):
+    return "*" in rn or "?" in rn
+
+
+def _wcard_prefix(pattern):
+    """Regex for wcard(): the pattern's literal text up to the first wildcard."""
+    literal = re.split(r"[*?]", pattern, maxsplit=1)[0]
+    return "^" + re.sub(r"([.^$+()\[\]{}|\\])", r"\\\1", literal)
+
+
+def resolve_dns(session, patterns):
+    """
+    Resolve DNs and DN globs such as 'uni/tn-ACME/ap-*/epg-Test*'
+    (* and ? match within one RN) with a single naming-only subtree query.
+    Returns {dn: class} for every existing object that matches.
+    """
+    split = [split_dn(p) for p in patterns]
+
+    # query below the deepest literal RN prefix the patterns share
+    root = []
+    for rns in zip(*split):
+        if len(set(rns)) > 1 or _is_glob(rns[0]):
+            break
+        root.append(rns[0])
+    root_dn = "/".join(root) or "uni"
+
+    classes = {class_for_rn(rns[-1]) for rns in split}
+    url = f"{APIC}/api/node/mo/{root_dn}.json?query-target=subtree&rsp-prop-include=naming-only"
+    if None not in classes:
+        url += f"&target-subtree-class={','.join(sorted(classes))}"
+        filters = ",".join(
+            f'wcard({class_for_rn(rns[-1])}.dn,"{quote(_wcard_prefix(p))}")'
+            for p, rns in zip(patterns, split)
+        )
+        url += f"&query-target-filter=or({filters})"
+
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+
+    matches = {}
+    for item in resp.json().get("imdata", []):
+        for cls, body in item.items():
+            dn = body["attributes"]["dn"]
+            rns = split_dn(dn)
+            for pattern in split:
+                if len(pattern) == len(rns) and all(map(_rn_matches, pattern, rns)):
+                    matches[dn] = cls
+                    break
+    return matches
+
+
+def drop_nested(dns):
+    """Drop DNs whose ancestor is deleted as well (it goes with the subtree)."""
+    dns = set(dns)
+    keep = []
+    for dn in sorted(dns):
+        rns = split_dn(dn)
+        if not any("/".join(rns[:i]) in dns for i in range(1, len(rns))):
+            keep.append(dn)
+    return keep
+
+
+def build_delete_trees(targets):
+    """
+    Group {dn: class} deletions per tenant into nested status="deleted"
+    payloads. Returns [(post_dn, payload), ...]. Tenants, objects outside
+    tenants and objects below an RN of unknown class are deleted on
+    their own.
+    """
+    groups = {}     # tenant dn -> [dn, ...]
+    posts = []
+
+    for dn, cls in targets.items():
+        rns = split_dn(dn)
+        ancestors = ["/".join(rns[:i]) for i in range(3, len(rns))]
+        if (len(rns) <= 2 or not rns[1].startswith("tn-")
+                or any(class_for_rn(split_dn(a)[-1]) is None for a in ancestors)):
+            posts.append((dn, {cls: {"attributes": {"dn": dn, "status": "deleted"}}}))
+            continue
+        groups.setdefault("/".join(rns[:2]), []).append(dn)
+
+    for tenant_dn, dns in groups.items():
+        for start in range(0, len(dns), DELETE_BATCH):
+            nodes = {tenant_dn: {"fvTenant": {"attributes": {"dn": tenant_dn}, "children": []}}}
+            for dn in dns[start:start + DELETE_BATCH]:
+                rns = split_dn(dn)
+                parent = nodes[tenant_dn]
+                for i in range(3, len(rns)):
+                    anc = "/".join(rns[:i])
+                    if anc not in nodes:
+                        anc_cls = class_for_rn(rns[i - 1])
+                        nodes[anc] = {anc_cls: {"attributes": {"dn": anc}, "children": []}}
+                        next(iter(parent.values()))["children"].append(nodes[anc])
+                    parent = nodes[anc]
+                next(iter(parent.values()))["children"].append(
+                    {targets[dn]: {"attributes": {"dn": dn, "status": "deleted"}}}
+                )
+            posts.append((tenant_dn, nodes[tenant_dn]))
+    return posts
+
+
+def bulk_delete(session, patterns, dry_run=False):
+    """
+    Delete every object matching the DNs / globs in `patterns`:
+    one query to resolve them, then one tree POST per tenant.
+    With dry_run=True only the preview is printed.
+    """
+    matches = resolve_dns(session, patterns)
+    targets = {dn: matches[dn] for dn in drop_nested(matches)}
+    posts = build_delete_trees(targets)
+
+    prefix = "[DRY-RUN] " if dry_run else ""
+    for dn in sorted(targets):
+        print(f"{prefix}[DELETE] {targets[dn]} {dn}")
+    nested = len(matches) - len(targets)
+    print(f"{prefix}{len(targets)} objects to delete in {len(posts)} POSTs"
+          + (f" ({nested} more removed with a parent)" if nested else ""))
+    if dry_run:
+        return []
+
+    results = []
+    for post_dn, payload in posts:
+        resp = session.post(f"{APIC}/api/mo/{post_dn}.json", json=payload, verify=False)
+        print(f"[BULK] {post_dn} -> HTTP {resp.status_code}")
+        if resp.status_code >= 300:
+            print(resp.text)
+        results.append(resp)
+    return results
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete APIC objects")
+    parser.add_argument("patterns", nargs="*",
+                        help="DNs or globs, e.g. 'uni/tn-ACME/ap-*/epg-Test*'")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only show what would be deleted")
+    args = parser.parse_args()
+
     session = apic_login()
 
-    TENANT = "ACME"
-    APP = "Hackers"
-    EPG = "Web"
+    if args.patterns:
+        bulk_delete(session, args.patterns, dry_run=args.dry_run)
+    else:
+        TENANT = "ACME"
+        APP = "Hackers"
+        EPG = "Web"
 
-    # Option 1: Delete JUST the EPG
-    print("Deleting EPG...")
-    print(delete_mo(session, f"uni/tn-{TENANT}/ap-{APP}/epg-{EPG}").json())
+        # Option 1: Delete JUST the EPG
+        print("Deleting EPG...")
+        print(delete_mo(session, f"uni/tn-{TENANT}/ap-{APP}/epg-{EPG}").json())
 
-    # Option 2: Delete JUST the App Profile
-    print("Deleting App Profile...")
-    print(delete_mo(session, f"uni/tn-{TENANT}/ap-{APP}").json())
+        # Option 2: Delete JUST the App Profile
+        print("Deleting App Profile...")
+        print(delete_mo(session, f"uni/tn-{TENANT}/ap-{APP}").json())
 
-    # Option 3: Delete Tenant (recursive destroy)
-    print("Deleting Tenant (including all children)...")
-    print(delete_tenant(session, TENANT).json())
+        # Option 3: Delete Tenant (recursive destroy)
+        print("Deleting Tenant (including all children)...")
+        print(delete_tenant(session, TENANT).json())
 
-    print("\n✔ All objects deleted.")
+        print("\n✔ All objects deleted.")
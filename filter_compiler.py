@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Filter entry compiler: desired ports in, fewest vzEntry objects out.
+
+Every vzEntry costs leaf TCAM (per provider / consumer pair) and payload
+bytes, and one entry can carry a whole destination port range. So:
+
+- compile_entries()  merges the overlapping and adjacent port ranges of
+                     each protocol into the fewest entries; every entry
+                     is named after its first input entry (HTTP, Alt),
+                     so names stay stable when ranges are merged
+- dedupe_contract_filters()
+                     drops entries already covered by an earlier filter
+                     of every contract that uses the filter, so a
+                     contract never installs the same rule twice
+
+    compile_entries([("HTTP", 80), ("Alt", "8080-8089"), ("Alt2", 8090),
+                     ("DNS", 53, "udp")])
+    -> [{"name": "HTTP", "prot": "tcp", "from": "80", "to": "80"},
+        {"name": "Alt", "prot": "tcp", "from": "8080", "to": "8090"},
+        {"name": "DNS", "prot": "udp", "from": "53", "to": "53"}]
+
+Entries that disappear this way (Alt2) may still exist on the APIC from
+an earlier run; the callers delete them (see apic_plan.diff_states
+`owned` and create_contracts.ensure_filter).
+
+Ports are ints, "443", ranges "8000-8080", APIC port names ("https"),
+or None / "unspecified" for any port (e.g. icmp).
+"""
+
+# -----------------------------
+# Ports
+# -----------------------------
+PORT_NAMES = {          # named ports APIC accepts in dFromPort / dToPort
+    "ftpData": 20,
+    "smtp": 25,
+    "dns": 53,
+    "http": 80,
+    "pop3": 110,
+    "https": 443,
+    "rtsp": 554,
+}
+ANY_PORT = (0, 65535)
+
+
+def _port(value):
+    value = str(value).strip()
+    port = PORT_NAMES.get(value, value)
+    return int(port)
+
+
+def _is_any(value):
+    return value is None or str(value).strip() in ("", "unspecified", "any")
+
+
+def parse_ports(value):
+    """
+    (low, high) for a port, range, port name, (from, to) pair or
+    None / "unspecified".
+    """
+    if isinstance(value, (tuple, list)):
+        if all(_is_any(v) for v in value):
+            return ANY_PORT
+        return _port(value[0]), _port(value[1])
+    if _is_any(value):
+        return ANY_PORT
+    if isinstance(value, int):
+        return value, value
+    low, _, high = str(value).partition("-")
+    low = _port(low)
+    high = _port(high) if high else low
+    if low > high:
+        raise ValueError(f"Empty port range {value}")
+    return low, high
+
+
+def merge_ranges(ranges):
+    """Sorted, merged (low, high) ranges; adjacent ranges are joined."""
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def subtract_ranges(ranges, covered):
+    """The parts of sorted, merged `ranges` outside sorted, merged `covered`."""
+    result = []
+    for low, high in ranges:
+        for c_low, c_high in covered:
+            if c_high < low or c_low > high:
+                continue
+            if c_low > low:
+                result.append((low, c_low - 1))
+            low = c_high + 1
+            if low > high:
+                break
+        if low <= high:
+            result.append((low, high))
+    return result
+
+
+# -----------------------------
+# Entries
+# -----------------------------
+def _normalize(entry):
+    """(name, prot, (low, high)) from a tuple or dict entry spec."""
+    if isinstance(entry, dict):
+        ports = (entry["from"], entry["to"]) if "from" in entry else entry.get("port")
+        return entry.get("name"), entry.get("prot", "tcp"), parse_ports(ports)
+    name, port, *rest = entry
+    return name, (rest[0] if rest else "tcp"), parse_ports(port)
+
+
+def compile_entries(entries):
+    """
+    Merge entry specs into the fewest entries.
+
+    entries: (name, port[, prot]) tuples or {"name", "port" | "from"/"to",
+             "prot"} dicts; prot defaults to tcp
+    returns: [{"name", "prot", "from", "to"}, ...] per protocol, by port;
+             each named after the first input entry (in input order) it
+             covers, or tcp-8000-8090 style if those have no names
+    """
+    by_prot = {}
+    named = []      # (prot, (low, high), name) of the named input entries
+    for entry in entries:
+        name, prot, ports = _normalize(entry)
+        by_prot.setdefault(prot, []).append(ports)
+        if name:
+            named.append((prot, ports, name))
+
+    compiled = []
+    for prot, ranges in by_prot.items():
+        for low, high in merge_ranges(ranges):
+            name = next(
+                (n for p, (l, h), n in named if p == prot and low <= l and h <= high), None
+            )
+            compiled.append(_entry(prot, low, high, name))
+    return compiled
+
+
+def _entry(prot, low, high, name=None):
+    if name is None:
+        if (low, high) == ANY_PORT:
+            name = prot
+        elif low == high:
+            name = f"{prot}-{low}"
+        else:
+            name = f"{prot}-{low}-{high}"
+    if (low, high) == ANY_PORT:
+        return {"name": name, "prot": prot, "from": "unspecified", "to": "unspecified"}
+    return {"name": name, "prot": prot, "from": str(low), "to": str(high)}
+
+
+def entry_ranges(entries):
+    """{prot: merged (low, high) ranges} of compiled entries."""
+    by_prot = {}
+    for e in entries:
+        by_prot.setdefault(e["prot"], []).append(parse_ports((e["from"], e["to"])))
+    return {prot: merge_ranges(r) for prot, r in by_prot.items()}
+
+
+def dedupe_contract_filters(filters, contracts):
+    """
+    Remove entry ranges that are duplicated across the filters of a contract.
+
+    filters:   {filter: [compiled entry, ...]}
+    contracts: {contract: [filter, ...]}
+
+    Filters are handled in `filters` order. An entry is dropped from a
+    filter only when, in every contract using that filter, earlier
+    filters of the contract already cover its whole range, so each
+    contract still allows exactly the same traffic. Partly covered
+    entries are kept as they are: cutting the covered part out could
+    split one entry into two. Returns a new {filter: entries}; filters
+    left without entries are kept (empty).
+    """
+    users = {}      # filter -> contracts using it
+    for contract, names in contracts.items():
+        for name in names:
+            users.setdefault(name, []).append(contract)
+
+    order = {name: i for i, name in enumerate(filters)}
+    result = {}
+    for name, entries in filters.items():
+        covered = None      # {prot: ranges} covered in every user contract
+        for contract in users.get(name, []):
+            earlier = [f for f in contracts[contract] if order.get(f, len(order)) < order[name]]
+            ranges = {}
+            for f in earlier:
+                for prot, r in entry_ranges(result[f]).items():
+                    ranges[prot] = merge_ranges(ranges.get(prot, []) + r)
+            if covered is None:
+                covered = ranges
+            else:
+                covered = {
+                    prot: subtract_ranges(r, subtract_ranges(r, ranges.get(prot, [])))
+                    for prot, r in covered.items()
+                }
+
+        result[name] = [
+            e for e in entries
+            if subtract_ranges([parse_ports((e["from"], e["to"]))],
+                               (covered or {}).get(e["prot"], []))
+        ]
+    return result
+
+
+def entry_attrs(entry):
+    """vzEntry attributes for a compiled entry."""
+    return {
+        "name": entry["name"],
+        "etherT": "ip",
+        "prot": entry["prot"],
+        "dFromPort": entry["from"],
+        "dToPort": entry["to"]
+    }
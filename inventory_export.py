@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Streaming inventory export (README Task C): one row per EPG with
+
+    tenant, ap, epg, bd, vrf, subnets, provides, consumes
+
+written to NDJSON, CSV or Parquet while the EPGs are still arriving.
+
+- the BD side (BD -> VRF and subnets) is small and is read first, in one
+  paged class query with the fvRsCtx / fvSubnet children
+- the EPGs are then streamed page by page with their fvRsBd / fvRsProv /
+  fvRsCons children (list_epgs.iter_class, apic_stream.py) and each one
+  is written out as soon as it is parsed
+
+So memory holds the BD map and one page in flight, never the whole
+document. Parquet output needs pyarrow (pip install pyarrow) and is
+written in row groups of PARQUET_BATCH rows.
+
+Usage:
+    APIC_URL=https://apic.lab python inventory_export.py acme_epgs.csv --tenant ACME
+    python inventory_export.py fabric.parquet           # every tenant
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+
+import urllib3
+
+from apic_client import ApicClient
+from apic_dn import dn_names
+from list_epgs import iter_class
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # NDJSON and CSV still work
+    pyarrow = None
+
+urllib3.disable_warnings()
+
+# -----------------------------
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
+# -----------------------------
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
+TENANT = None                 # e.g. "ACME"; None = every tenant
+
+PAGE_SIZE = 1000              # EPGs per page
+PARQUET_BATCH = 10000         # rows per Parquet row group
+LIST_SEPARATOR = " "          # joins subnets / contracts in CSV cells
+
+FIELDS = ("tenant", "ap", "epg", "bd", "vrf", "subnets", "provides", "consumes")
+LIST_FIELDS = ("subnets", "provides", "consumes")
+
+
+def apic_login():
+    """Log into APIC and return an authenticated session."""
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
+    print(f"[+] Logged into APIC as {USER}")
+    return session
+
+
+# -----------------------------
+# Rows
+# -----------------------------
+def _tenant_filter(cls, tenants):
+    if not tenants:
+        return ""
+    wcards = ",".join(f'wcard({cls}.dn,"^uni/tn-{re.escape(t)}/")' for t in sorted(tenants))
+    return f"&query-target-filter=or({wcards})"
+
+
+def get_bd_map(session, apic, tenant=None, page_size=PAGE_SIZE):
+    """
+    {(tenant, bd_name): (vrf_name, [subnet_ip, ...])} from one paged
+    fvBD class query carrying the fvRsCtx / fvSubnet children.
+    With a tenant, the BDs of tenant common are read as well.
+    """
+    query = _tenant_filter("fvBD", tenant and {tenant, "common"}) + "&rsp-subtree=children&rsp-subtree-class=fvRsCtx,fvSubnet"
+    bds = {}
+    for item in iter_class(session, "fvBD", page_size, query, apic):
+        body = item["fvBD"]
+        attrs = body["attributes"]
+        vrf = None
+        subnets = []
+        for child in body.get("children", []):
+            for cls, child_body in child.items():
+                if cls == "fvRsCtx":
+                    vrf = child_body["attributes"].get("tnFvCtxName")
+                elif cls == "fvSubnet":
+                    subnets.append(child_body["attributes"].get("ip"))
+        bds[(dn_names(attrs["dn"])["fvTenant"], attrs["name"])] = (vrf, subnets)
+    return bds
+
+
+def iter_inventory_rows(session, apic, tenant=None, page_size=PAGE_SIZE):
+    """
+    Yield one row dict per EPG (see FIELDS), streaming the EPGs.
+    A BD that is not in the EPG's tenant is looked up in tenant common.
+    """
+    bds = get_bd_map(session, apic, tenant, page_size)
+    query = (_tenant_filter("fvAEPg", tenant and [tenant])
+             + "&rsp-subtree=children&rsp-subtree-class=fvRsBd,fvRsProv,fvRsCons")
+
+    for item in iter_class(session, "fvAEPg", page_size, query, apic):
+        body = item["fvAEPg"]
+        names = dn_names(body["attributes"]["dn"])
+        row = {
+            "tenant": names.get("fvTenant"),
+            "ap": names.get("fvAp"),
+            "epg": body["attributes"]["name"],
+            "bd": None,
+            "vrf": None,
+            "subnets": [],
+            "provides": [],
+            "consumes": [],
+        }
+        for child in body.get("children", []):
+            for cls, child_body in child.items():
+                attrs = child_body["attributes"]
+                if cls == "fvRsBd":
+                    row["bd"] = attrs.get("tnFvBDName")
+                elif cls == "fvRsProv":
+                    row["provides"].append(attrs.get("tnVzBrCPName"))
+                elif cls == "fvRsCons":
+                    row["consumes"].append(attrs.get("tnVzBrCPName"))
+
+        bd = bds.get((row["tenant"], row["bd"])) or bds.get(("common", row["bd"]))
+        if bd:
+            row["vrf"], row["subnets"] = bd[0], list(bd[1])
+        yield row
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+class NdjsonWriter:
+    """One JSON object per line."""
+
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, row):
+        self.f.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class CsvWriter:
+    """CSV with a header; list cells joined with LIST_SEPARATOR."""
+
+    def __init__(self, path):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.f, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow({
+            k: LIST_SEPARATOR.join(v) if k in LIST_FIELDS else (v or "")
+            for k, v in row.items()
+        })
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """Columnar Parquet (list columns stay lists), one row group per batch."""
+
+    def __init__(self, path, batch_size=PARQUET_BATCH):
+        if pyarrow is None:
+            raise SystemExit("pyarrow is needed for Parquet output: pip install pyarrow")
+        self.schema = pyarrow.schema([
+            (f, pyarrow.list_(pyarrow.string()) if f in LIST_FIELDS else pyarrow.string())
+            for f in FIELDS
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.columns = {f: [] for f in FIELDS}
+        self.pending = 0
+
+    def write(self, row):
+        for f in FIELDS:
+            self.columns[f].append(row[f])
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(pyarrow.Table.from_pydict(self.columns, schema=self.schema))
+            self.columns = {f: [] for f in FIELDS}
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+WRITERS = {"ndjson": NdjsonWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "ndjson",
+              ".csv": "csv", ".parquet": "parquet"}
+
+
+def format_for(path):
+    """Output format from the file extension."""
+    for ext, fmt in EXTENSIONS.items():
+        if path.endswith(ext):
+            return fmt
+    raise ValueError(f"Unknown output format for {path} (use {', '.join(EXTENSIONS)})")
+
+
+def export_inventory(session, apic, path, fmt=None, tenant=None, page_size=PAGE_SIZE):
+    """Stream the inventory rows into path. Returns the number of rows."""
+    fmt = fmt or format_for(path)
+    writer = WRITERS[fmt](path)
+    count = 0
+    try:
+        for row in iter_inventory_rows(session, apic, tenant, page_size):
+            writer.write(row)
+            count += 1
+    finally:
+        writer.close()
+    print(f"[EXPORT] {count} EPG rows -> {path} ({fmt})")
+    return count
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the EPG inventory")
+    parser.add_argument("output", help="file ending in .ndjson/.jsonl, .csv or .parquet")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="override the extension")
+    parser.add_argument("--tenant", default=TENANT, help="one tenant (default: all)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    sess = apic_login()
+    export_inventory(sess, APIC, args.output, args.format, args.tenant, args.page_size)
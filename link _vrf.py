@@ -1,6 +1,7 @@
-import requests
 import urllib3
 
+from apic_client import ApicClient
+
 urllib3.disable_warnings()
 
 APIC = api url
@@ -9,16 +10,8 @@ PASS = 'password'
 
 
 def apic_login():
-    session = requests.Session()
-    payload = {
-        "aaaUser": {
-            "attributes": {"name": USER, "pwd": PASS}
-        }
-    }
-
-    resp = session.post(f"{APIC}/api/aaaLogin.json", json=payload, verify=False)
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     return session
 
 
@@ -1,6 +1,10 @@
-import requests
 import urllib3
 import json
+import re
+
+from apic_client import ApicClient
+from apic_dn import dn_names
+from apic_stream import iter_imdata
 
 urllib3.disable_warnings()
 
@@ -12,27 +16,37 @@ TENANT_FILTER = "ACME"      # only show this tenant
 
 
 def apic_login():
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {"attributes": {"name": USER, "pwd": PASS}}
-    }
-
-    resp = session.post(url, json=payload, verify=False)
-    token = resp.json()['imdata'][0]['aaaLogin']['attributes']['token']
-    session.cookies['APIC-cookie'] = token
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     return session
 
 
 def get_all_epgs(session):
     """
     Retrieves ALL EPGs (fvAEPg) from APIC, then filters them
-    for the specified tenant.
+    for the specified tenant. The EPGs are parsed as they stream in.
     """
     url = f"{APIC}/api/node/class/fvAEPg.json"
-    resp = session.get(url, verify=False)
-    return resp.json()
+    resp = session.get(url, stream=True, verify=False)
+    return {"imdata": iter_imdata(resp)}
+
+
+def get_tenant_epgs(session, tenant):
+    """
+    Retrieves only the EPGs of one tenant by letting the APIC filter
+    on the DN (query-target-filter=wcard). Falls back to the full
+    class query if the filter is rejected.
+    """
+    url = (
+        f"{APIC}/api/node/class/fvAEPg.json"
+        f'?query-target-filter=wcard(fvAEPg.dn,"^uni/tn-{re.escape(tenant)}/")'
+    )
+    resp = session.get(url, stream=True, verify=False)
+    if resp.status_code >= 300:
+        print(f"[WARN] Tenant filter rejected (HTTP {resp.status_code}), fetching all EPGs")
+        resp.close()
+        return get_all_epgs(session)
+    return {"imdata": iter_imdata(resp)}
 
 
 def print_acme_epgs(epg_data, tenant):
@@ -44,13 +58,14 @@ def print_acme_epgs(epg_data, tenant):
         dn = epg_attrs["dn"]  # Example: uni/tn-ACME/ap-Web_Tier/epg-Web-Frontend
 
         # Filter: only list EPGs belonging to the ACME tenant
-        if not dn.startswith(f"uni/tn-{tenant}"):
+        # (normally done by the APIC already; kept for the fallback path)
+        if not dn.startswith(f"uni/tn-{tenant}/"):
             continue
 
         # Extract tenant, app profile, and epg name
-        parts = dn.split("/")
-        tenant_name = parts[1].replace("tn-", "")
-        app = parts[2].replace("ap-", "")
+        names = dn_names(dn)
+        tenant_name = names.get("fvTenant", "")
+        app = names.get("fvAp", "")
         epg = epg_attrs["name"]
 
         print(f"Tenant: {tenant_name:12}  App: {app:18}  EPG: {epg}")
@@ -58,5 +73,5 @@ def print_acme_epgs(epg_data, tenant):
 
 if __name__ == "__main__":
     session = apic_login()
-    epgs = get_all_epgs(session)
+    epgs = get_tenant_epgs(session, TENANT_FILTER)
     print_acme_epgs(epgs, TENANT_FILTER)
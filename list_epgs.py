@@ -1,12 +1,22 @@
-import requests
 import json
+import os
+
 import urllib3
 
+from apic_client import ApicClient
+from apic_dn import dn_names
+from apic_model import Mo, load
+from apic_stream import ImdataStream
+from mo_cache import MoCache
+
 urllib3.disable_warnings()  # suppress self-signed cert warnings
 
-APIC = api url
-USER = 'username'
-PASS = 'password'
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
+
+PAGE_SIZE = 1000    # MOs per page for class queries
+MO_CACHE = None     # e.g. ".apic_cache.sqlite" to reuse objects across runs
 
 
 def apic_login():
@@ -14,56 +24,103 @@ def apic_login():
     Logs into APIC and returns an authenticated session
     including the APIC session cookie.
     """
-    login_url = f"{APIC}/api/aaaLogin.json"
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    session = requests.Session()
-    response = session.post(login_url, json=payload, verify=False)
-
-    # Extract token and attach cookie
-    token = response.json()['imdata'][0]['aaaLogin']['attributes']['token']
-    session.cookies['APIC-cookie'] = token
-
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     return session
 
 
-def get_epgs(session):
+def get_epgs(session, cache=None):
     """
     Retrieves all EPGs (fvAEPg objects) from the APIC.
+    With an MoCache only EPGs changed since the last run are downloaded.
     """
+    if cache is not None:
+        return {"imdata": cache.refresh(session, APIC, "fvAEPg")}
+
     url = f"{APIC}/api/node/class/fvAEPg.json"
     response = session.get(url, verify=False)
     return response.json()
 
 
+def iter_class(session, class_name, page_size=PAGE_SIZE, query="", apic=None):
+    """
+    Yields every MO of a class, one page at a time.
+
+    Uses page / page-size with order-by=<class>.dn so that pages stay
+    stable while paging. Each page is parsed as it streams in (see
+    apic_stream.py), so only one object is held in memory at a time.
+    query adds options such as "&rsp-subtree=children"; apic overrides
+    the module's APIC URL.
+    """
+    page = 0
+    while True:
+        url = (
+            f"{apic or APIC}/api/node/class/{class_name}.json"
+            f"?order-by={class_name}.dn&page={page}&page-size={page_size}{query}"
+        )
+        response = session.get(url, stream=True, verify=False)
+        response.raise_for_status()
+        stream = ImdataStream(response)
+
+        count = 0
+        for item in stream:
+            count += 1
+            yield item
+
+        page += 1
+        total = stream.total_count
+        if count < page_size:
+            break
+        if total is not None and page * page_size >= int(total):
+            break
+
+
+def iter_epgs(session, page_size=PAGE_SIZE):
+    """
+    Yields EPGs (fvAEPg objects) page by page as they arrive.
+    """
+    return iter_class(session, "fvAEPg", page_size)
+
+
+def load_epgs(session, page_size=PAGE_SIZE):
+    """
+    All EPGs as compact FvAEPg objects (name and dn only, see apic_model),
+    converted page by page. Meant for fabric-wide pulls.
+    """
+    return load(iter_epgs(session, page_size))
+
+
 def print_epg_list(epg_data):
     """
     Nicely prints the EPG names, tenants, and application profiles.
+
+    epg_data is either a full response ({"imdata": [...]}) or any
+    iterable of imdata items (e.g. iter_epgs()) or of FvAEPg objects
+    (load_epgs()).
     """
     print("\n--- EPG List ---")
 
-    for item in epg_data.get("imdata", []):
-        epg = item["fvAEPg"]["attributes"]
+    if isinstance(epg_data, dict):
+        epg_data = epg_data.get("imdata", [])
+
+    for item in epg_data:
+        epg = item.attributes() if isinstance(item, Mo) else item["fvAEPg"]["attributes"]
         
         epg_name = epg["name"]
         dn = epg["dn"]  # contains full path e.g. uni/tn-Heroes/ap-App1/epg-Frontend
 
         # extract items from the DN
-        parts = dn.split("/")
-        tenant  = parts[1].replace("tn-", "")
-        app     = parts[2].replace("ap-", "")
+        names   = dn_names(dn)
+        tenant  = names.get("fvTenant", "")
+        app     = names.get("fvAp", "")
 
         print(f"Tenant: {tenant:15}  App Profile: {app:15}  EPG: {epg_name}")
 
 
 if __name__ == "__main__":
     session = apic_login()
-    epgs = get_epgs(session)
-    print_epg_list(epgs)
+    if MO_CACHE:
+        with MoCache(MO_CACHE) as cache:
+            print_epg_list(get_epgs(session, cache))
+    else:
+        print_epg_list(iter_epgs(session))
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Live tenant inventory for Cisco ACI, kept current by APIC event subscriptions.
+
+Instead of polling, the service:
+
+- opens the APIC event websocket (wss://<apic>/socket<token>)
+- runs the tenant inventory query once with subscription=yes, which
+  returns the current objects plus a subscriptionId
+- applies every pushed create / modify / delete event to an in-memory
+  DN -> object model
+- refreshes the subscription (subscriptionRefresh.json) well before the
+  APIC times it out, and re-subscribes from a fresh snapshot whenever the
+  websocket drops or a refresh is refused
+
+LiveInventory.inventory() returns the same structure as
+tenent_inventory.build_tenant_inventory(), built from memory, so readers
+put no load on the controllers. Run standalone it prints the inventory
+every time it changes, and can serve it as JSON for dashboards:
+
+    python live_inventory.py                 # print on every change
+    python live_inventory.py --serve 8080    # GET /inventory.json
+
+Point APIC_URL at apic_sim.py to try it offline; the simulator pushes
+events for every POST it receives.
+"""
+
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import urllib3
+
+from apic_client import ApicClient
+from apic_dn import parent_dn
+from apic_websocket import WebSocket, WebSocketClosed
+from tenent_inventory import INVENTORY_CLASSES, inventory_from_mos, print_inventory
+
+urllib3.disable_warnings()
+
+# -----------------------------
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
+# -----------------------------
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
+TENANT = "ACME"               # <-- tenant to follow
+REFRESH_INTERVAL = 30         # seconds between subscription refreshes (APIC drops them after 60)
+RECONNECT_DELAY = 5           # seconds to wait before re-subscribing after a failure
+
+
+# -----------------------------
+# Login
+# -----------------------------
+def apic_login():
+    """Log into APIC and return an authenticated session."""
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
+    print(f"[+] Logged into APIC as {USER}")
+    return session
+
+
+# -----------------------------
+# Live model
+# -----------------------------
+class LiveInventory:
+    """
+    In-memory tenant inventory fed by one APIC subscription.
+    `session` must be an ApicClient: its token opens the websocket.
+    """
+
+    def __init__(self, session, tenant, classes=INVENTORY_CLASSES,
+                 refresh_interval=REFRESH_INTERVAL, reconnect_delay=RECONNECT_DELAY):
+        self.session = session
+        self.tenant = tenant
+        self.classes = classes
+        self.refresh_interval = refresh_interval
+        self.reconnect_delay = reconnect_delay
+
+        self.mos = {}           # dn -> (class, attributes)
+        self.children = {}      # parent dn -> {dn, ...}
+        self.version = 0        # bumped on every applied change
+        self.changed = threading.Condition()
+        self.subscription_id = None
+        self.ws = None
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ---- lifecycle ----
+    def start(self):
+        """Take the first snapshot, then follow events on background threads."""
+        self._subscribe()
+        for target in (self._event_loop, self._refresh_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.ws:
+            self.ws.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- subscription ----
+    def _subscribe(self):
+        """
+        Open the websocket, then run the subscribed snapshot query. The
+        socket comes first so no event between the two is lost; events
+        already reflected in the snapshot are applied again harmlessly.
+        """
+        self.session.ensure_token()
+        ws_url = "ws" + self.session.apic[len("http"):]
+        ws = WebSocket(f"{ws_url}/socket{self.session.token}", verify=self.session.verify)
+        ws.connect()
+
+        url = (
+            f"/api/node/mo/uni/tn-{self.tenant}.json"
+            f"?query-target=subtree&target-subtree-class={self.classes}"
+            "&subscription=yes"
+        )
+        try:
+            resp = self.session.get(url)
+            resp.raise_for_status()
+        except Exception:
+            ws.close()
+            raise
+        data = resp.json()
+
+        with self.changed:
+            self.mos = {}
+            self.children = {}
+            for item in data.get("imdata", []):
+                for cls, body in item.items():
+                    self._put(cls, dict(body["attributes"]))
+            self.subscription_id = data["subscriptionId"]
+            self.ws = ws
+            self.version += 1
+            self.changed.notify_all()
+        print(f"[LIVE] Subscribed to tenant '{self.tenant}' "
+              f"({len(self.mos)} objects, id {self.subscription_id})")
+
+    def _resubscribe(self):
+        """Retry _subscribe() until it works or the service stops."""
+        if self.ws:
+            self.ws.close()
+        while not self._stop.is_set():
+            try:
+                self._subscribe()
+                return
+            except Exception as exc:
+                print(f"[LIVE] Re-subscribe failed: {exc}")
+                self._stop.wait(self.reconnect_delay)
+
+    def _event_loop(self):
+        while not self._stop.is_set():
+            try:
+                message = json.loads(self.ws.recv())
+            except (WebSocketClosed, OSError, AttributeError):
+                if self._stop.is_set():
+                    return
+                print("[LIVE] Websocket closed, re-subscribing")
+                self._resubscribe()
+                continue
+            if self.subscription_id in message.get("subscriptionId", []):
+                self.apply(message.get("imdata", []))
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            sub_id = self.subscription_id
+            try:
+                resp = self.session.get(f"/api/subscriptionRefresh.json?id={sub_id}")
+                ok = resp.status_code < 300
+            except Exception as exc:
+                print(f"[LIVE] Subscription refresh failed: {exc}")
+                continue
+            if not ok and sub_id == self.subscription_id:
+                # the subscription is gone: dropping the socket makes the
+                # event loop re-subscribe from a fresh snapshot
+                print(f"[LIVE] Subscription {sub_id} expired -> HTTP {resp.status_code}")
+                self.ws.close()
+
+    # ---- model ----
+    def _put(self, cls, attrs):
+        attrs.pop("status", None)
+        dn = attrs["dn"]
+        self.mos[dn] = (cls, attrs)
+        self.children.setdefault(parent_dn(dn), set()).add(dn)
+
+    def _drop(self, dn):
+        for child in self.children.pop(dn, ()):
+            self._drop(child)
+        if self.mos.pop(dn, None) is not None:
+            self.children.get(parent_dn(dn), set()).discard(dn)
+
+    def _fetch(self, dn):
+        """(class, attributes) of one MO read from the APIC, or None if it is gone."""
+        resp = self.session.get(f"/api/node/mo/{dn}.json")
+        if resp.status_code >= 300:
+            return None
+        for item in resp.json().get("imdata", []):
+            for cls, body in item.items():
+                return cls, dict(body["attributes"])
+        return None
+
+    def apply(self, imdata):
+        """
+        Apply pushed event objects (attributes carry a status) to the model.
+        A modify event only carries the changed properties, so one for an
+        object not in the model yet is completed by reading the object.
+        """
+        missing = []
+        with self.changed:
+            for item in imdata:
+                for cls, body in item.items():
+                    attrs = dict(body["attributes"])
+                    status = attrs.pop("status", "")
+                    dn = attrs["dn"]
+                    if status == "deleted":
+                        self._drop(dn)
+                    elif status == "created":
+                        self._put(cls, attrs)
+                    elif dn in self.mos:
+                        self.mos[dn][1].update(attrs)
+                    else:
+                        missing.append(dn)
+            self.version += 1
+            self.changed.notify_all()
+
+        for dn in missing:
+            mo = self._fetch(dn)
+            if mo is not None:
+                with self.changed:
+                    if dn not in self.mos:
+                        self._put(*mo)
+                        self.version += 1
+                        self.changed.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the model is newer than `version`; return the current version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def inventory(self):
+        """Current inventory, same structure as build_tenant_inventory()."""
+        with self.changed:
+            mos = [(cls, attrs, parent_dn(dn)) for dn, (cls, attrs) in self.mos.items()]
+        return inventory_from_mos(self.tenant, mos)
+
+
+# -----------------------------
+# JSON endpoint
+# -----------------------------
+def serve_inventory(live, port, host="0.0.0.0"):
+    """Serve live.inventory() at GET /inventory.json (blocks)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/inventory.json":
+                self.send_error(404)
+                return
+            data = json.dumps(live.inventory()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"[LIVE] Serving http://{host}:{port}/inventory.json")
+    httpd.serve_forever()
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live tenant inventory")
+    parser.add_argument("--tenant", default=TENANT)
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="serve the inventory as JSON instead of printing it")
+    args = parser.parse_args()
+
+    sess = apic_login()
+    with LiveInventory(sess, args.tenant) as live:
+        try:
+            if args.serve:
+                serve_inventory(live, args.serve)
+            else:
+                version = 0
+                while True:
+                    version = live.wait_for_change(version)
+                    print_inventory(live.inventory())
+        except KeyboardInterrupt:
+            print("\n[LIVE] stopped")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Persistent, DN-keyed cache of APIC managed objects.
+
+Objects are stored in a local SQLite file with their class, modTs and
+attributes. MoCache.refresh() asks the APIC only for objects whose modTs
+is newer than the newest one already cached for that class and scope
+(query-target-filter=gt(<class>.modTs,"...")), stores them, and returns
+the full cached set in the usual imdata shape:
+
+    [{"fvAEPg": {"attributes": {...}}}, ...]
+
+so callers can treat it exactly like resp.json()["imdata"].
+
+Eviction:
+- entries not re-fetched for max_age seconds are dropped, and so are
+  the oldest entries once the cache holds more than max_entries
+- whenever entries of a class are evicted, that class is fully
+  re-fetched on its next refresh; multi-class marks (class "*", see
+  tenent_inventory.refresh_tenant_inventory) are reset on any eviction
+
+A modTs filter cannot see deletions, so a deleted object stays cached
+until it ages out; max_age therefore bounds how stale a cache can get.
+
+Usage:
+    from mo_cache import MoCache
+
+    with MoCache(".apic_cache.sqlite") as cache:
+        items = cache.refresh(session, APIC, "fvAEPg", scope_dn="uni/tn-ACME")
+"""
+
+import json
+import sqlite3
+import time
+from urllib.parse import quote
+
+# -----------------------------
+# Defaults
+# -----------------------------
+CACHE_PATH = ".apic_cache.sqlite"
+MAX_ENTRIES = 2_000_000     # objects kept on disk
+MAX_AGE = 24 * 3600         # seconds before an object must be re-fetched
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mo (
+    dn      TEXT PRIMARY KEY,
+    cls     TEXT NOT NULL,
+    mod_ts  TEXT,
+    attrs   TEXT NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mo_cls ON mo (cls, dn);
+CREATE INDEX IF NOT EXISTS mo_fetched ON mo (fetched);
+CREATE TABLE IF NOT EXISTS high_water (
+    key     TEXT PRIMARY KEY,
+    cls     TEXT NOT NULL,
+    mod_ts  TEXT NOT NULL
+);
+"""
+
+
+class MoCache:
+    """On-disk MO cache keyed by DN (see module docstring)."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, max_age=MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    # -----------------------------
+    # Objects
+    # -----------------------------
+    def put_many(self, cls, attrs_list):
+        """Store (or replace) objects of one class."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO mo (dn, cls, mod_ts, attrs, fetched) VALUES (?, ?, ?, ?, ?)",
+            [(a["dn"], cls, a.get("modTs"), json.dumps(a), now) for a in attrs_list],
+        )
+
+    def get(self, dn):
+        """Return (class, attributes) for a DN, or None."""
+        row = self.db.execute("SELECT cls, attrs FROM mo WHERE dn = ?", (dn,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def delete(self, dns):
+        self.db.executemany("DELETE FROM mo WHERE dn = ?", [(dn,) for dn in dns])
+
+    def delete_subtree(self, dn):
+        """Delete an object and every cached object below it."""
+        self.db.execute(
+            "DELETE FROM mo WHERE dn = ? OR (dn >= ? AND dn < ?)",
+            (dn, dn + "/", dn + "/\uffff"),
+        )
+
+    def dns(self, classes, prefix=""):
+        """Set of cached DNs of the given classes under a DN prefix."""
+        marks = ",".join("?" * len(classes))
+        rows = self.db.execute(
+            f"SELECT dn FROM mo WHERE cls IN ({marks}) AND dn >= ? AND dn < ?",
+            (*classes, prefix, prefix + "\uffff"),
+        )
+        return {dn for (dn,) in rows}
+
+    def items(self, cls, prefix=""):
+        """Cached objects of a class under a DN prefix, as imdata items."""
+        rows = self.db.execute(
+            "SELECT attrs FROM mo WHERE cls = ? AND dn >= ? AND dn < ? ORDER BY dn",
+            (cls, prefix, prefix + "\uffff"),
+        )
+        return [{cls: {"attributes": json.loads(attrs)}} for (attrs,) in rows]
+
+    # -----------------------------
+    # High-water marks
+    # -----------------------------
+    def high_water(self, key):
+        row = self.db.execute("SELECT mod_ts FROM high_water WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_high_water(self, key, cls, mod_ts):
+        self.db.execute(
+            "INSERT OR REPLACE INTO high_water (key, cls, mod_ts) VALUES (?, ?, ?)",
+            (key, cls, mod_ts),
+        )
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def evict(self):
+        """
+        Drop entries older than max_age and the oldest entries above
+        max_entries. Classes that lost entries are fully re-fetched next time.
+        """
+        cutoff = time.time() - self.max_age
+        classes = {c for (c,) in self.db.execute(
+            "SELECT DISTINCT cls FROM mo WHERE fetched < ?", (cutoff,))}
+        self.db.execute("DELETE FROM mo WHERE fetched < ?", (cutoff,))
+
+        (count,) = self.db.execute("SELECT COUNT(*) FROM mo").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            oldest = "SELECT dn FROM mo ORDER BY fetched LIMIT ?"
+            classes |= {c for (c,) in self.db.execute(
+                f"SELECT DISTINCT cls FROM mo WHERE dn IN ({oldest})", (excess,))}
+            self.db.execute(f"DELETE FROM mo WHERE dn IN ({oldest})", (excess,))
+
+        if classes:
+            classes.add("*")
+        self.db.executemany("DELETE FROM high_water WHERE cls = ?", [(c,) for c in classes])
+        self.db.commit()
+
+    # -----------------------------
+    # Revalidation
+    # -----------------------------
+    def refresh(self, session, apic, cls, scope_dn=None):
+        """
+        Fetch the objects of a class that changed since the last refresh,
+        store them, and return every cached object of that class (under
+        scope_dn if given) as imdata items.
+        """
+        self.evict()
+        key = f"{cls}@{scope_dn or '*'}"
+        mark = self.high_water(key)
+
+        if scope_dn:
+            url = (
+                f"{apic}/api/node/mo/{scope_dn}.json"
+                f"?query-target=subtree&target-subtree-class={cls}"
+            )
+        else:
+            url = f"{apic}/api/node/class/{cls}.json"
+        if mark:
+            # gt, not ge: one tree POST stamps all its objects with the
+            # same modTs, and ge would re-download that whole batch
+            url += "&" if "?" in url else "?"
+            # the "+" of the UTC offset must not be read as a space
+            url += f'query-target-filter=gt({cls}.modTs,"{quote(mark)}")'
+
+        resp = session.get(url, verify=False)
+        resp.raise_for_status()
+        changed = [item[cls]["attributes"] for item in resp.json().get("imdata", []) if cls in item]
+
+        self.put_many(cls, changed)
+        stamps = [a["modTs"] for a in changed if a.get("modTs")]
+        if stamps:
+            self.set_high_water(key, cls, max(stamps + ([mark] if mark else [])))
+        self.db.commit()
+
+        return self.items(cls, f"{scope_dn}/" if scope_dn else "")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Zoning-rule (policy TCAM) estimate for contract bindings.
+
+Every contract turns into hardware zoning rules on the leaves, roughly
+
+    provider EPGs x consumer EPGs x filter entries x directions
+
+for each VRF (EPGs only talk through a contract inside their VRF), and a
+leaf holds the rules of every pair with an EPG deployed on it. This
+script predicts those numbers before create_contracts.py binds anything:
+
+- planned  from create_contracts.py's bindings and compiled filters
+           (default)
+- live     from a fetched tenant: EPG -> VRF and contract relations
+           (inventory_export.iter_inventory_rows) plus the entry count
+           of every contract's filters
+
+An optional placement file ({"leaf-101": ["Web_Tier/Web-Frontend", ...]})
+gives per-leaf numbers; without it every EPG is assumed on every leaf
+(the worst case).
+
+Every estimate is kept in ESTIMATE_CACHE under its label ("planned",
+"live ACME") together with its inputs, so a fetched tenant can be
+estimated again (other placement, directions or capacity) and compared
+with earlier estimates without fetching it again.
+
+Usage:
+    python tcam_estimator.py
+    APIC_URL=https://apic.lab python tcam_estimator.py --live --tenant ACME
+    python tcam_estimator.py --cached --tenant ACME --placement leaves.json
+    python tcam_estimator.py --live --tenant ACME --compare planned
+"""
+
+import argparse
+import getpass
+import json
+import os
+import time
+
+import urllib3
+
+from apic_client import ApicClient
+from apic_dn import dn_names
+
+urllib3.disable_warnings()
+
+TENANT = "ACME"
+DIRECTIONS = 2                  # "apply both directions": one rule each way
+TCAM_CAPACITY = 64 * 1024       # policy TCAM entries per leaf (platform dependent)
+WARN_RATIO = 0.8                # warn above this share of TCAM_CAPACITY
+ESTIMATE_CACHE = ".tcam_estimates.json"
+PLANNED = "planned"             # cache label of create_contracts.py's estimate
+
+
+# -----------------------------
+# Inputs
+# -----------------------------
+def rows_from_bindings(bindings, vrf):
+    """
+    EPG rows {"epg": "app/epg", "vrf", "provides", "consumes"} from
+    (action, app, epg, contract) bindings, all EPGs in one VRF.
+    """
+    rows = {}
+    for action, app, epg, contract in bindings:
+        row = rows.setdefault(f"{app}/{epg}", {"epg": f"{app}/{epg}", "vrf": vrf,
+                                               "provides": [], "consumes": []})
+        row["provides" if action == "provide" else "consumes"].append(contract)
+    return list(rows.values())
+
+
+def planned_inputs(bindings, compiled_filters, contract_filters, vrf):
+    """
+    Rows and {contract: entries} for planned bindings, e.g. those of
+    create_contracts.py: its plan_bindings(), compile_filters(),
+    CONTRACT_FILTERS and VRF_NAME.
+    """
+    entries = {}
+    for contract, filters in contract_filters.items():
+        filters = [filters] if isinstance(filters, str) else filters
+        entries[contract] = sum(len(compiled_filters.get(f, [])) for f in filters)
+    return rows_from_bindings(bindings, vrf), entries
+
+
+def get_contract_entry_counts(session, apic, tenant):
+    """
+    {contract: vzEntry count of its filters} for the tenant, from one
+    subtree query for the filter relations (subjects and their
+    vzInTerm / vzOutTerm) and the filter entries.
+    """
+    url = (
+        f"{apic}/api/node/mo/uni/tn-{tenant}.json"
+        "?query-target=subtree"
+        "&target-subtree-class=vzRsSubjFiltAtt,vzRsFiltAtt,vzEntry"
+        "&rsp-prop-include=naming-only"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+
+    filter_entries = {}     # filter -> entries
+    contract_filters = {}   # contract -> {filter, ...}
+    for item in resp.json().get("imdata", []):
+        for cls, body in item.items():
+            attrs = body["attributes"]
+            names = dn_names(attrs["dn"])
+            if cls == "vzEntry":
+                filter_entries[names["vzFilter"]] = filter_entries.get(names["vzFilter"], 0) + 1
+            else:
+                contract_filters.setdefault(names["vzBrCP"], set()).add(attrs["tnVzFilterName"])
+    return {
+        contract: sum(filter_entries.get(f, 0) for f in filters)
+        for contract, filters in contract_filters.items()
+    }
+
+
+def live_inputs(session, apic, tenant):
+    """Rows and {contract: entries} read from the tenant on the APIC."""
+    from inventory_export import iter_inventory_rows
+
+    rows = [
+        {"epg": f"{r['ap']}/{r['epg']}", "vrf": r["vrf"],
+         "provides": r["provides"], "consumes": r["consumes"]}
+        for r in iter_inventory_rows(session, apic, tenant)
+    ]
+    return rows, get_contract_entry_counts(session, apic, tenant)
+
+
+# -----------------------------
+# Estimate
+# -----------------------------
+def estimate_rules(rows, entries, placement=None, directions=DIRECTIONS):
+    """
+    Estimate zoning rules.
+
+    rows:      [{"epg", "vrf", "provides", "consumes"}, ...]
+    entries:   {contract: filter entries}
+    placement: {leaf: [epg, ...]} or None (every EPG on every leaf)
+
+    Returns {"total", "per_leaf", "by_vrf": {vrf: rules},
+             "by_contract": {contract: {...}}, "by_leaf": {leaf: rules}}
+    """
+    sides = {}      # (contract, vrf) -> (providers, consumers)
+    for row in rows:
+        for side, contracts in ((0, row["provides"]), (1, row["consumes"])):
+            for contract in contracts:
+                # no VRF as "": a None key would come back from the cache as "null"
+                pair = sides.setdefault((contract, row["vrf"] or ""), (set(), set()))
+                pair[side].add(row["epg"])
+
+    by_contract = {}
+    by_vrf = {}
+    by_leaf = {leaf: 0 for leaf in placement or ()}
+    for (contract, vrf), (providers, consumers) in sorted(sides.items(), key=str):
+        per_pair = entries.get(contract, 0) * directions
+        rules = len(providers) * len(consumers) * per_pair
+        stats = by_contract.setdefault(contract, {"providers": 0, "consumers": 0,
+                                                  "entries": entries.get(contract, 0), "rules": 0})
+        stats["providers"] += len(providers)
+        stats["consumers"] += len(consumers)
+        stats["rules"] += rules
+        by_vrf[vrf] = by_vrf.get(vrf, 0) + rules
+
+        for leaf, epgs in (placement or {}).items():
+            # pairs with at least one side on the leaf
+            away = (len(providers - set(epgs))) * (len(consumers - set(epgs)))
+            by_leaf[leaf] += (len(providers) * len(consumers) - away) * per_pair
+
+    total = sum(by_vrf.values())
+    return {
+        "total": total,
+        "per_leaf": max(by_leaf.values()) if by_leaf else total,
+        "by_vrf": by_vrf,
+        "by_contract": by_contract,
+        "by_leaf": by_leaf,
+    }
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+def _load_cache(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def load_estimate(label, cache_path=ESTIMATE_CACHE):
+    """
+    The estimate stored under a label, or None:
+    {"created", "inputs": {"rows", "entries", "placement", "directions"},
+     "estimate"}.
+    """
+    record = _load_cache(cache_path).get(label)
+    return record if record and "inputs" in record else None
+
+
+def store_estimate(label, rows, entries, placement=None, directions=DIRECTIONS,
+                   cache_path=ESTIMATE_CACHE):
+    """
+    estimate_rules() for the inputs, stored with them under the label
+    (replacing the earlier one). Returns (estimate, previous record or None).
+    """
+    estimate = estimate_rules(rows, entries, placement, directions)
+    cache = _load_cache(cache_path)
+    previous = cache.get(label)
+    cache[label] = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "inputs": {"rows": rows, "entries": entries,
+                   "placement": placement, "directions": directions},
+        "estimate": estimate,
+    }
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    return estimate, previous
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def print_estimate(estimate, capacity=TCAM_CAPACITY):
+    print("\n=== Zoning-rule estimate ===\n")
+    print(f"  {'Contract':28}  {'Providers':>9}  {'Consumers':>9}  {'Entries':>7}  {'Rules':>8}")
+    print(f"  {'-' * 28}  {'-' * 9}  {'-' * 9}  {'-' * 7}  {'-' * 8}")
+    for contract, s in sorted(estimate["by_contract"].items(), key=lambda c: -c[1]["rules"]):
+        print(f"  {contract:28}  {s['providers']:>9}  {s['consumers']:>9}  "
+              f"{s['entries']:>7}  {s['rules']:>8}")
+
+    print("\n  Per VRF:")
+    for vrf, rules in estimate["by_vrf"].items():
+        print(f"    {vrf or '(no VRF)'}: {rules} rules")
+
+    if estimate["by_leaf"]:
+        print("\n  Per leaf:")
+        for leaf, rules in sorted(estimate["by_leaf"].items()):
+            print(f"    {leaf}: {rules} rules ({100 * rules / capacity:.1f}% of {capacity})")
+    else:
+        print("\n  Per leaf (every EPG on every leaf): "
+              f"{estimate['per_leaf']} rules ({100 * estimate['per_leaf'] / capacity:.1f}% of {capacity})")
+
+    if estimate["per_leaf"] > WARN_RATIO * capacity:
+        print(f"\n[!] Above {int(WARN_RATIO * 100)}% of leaf policy TCAM: "
+              "merge filter ranges (filter_compiler.py) or narrow the contracts")
+
+
+def print_comparison(estimate, record, label):
+    """Print how an estimate differs from a stored one."""
+    old = record["estimate"]
+    print(f"\n=== Compared with {label} ({record['created']}) ===\n")
+    print(f"  Per leaf: {old['per_leaf']} -> {estimate['per_leaf']} rules")
+    print(f"  Total:    {old['total']} -> {estimate['total']} rules")
+    contracts = old["by_contract"].keys() | estimate["by_contract"].keys()
+    for contract in sorted(contracts):
+        before = old["by_contract"].get(contract, {}).get("rules", 0)
+        after = estimate["by_contract"].get(contract, {}).get("rules", 0)
+        if before != after:
+            print(f"    {contract:28}  {before:>8} -> {after:>8}")
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate zoning rules for contract bindings")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--live", action="store_true",
+                        help="read the tenant from the APIC instead of the planned bindings")
+    source.add_argument("--cached", action="store_true",
+                        help="estimate again from the inputs stored by an earlier run "
+                             "(with --tenant: the last --live fetch)")
+    parser.add_argument("--tenant", help=f"tenant for --live / --cached (e.g. {TENANT})")
+    parser.add_argument("--apic", default=os.environ.get("APIC_URL"),
+                        help="APIC URL for --live (default: APIC_URL)")
+    parser.add_argument("--user", default=os.environ.get("APIC_USER"),
+                        help="APIC user for --live (default: APIC_USER; password from APIC_PASS)")
+    parser.add_argument("--placement", help='JSON file {"leaf": ["app/epg", ...]}')
+    parser.add_argument("--directions", type=int, choices=(1, 2))
+    parser.add_argument("--capacity", type=int, default=TCAM_CAPACITY)
+    parser.add_argument("--compare", metavar="LABEL",
+                        help=f'stored estimate to compare with, e.g. "{PLANNED}" or '
+                             f'"live {TENANT}" (default: the previous one of the same label)')
+    args = parser.parse_args()
+
+    if args.tenant and not (args.live or args.cached):
+        parser.error("--tenant needs --live or --cached (planned mode has no tenant)")
+    if args.live and not args.tenant:
+        args.tenant = TENANT
+    # only fetched tenants are stored as "live <tenant>"
+    label = f"live {args.tenant}" if args.tenant else PLANNED
+
+    placement = None
+    if args.placement:
+        with open(args.placement, encoding="utf-8") as f:
+            placement = json.load(f)
+
+    if args.cached:
+        record = load_estimate(label)
+        if record is None:
+            raise SystemExit(f"[!] No stored estimate '{label}' in {ESTIMATE_CACHE}")
+        inputs = record["inputs"]
+        rows, entries = inputs["rows"], inputs["entries"]
+        placement = placement or inputs["placement"]
+        directions = args.directions or inputs["directions"]
+        print(f"[ESTIMATE] {label}: inputs from {record['created']}, not fetched")
+    elif args.live:
+        if not args.apic or not args.user:
+            raise SystemExit("[!] --live needs --apic / --user (or APIC_URL / APIC_USER)")
+        session = ApicClient(args.apic, args.user,
+                             os.environ.get("APIC_PASS") or getpass.getpass("APIC password: "))
+        session.login()
+        print(f"[+] Logged into APIC as {args.user}")
+        rows, entries = live_inputs(session, args.apic, args.tenant)
+        directions = args.directions or DIRECTIONS
+    else:
+        import create_contracts
+
+        rows, entries = planned_inputs(
+            create_contracts.plan_bindings(),
+            create_contracts.compile_filters(),
+            create_contracts.CONTRACT_FILTERS,
+            create_contracts.VRF_NAME,
+        )
+        directions = args.directions or DIRECTIONS
+
+    if args.cached:
+        estimate = estimate_rules(rows, entries, placement, directions)
+        previous = None
+    else:
+        estimate, previous = store_estimate(label, rows, entries, placement, directions)
+    print(f"[ESTIMATE] {label}: {len(rows)} EPGs, {len(entries)} contracts")
+    print_estimate(estimate, args.capacity)
+
+    if args.compare:
+        previous = load_estimate(args.compare)
+        if previous is None:
+            print(f"\n[!] No stored estimate '{args.compare}' to compare with")
+    if previous and "inputs" in previous:
+        print_comparison(estimate, previous, args.compare or label)
@@ -10,20 +10,35 @@ For a given tenant, show:
     - associated VRF
     - configured subnets
     - EPGs using that BD
+
+The inventory is built from a single subtree query of the tenant, so the
+number of API calls does not grow with the number of BDs or EPGs.
 """
 
-import requests
+import os
+import re
+from urllib.parse import quote
+
 import urllib3
 
+from apic_client import ApicClient
+from apic_dn import parent_dn
+from apic_model import from_item
+from apic_stream import iter_imdata
+from mo_cache import MoCache
+
 urllib3.disable_warnings()
 
 # -----------------------------
-# APIC connection parameters
+# APIC connection parameters (or APIC_URL / APIC_USER / APIC_PASS)
 # -----------------------------
-APIC = api url
-USER = 'username'
-PASS = 'password'
+APIC = os.environ.get("APIC_URL", "https://apic.example.com")
+USER = os.environ.get("APIC_USER", "username")
+PASS = os.environ.get("APIC_PASS", "password")
 TENANT = "ACME"               # <-- tenant to inspect
+MO_CACHE = None               # e.g. ".apic_cache.sqlite" to reuse objects across runs
+INCREMENTAL = True            # with MO_CACHE: patch the last snapshot (changes only)
+RECONCILE = False             # find deletions with a DN-only pass, not the audit log
 
 
 # -----------------------------
@@ -31,23 +46,8 @@ TENANT = "ACME"               # <-- tenant to inspect
 # -----------------------------
 def apic_login():
     """Log into APIC and return an authenticated session."""
-    session = requests.Session()
-    url = f"{APIC}/api/aaaLogin.json"
-
-    payload = {
-        "aaaUser": {
-            "attributes": {
-                "name": USER,
-                "pwd": PASS
-            }
-        }
-    }
-
-    resp = session.post(url, json=payload, verify=False)
-    resp.raise_for_status()
-
-    token = resp.json()["imdata"][0]["aaaLogin"]["attributes"]["token"]
-    session.cookies["APIC-cookie"] = token
+    session = ApicClient(APIC, USER, PASS)  # pooled, refreshes its token
+    session.login()
     print(f"[+] Logged into APIC as {USER}")
     return session
 
@@ -196,10 +196,125 @@ def get_epg_bd(session, epg_dn):
     return None
 
 
+# -----------------------------
+# Tenant subtree (one query)
+# -----------------------------
+INVENTORY_CLASSES = "fvCtx,fvBD,fvRsCtx,fvSubnet,fvAp,fvAEPg,fvRsBd"
+
+
+def get_tenant_subtree(session, tenant):
+    """
+    Fetch the tenant with every VRF, BD, subnet, EPG and their
+    relations in a single request (rsp-subtree=full).
+    Returns the raw imdata list.
+    """
+    url = (
+        f"{APIC}/api/node/mo/uni/tn-{tenant}.json"
+        f"?rsp-subtree=full&rsp-subtree-class={INVENTORY_CLASSES}"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+    return resp.json().get("imdata", [])
+
+
+def walk_subtree(items, parent_dn=""):
+    """
+    Flatten a subtree response.
+    Yields (class_name, attributes, parent_dn) for every MO; children
+    only carry an rn, so their dn is filled in from the parent.
+    """
+    for item in items:
+        for cls, body in item.items():
+            attrs = body.get("attributes", {})
+            if not attrs.get("dn"):
+                attrs["dn"] = f"{parent_dn}/{attrs['rn']}"
+            yield cls, attrs, parent_dn
+            yield from walk_subtree(body.get("children", []), attrs["dn"])
+
+
+def iter_tenant_mos(session, tenant):
+    """
+    Same objects as walk_subtree(get_tenant_subtree(...)), from a flat
+    subtree query that is parsed as it streams in. Every object is reduced
+    to a compact model object (apic_model.py) right away, so only the
+    kept properties of the tenant stay in memory, never the raw JSON.
+    """
+    url = (
+        f"{APIC}/api/node/mo/uni/tn-{tenant}.json"
+        f"?query-target=subtree&target-subtree-class={INVENTORY_CLASSES}"
+    )
+    resp = session.get(url, stream=True, verify=False)
+    resp.raise_for_status()
+    for item in iter_imdata(resp):
+        mo = from_item(item)
+        yield mo.cls, mo.attributes(), mo.parent
+
+
+def cached_tenant_mos(session, tenant, cache):
+    """
+    Same objects as walk_subtree(get_tenant_subtree(...)), revalidated
+    through an MoCache: one query per class, returning only objects
+    whose modTs changed since the last run.
+    """
+    for cls in INVENTORY_CLASSES.split(","):
+        for item in cache.refresh(session, APIC, cls, scope_dn=f"uni/tn-{tenant}"):
+            attrs = item[cls]["attributes"]
+            yield cls, attrs, parent_dn(attrs["dn"])
+
+
 # -----------------------------
 # Inventory builder
 # -----------------------------
-def build_tenant_inventory(session, tenant):
+def inventory_from_mos(tenant, mos):
+    """
+    Build the inventory structure (see build_tenant_inventory) in memory
+    from (class_name, attributes, parent_dn) tuples.
+    """
+    vrfs = []
+    bds = {}
+    bd_names = {}       # BD dn -> BD name
+    bd_vrf = {}         # BD dn -> VRF name (fvRsCtx)
+    bd_subnets = {}     # BD dn -> [(ip, scope), ...]
+    epgs = []           # [(EPG dn, EPG name), ...]
+    epg_bd = {}         # EPG dn -> BD name (fvRsBd)
+
+    for cls, attrs, parent_dn in mos:
+        if cls == "fvCtx":
+            vrfs.append(attrs["name"])
+        elif cls == "fvBD":
+            bd_names[attrs["dn"]] = attrs["name"]
+        elif cls == "fvRsCtx":
+            bd_vrf[parent_dn] = attrs.get("tnFvCtxName")
+        elif cls == "fvSubnet":
+            bd_subnets.setdefault(parent_dn, []).append(
+                (attrs.get("ip"), attrs.get("scope"))
+            )
+        elif cls == "fvAEPg":
+            epgs.append((attrs["dn"], attrs["name"]))
+        elif cls == "fvRsBd":
+            epg_bd[parent_dn] = attrs.get("tnFvBDName")
+
+    for dn, name in bd_names.items():
+        bds[name] = {
+            "dn": dn,
+            "vrf": bd_vrf.get(dn),
+            "subnets": bd_subnets.get(dn, []),
+            "epgs": [],
+        }
+
+    for epg_dn, epg_name in epgs:
+        bd_name = epg_bd.get(epg_dn)
+        if bd_name and bd_name in bds:
+            bds[bd_name]["epgs"].append(epg_name)
+
+    return {
+        "tenant": tenant,
+        "vrfs": vrfs,
+        "bds": bds
+    }
+
+
+def build_tenant_inventory(session, tenant, cache=None):
     """
     Build a nested structure:
     {
@@ -214,36 +329,136 @@ def build_tenant_inventory(session, tenant):
           ...
       }
     }
+
+    Uses one subtree query regardless of tenant size. With a cache
+    (mo_cache.MoCache) only objects changed since the last run are
+    downloaded.
     """
-    inventory = {
-        "tenant": tenant,
-        "vrfs": [],
-        "bds": {}
+    if cache is not None:
+        return inventory_from_mos(tenant, cached_tenant_mos(session, tenant, cache))
+
+    return inventory_from_mos(tenant, iter_tenant_mos(session, tenant))
+
+
+# -----------------------------
+# Incremental refresh
+# -----------------------------
+def get_changed_mos(session, tenant, mark):
+    """
+    One query for every inventory object of the tenant modified after
+    the high-water mark. Returns a list of (class, attributes).
+    """
+    stamp = quote(mark)
+    changed = ",".join(
+        f'gt({cls}.modTs,"{stamp}")' for cls in INVENTORY_CLASSES.split(",")
+    )
+    url = (
+        f"{APIC}/api/node/mo/uni/tn-{tenant}.json"
+        f"?query-target=subtree&target-subtree-class={INVENTORY_CLASSES}"
+        f"&query-target-filter=or({changed})"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+
+    mos = []
+    for item in resp.json().get("imdata", []):
+        for cls, body in item.items():
+            mos.append((cls, body["attributes"]))
+    return mos
+
+
+def get_deleted_dns(session, tenant, mark):
+    """
+    DNs deleted under the tenant after the high-water mark, read from
+    the audit log (aaaModLR records with ind="deletion").
+    Returns a list of (created, dn).
+    """
+    url = (
+        f"{APIC}/api/node/class/aaaModLR.json"
+        '?query-target-filter=and(eq(aaaModLR.ind,"deletion"),'
+        f'gt(aaaModLR.created,"{quote(mark)}"),'
+        f'wcard(aaaModLR.affected,"^uni/tn-{quote(re.escape(tenant))}/"))'
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+    return [
+        (item["aaaModLR"]["attributes"]["created"], item["aaaModLR"]["attributes"]["affected"])
+        for item in resp.json().get("imdata", [])
+    ]
+
+
+def get_live_dns(session, tenant):
+    """
+    Every inventory object DN of the tenant, naming properties only.
+    Cheaper than a full fetch; used to reconcile deletions when the
+    audit log cannot be used.
+    """
+    url = (
+        f"{APIC}/api/node/mo/uni/tn-{tenant}.json"
+        f"?query-target=subtree&target-subtree-class={INVENTORY_CLASSES}"
+        "&rsp-prop-include=naming-only"
+    )
+    resp = session.get(url, verify=False)
+    resp.raise_for_status()
+    return {
+        body["attributes"]["dn"]
+        for item in resp.json().get("imdata", [])
+        for body in item.values()
     }
 
-    # VRFs
-    inventory["vrfs"] = get_vrfs(session, tenant)
-
-    # BDs (structure initialised)
-    bds = get_bds(session, tenant)
-
-    # Fill in VRF and subnets for each BD
-    for bd_name, info in bds.items():
-        dn = info["dn"]
-        info["vrf"] = get_bd_vrf(session, dn)
-        info["subnets"] = get_bd_subnets(session, dn)
-
-    # EPGs and which BD they use
-    epgs = get_epgs(session, tenant)
-    for epg in epgs:
-        epg_name = epg["name"]
-        epg_dn = epg["dn"]
-        bd_name = get_epg_bd(session, epg_dn)
-        if bd_name and bd_name in bds:
-            bds[bd_name]["epgs"].append(epg_name)
 
-    inventory["bds"] = bds
-    return inventory
+def refresh_tenant_inventory(session, tenant, cache, reconcile=RECONCILE):
+    """
+    Incremental version of build_tenant_inventory.
+
+    The snapshot (objects plus high-water modTs) lives in the MoCache.
+    The first run fetches the whole subtree once; later runs only ask
+    for objects modified since the mark and for deletions (audit log, or
+    a DN-only reconciliation pass with reconcile=True), patch the
+    snapshot and rebuild the inventory from it in memory. The APIC work
+    therefore scales with the amount of change, not with tenant size.
+    """
+    scope = f"uni/tn-{tenant}"
+    key = f"inventory@{scope}"
+    classes = INVENTORY_CLASSES.split(",")
+    cache.evict()
+    mark = cache.high_water(key)
+    stamps = [mark] if mark else []
+
+    if mark is None:
+        by_class = {}
+        for cls, attrs, _ in walk_subtree(get_tenant_subtree(session, tenant)):
+            attrs.pop("rn", None)
+            by_class.setdefault(cls, []).append(attrs)
+        cache.delete(cache.dns(classes, scope + "/"))
+    else:
+        if reconcile:
+            live = get_live_dns(session, tenant)
+            for dn in cache.dns(classes, scope + "/") - live:
+                cache.delete_subtree(dn)
+        else:
+            for created, dn in get_deleted_dns(session, tenant, mark):
+                cache.delete_subtree(dn)
+                stamps.append(created)
+
+        by_class = {}
+        for cls, attrs in get_changed_mos(session, tenant, mark):
+            by_class.setdefault(cls, []).append(attrs)
+
+    for cls, attrs_list in by_class.items():
+        if cls in classes:
+            cache.put_many(cls, attrs_list)
+            stamps.extend(a["modTs"] for a in attrs_list if a.get("modTs"))
+
+    if stamps:
+        cache.set_high_water(key, "*", max(stamps))
+    cache.db.commit()
+
+    return inventory_from_mos(tenant, (
+        (cls, item[cls]["attributes"], parent_dn(item[cls]["attributes"]["dn"]))
+        for cls in classes
+        for item in cache.items(cls, scope + "/")
+    ))
 
 
 # -----------------------------
@@ -292,5 +507,12 @@ def print_inventory(inv):
 # -----------------------------
 if __name__ == "__main__":
     sess = apic_login()
-    inv = build_tenant_inventory(sess, TENANT)
+    if MO_CACHE:
+        with MoCache(MO_CACHE) as cache:
+            if INCREMENTAL:
+                inv = refresh_tenant_inventory(sess, TENANT, cache)
+            else:
+                inv = build_tenant_inventory(sess, TENANT, cache)
+    else:
+        inv = build_tenant_inventory(sess, TENANT)
     print_inventory(inv)
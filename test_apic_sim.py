@@ -0,0 +1,195 @@
+"""
+Offline checks of the scripts against the APIC simulator (apic_sim.py).
+
+    python -m pytest -q
+"""
+
+import time
+
+import pytest
+
+import build_tenants
+import list_epgs
+from apic_client import ApicClient
+from live_inventory import LiveInventory
+from apic_plan import diff_states, flatten_tree, read_live
+from apic_sim import ApicSimulator
+from bench_inventory import synthetic_tenant
+from filter_compiler import compile_entries, dedupe_contract_filters, entry_attrs
+
+
+@pytest.fixture
+def sim():
+    sim = ApicSimulator().start()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def session(sim):
+    session = ApicClient(sim.url, "test", "test")
+    session.login()
+    yield session
+    session.close()
+
+
+def test_tenant_build_is_one_post_and_converges(sim, session, monkeypatch):
+    monkeypatch.setattr(build_tenants, "APIC", sim.url)
+    spec = build_tenants.load_spec("tenants.example.yaml")
+    tenant = build_tenants.normalize_tenant(build_tenants.expand_tenants(spec)[0])
+    tree = build_tenants.build_spec_tree(tenant)
+
+    result = build_tenants.build_tenant(session, tree)
+    assert result["status"] == 200 and result["changes"]
+    assert sim.stats["by_path"]["POST /api/mo"] == 1
+    assert "uni/tn-ACME/ap-Web_Tier/epg-Web-Frontend" in sim.mit.mos
+
+    again = build_tenants.build_tenant(session, tree)
+    assert again["changes"] == []
+    assert sim.stats["by_path"]["POST /api/mo"] == 1
+
+
+def test_class_query_pages(sim, session):
+    sim.load(synthetic_tenant(25))
+    sim.reset_stats()
+
+    dns = [item["fvAEPg"]["attributes"]["dn"]
+           for item in list_epgs.iter_class(session, "fvAEPg", page_size=10, apic=sim.url)]
+    assert len(dns) == len(set(dns)) == 25
+    assert dns == sorted(dns)
+    assert sim.stats["by_path"]["GET /api/class"] == 3
+
+
+def test_plan_matches_named_ports(sim, session):
+    # the APIC answers well-known ports by name
+    sim.load({"fvTenant": {"attributes": {"name": "T"}, "children": [
+        {"vzFilter": {"attributes": {"name": "F"}, "children": [
+            {"vzEntry": {"attributes": {"name": "HTTP", "etherT": "ip", "prot": "tcp",
+                                        "dFromPort": "http", "dToPort": "http",
+                                        "sFromPort": "unspecified"}}},
+        ]}},
+    ]}})
+    tree = {"fvTenant": {"attributes": {"dn": "uni/tn-T", "name": "T"}, "children": [
+        {"vzFilter": {"attributes": {"name": "F"}, "children": [
+            {"vzEntry": {"attributes": entry_attrs(entry)}}
+            for entry in compile_entries([("HTTP", 80)])
+        ]}},
+    ]}}
+    desired = flatten_tree(tree)
+    live = read_live(session, sim.url, "uni/tn-T", {cls for cls, _ in desired.values()})
+    assert diff_states(desired, live) == []
+
+
+def test_plan_deletes_replaced_entries(sim, session):
+    sim.load({"fvTenant": {"attributes": {"name": "T"}, "children": [
+        {"vzFilter": {"attributes": {"name": "F"}, "children": [
+            {"vzEntry": {"attributes": {"name": "Alt2", "prot": "tcp",
+                                        "dFromPort": "8090", "dToPort": "8090"}}},
+        ]}},
+    ]}})
+    tree = {"fvTenant": {"attributes": {"dn": "uni/tn-T", "name": "T"}, "children": [
+        {"vzFilter": {"attributes": {"name": "F"}, "children": [
+            {"vzEntry": {"attributes": entry_attrs(entry)}}
+            for entry in compile_entries([("Alt", "8080-8089"), ("Alt2", 8090)])
+        ]}},
+    ]}}
+    desired = flatten_tree(tree)
+    live = read_live(session, sim.url, "uni/tn-T", {"vzFilter", "vzEntry"})
+    changes = diff_states(desired, live, owned=("vzEntry",))
+    assert ("delete", "vzEntry", "uni/tn-T/flt-F/e-Alt2", None) in changes
+
+
+def test_compile_entries_merges_and_keeps_names():
+    compiled = compile_entries([("HTTP", 80), ("Alt", "8080-8089"), ("Alt2", 8090),
+                                ("DNS", 53, "udp")])
+    assert compiled == [
+        {"name": "HTTP", "prot": "tcp", "from": "80", "to": "80"},
+        {"name": "Alt", "prot": "tcp", "from": "8080", "to": "8090"},
+        {"name": "DNS", "prot": "udp", "from": "53", "to": "53"},
+    ]
+
+
+def test_dedupe_drops_only_covered_entries():
+    filters = {
+        "F1": compile_entries([("Web", "80-90")]),
+        "F2": compile_entries([("Wide", "70-100")]),
+        "F3": compile_entries([("HTTP", 85)]),
+    }
+    deduped = dedupe_contract_filters(filters, {"C": ["F1", "F2", "F3"]})
+    assert deduped["F1"] == filters["F1"]
+    assert deduped["F2"] == filters["F2"]     # partly covered: kept whole
+    assert deduped["F3"] == []
+
+
+def test_token_refresh_and_relogin(sim):
+    sim.token_timeout = 2
+    session = ApicClient(sim.url, "test", "test", refresh_margin=1)
+    session.login()
+
+    time.sleep(1.1)     # inside the refresh margin
+    assert session.get("/api/node/class/fvTenant.json").status_code == 200
+    assert sim.stats["by_path"]["GET /api/aaaRefresh.json"] == 1
+
+    sim.tokens.clear()  # token gone: 403, log in again once
+    assert session.get("/api/node/class/fvTenant.json").status_code == 200
+    assert sim.stats["by_path"]["POST /api/aaaLogin.json"] == 2
+    session.close()
+
+
+def _wait_for(live, check, timeout=5):
+    """Wait until check(live.inventory()) holds; returns its last result."""
+    deadline = time.monotonic() + timeout
+    version = 0
+    while not check(live.inventory()) and time.monotonic() < deadline:
+        version = live.wait_for_change(version, timeout=deadline - time.monotonic())
+    return check(live.inventory())
+
+
+def test_live_inventory_follows_events():
+    sim = ApicSimulator(subscription_timeout=1.0).start()
+    session = ApicClient(sim.url, "test", "test")
+    session.login()
+    sim.load({"fvTenant": {"attributes": {"name": "T"}, "children": [
+        {"fvBD": {"attributes": {"name": "BD1"}, "children": [
+            {"fvSubnet": {"attributes": {"ip": "10.0.0.1/24", "scope": "private"}}},
+        ]}},
+        {"fvBD": {"attributes": {"name": "BD2"}}},
+    ]}})
+
+    live = LiveInventory(session, "T", refresh_interval=0.3).start()
+    try:
+        assert set(live.inventory()["bds"]) == {"BD1", "BD2"}
+
+        # create
+        session.post("/api/mo/uni/tn-T.json", json={"fvAp": {
+            "attributes": {"dn": "uni/tn-T/ap-A", "name": "A"},
+            "children": [{"fvAEPg": {"attributes": {"name": "E"}, "children": [
+                {"fvRsBd": {"attributes": {"tnFvBDName": "BD1"}}},
+            ]}}],
+        }})
+        assert _wait_for(live, lambda inv: inv["bds"]["BD1"]["epgs"] == ["E"])
+
+        # modify
+        session.post("/api/mo/uni/tn-T/BD-BD1/subnet-[10.0.0.1/24].json", json={"fvSubnet": {
+            "attributes": {"dn": "uni/tn-T/BD-BD1/subnet-[10.0.0.1/24]",
+                           "scope": "public", "status": "modified"},
+        }})
+        assert _wait_for(live, lambda inv: inv["bds"]["BD1"]["subnets"]
+                         == [("10.0.0.1/24", "public")])
+
+        # delete
+        session.post("/api/mo/uni/tn-T/BD-BD2.json", json={"fvBD": {
+            "attributes": {"dn": "uni/tn-T/BD-BD2", "status": "deleted"},
+        }})
+        assert _wait_for(live, lambda inv: "BD2" not in inv["bds"])
+
+        # refreshed before the simulator's timeout: still the same subscription
+        subscription_id = live.subscription_id
+        time.sleep(1.5)
+        assert sim.stats["by_path"].get("GET /api/subscriptionRefresh.json", 0) >= 3
+        assert subscription_id in sim.subscriptions
+        assert live.subscription_id == subscription_id
+    finally:
+        live.stop()
+        session.close()
+        sim.stop()